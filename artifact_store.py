@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecast_models import (
+    lstm_forecast, lstm_windows, prophet_init_params, prophet_predict, refilter_exponential_smoothing, run_model
+)
+from instrumentation import stage
+from model_registry import get_model_class
+
+DEFAULT_ROOT = os.environ.get("MODEL_STORE_DIR") or os.path.join(os.path.expanduser("~"), ".aiforecaster", "models")
+KEEP_VERSIONS = int(os.environ.get("MODEL_STORE_VERSIONS", "5"))
+# ARIMA re-estimates its parameters (starting from the stored ones) once the new rows exceed this share
+ARIMA_REFIT_SHARE = 0.05
+LSTM_FINE_TUNE_EPOCHS = 2
+# LSTM fine-tuning sees the windows covering the new rows plus this many earlier ones
+LSTM_CONTEXT_WINDOWS = 256
+WARM_START_MODELS = {"ARIMA", "Exponential Smoothing", "Prophet", "LSTM Neural Network"}
+
+def _digest(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+def _series_frame(data, target_col):
+    return data[[col for col in ("date", target_col) if col in data.columns]]
+
+# Hash of the first n rows' values (not the index), to test whether new data extends a stored series
+def prefix_hash(data, target_col, n_rows):
+    frame = _series_frame(data, target_col).iloc[:n_rows]
+    return _digest(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+
+# A series keeps its lineage as rows are appended: same columns, same first observation
+def dataset_lineage(data, target_col):
+    first = _series_frame(data, target_col).iloc[:1]
+    return _digest(",".join(map(str, data.columns)), target_col,
+                   pd.util.hash_pandas_object(first, index=False).to_numpy().tobytes())
+
+def _params_key(params):
+    return json.dumps(params or {}, sort_keys=True, default=str)
+
+# Versioned fitted models on local disk: <root>/<user>/<series key>/v0001/{meta.json, artifact.pkl | model.keras}
+class ArtifactStore:
+    def __init__(self, root=DEFAULT_ROOT, keep_versions=KEEP_VERSIONS):
+        self.root = root
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+
+    def _user_dir(self, user_id):
+        return os.path.join(self.root, _digest(user_id)[:16])
+
+    def series_dir(self, user_id, data, target_col, model_choice, params):
+        key = _digest(dataset_lineage(data, target_col), model_choice, _params_key(params))
+        return os.path.join(self._user_dir(user_id), key)
+
+    def _versions(self, series_dir):
+        if not os.path.isdir(series_dir):
+            return []
+        names = sorted((name for name in os.listdir(series_dir) if name.startswith("v") and not name.endswith(".tmp")),
+                       reverse=True)
+        metas = []
+        for name in names:
+            try:
+                with open(os.path.join(series_dir, name, "meta.json")) as f:
+                    metas.append({**json.load(f), "path": os.path.join(series_dir, name)})
+            except (OSError, json.JSONDecodeError):
+                continue  # a version being written or left half-written by a crash
+        return metas
+
+    # Newest stored version whose training rows are a prefix of `data`; returns (meta, new_rows) or (None, 0)
+    def find_base(self, user_id, data, target_col, model_choice, params):
+        for meta in self._versions(self.series_dir(user_id, data, target_col, model_choice, params)):
+            n_rows = meta["rows"]
+            if n_rows <= len(data) and prefix_hash(data, target_col, n_rows) == meta["prefix_hash"]:
+                return meta, len(data) - n_rows
+        return None, 0
+
+    def save(self, user_id, data, target_col, model_choice, params, model, forecast, mode, fit_seconds, parent=None):
+        series_dir = self.series_dir(user_id, data, target_col, model_choice, params)
+        with self._lock:
+            os.makedirs(series_dir, exist_ok=True)
+            existing = self._versions(series_dir)
+            version = (existing[0]["version"] + 1) if existing else 1
+            # Written under a temporary name and renamed, so readers never see a partial version
+            final_path = os.path.join(series_dir, f"v{version:04d}")
+            tmp_path = final_path + ".tmp"
+            os.makedirs(tmp_path, exist_ok=True)
+            if hasattr(model, "save") and hasattr(model, "input_shape"):
+                model.save(os.path.join(tmp_path, "model.keras"))
+                artifact = {"model": None, "forecast": forecast}
+            else:
+                artifact = {"model": model, "forecast": forecast}
+            with open(os.path.join(tmp_path, "artifact.pkl"), "wb") as f:
+                pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+            meta = {
+                "version": version,
+                "model": model_choice,
+                "target": target_col,
+                "params": _params_key(params),
+                "rows": len(data),
+                "prefix_hash": prefix_hash(data, target_col, len(data)),
+                "mode": mode,
+                "parent": parent,
+                "fit_seconds": fit_seconds,
+                "created": time.time(),
+            }
+            with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, final_path)
+            for old in self._versions(series_dir)[self.keep_versions:]:
+                shutil.rmtree(old["path"], ignore_errors=True)
+        return meta
+
+    def load(self, meta):
+        with open(os.path.join(meta["path"], "artifact.pkl"), "rb") as f:
+            artifact = pickle.load(f)
+        keras_path = os.path.join(meta["path"], "model.keras")
+        if artifact["model"] is None and os.path.exists(keras_path):
+            artifact["model"] = get_model_class("keras", "load_model")(keras_path)
+        return artifact
+
+    # Every stored version for a user, newest first
+    def list_versions(self, user_id):
+        user_dir = self._user_dir(user_id)
+        if not os.path.isdir(user_dir):
+            return []
+        metas = []
+        for name in os.listdir(user_dir):
+            metas.extend(self._versions(os.path.join(user_dir, name)))
+        return sorted(metas, key=lambda meta: meta["created"], reverse=True)
+
+    def delete_user(self, user_id):
+        shutil.rmtree(self._user_dir(user_id), ignore_errors=True)
+
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+def get_artifact_store():
+    global _artifact_store
+    if _artifact_store is None:
+        with _artifact_store_lock:
+            if _artifact_store is None:
+                _artifact_store = ArtifactStore()
+    return _artifact_store
+
+# Update a stored fit with the rows appended since; returns (model, forecast)
+def warm_start(model, model_choice, data, target_col, n_previous, params):
+    horizon = params.get("horizon", 10)
+    if model_choice == "ARIMA":
+        # Continue the position index the stored model was fitted with
+        new_rows = pd.Series(data[target_col].iloc[n_previous:].to_numpy(dtype=float),
+                             index=pd.RangeIndex(n_previous, len(data)), name=target_col)
+        refit = len(new_rows) > ARIMA_REFIT_SHARE * n_previous
+        # refit=True re-estimates starting from the stored parameters, so it converges in a few iterations
+        result = model.append(new_rows, refit=refit)
+        return result, result.forecast(steps=horizon)
+    if model_choice == "Exponential Smoothing":
+        result = refilter_exponential_smoothing(model, data[target_col].to_numpy(dtype=float))
+        return result, result.forecast(steps=horizon)
+    if model_choice == "Prophet":
+        Prophet = get_model_class("prophet", "Prophet")
+        df = data[["date", target_col]].rename(columns={"date": "ds", target_col: "y"})
+        refitted = Prophet(uncertainty_samples=model.uncertainty_samples)
+        refitted.fit(df, init=prophet_init_params(model))
+        return refitted, prophet_predict(refitted, horizon)
+    if model_choice == "LSTM Neural Network":
+        values = data[target_col].dropna().to_numpy(dtype=np.float32)
+        X, y = lstm_windows(values, model.input_shape[1], model.output_shape[-1])
+        new_rows = len(data) - n_previous
+        recent = slice(max(0, len(X) - new_rows - LSTM_CONTEXT_WINDOWS), None)
+        model.fit(X[recent], y[recent], epochs=LSTM_FINE_TUNE_EPOCHS,
+                  batch_size=params.get("batch_size", 32), verbose=0)
+        return model, lstm_forecast(model, values, horizon)
+    raise ValueError(f"{model_choice} has no warm start.")
+
+# Fit through the artifact store: reuse an identical stored fit, warm-start from one this data extends,
+# or fit from scratch. Returns (model, forecast, info) where info["mode"] is "reused", "warm" or "fit".
+def run_with_artifacts(user_id, data, target_col, model_choice, params=None, store=None):
+    store = store or get_artifact_store()
+    params = params or {}
+    base, new_rows = store.find_base(user_id, data, target_col, model_choice, params)
+    if base is not None and new_rows == 0:
+        artifact = store.load(base)
+        return artifact["model"], artifact["forecast"], {"mode": "reused", "version": base["version"], "seconds": 0.0}
+
+    start = time.perf_counter()
+    model, mode, error = None, "fit", None
+    if base is not None and model_choice in WARM_START_MODELS:
+        try:
+            with stage("warm_start", model=model_choice, rows=new_rows):
+                model, forecast = warm_start(store.load(base)["model"], model_choice, data, target_col,
+                                             base["rows"], params)
+            mode = "warm"
+        except Exception as e:
+            # Fall back to a full fit, e.g. when a stored model no longer loads with installed library versions
+            model, error = None, f"{type(e).__name__}: {e}"
+    if model is None:
+        with stage("fit", model=model_choice, rows=len(data)):
+            model, forecast = run_model(data, target_col, model_choice, params, return_model=True)
+    seconds = time.perf_counter() - start
+
+    info = {"mode": mode, "version": None, "seconds": seconds, "new_rows": new_rows}
+    try:
+        meta = store.save(user_id, data, target_col, model_choice, params, model, forecast, mode, seconds,
+                          parent=base["version"] if base is not None else None)
+        info["version"] = meta["version"]
+    except Exception as e:
+        # The forecast is still good; it just will not be reusable next time
+        info["save_error"] = f"{type(e).__name__}: {e}"
+    if error:
+        info["warm_start_error"] = error
+    return model, forecast, info
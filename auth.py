@@ -1,8 +1,35 @@
-from supabase_client import get_supabase_client
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
 
-supabase = get_supabase_client()
+import aiohttp
+
+from supabase_client import SUPABASE_KEY, SUPABASE_URL, get_supabase_client
+
+ROLE_CACHE_TTL = 300  # seconds
+
+_role_cache = {}
+_role_cache_lock = threading.Lock()
+
+# Short-lived cache of user roles so repeat logins skip the users table lookup
+def get_cached_role(user_id):
+    with _role_cache_lock:
+        entry = _role_cache.get(user_id)
+        if entry is None:
+            return None
+        role, expires = entry
+        if expires < time.monotonic():
+            del _role_cache[user_id]
+            return None
+        return role
+
+def cache_role(user_id, role):
+    with _role_cache_lock:
+        _role_cache[user_id] = (role, time.monotonic() + ROLE_CACHE_TTL)
 
 def register_user(email, password, role="user"):
+    supabase = get_supabase_client()
     try:
         # Sign up the user
         response = supabase.auth.sign_up({
@@ -23,6 +50,7 @@ def register_user(email, password, role="user"):
 
             # Check if the insert operation was successful by verifying the `data` attribute
             if insert_response and hasattr(insert_response, 'data') and insert_response.data:
+                cache_role(user_id, role)
                 # Automatically log in the user
                 return {
                     "success": True,
@@ -44,6 +72,7 @@ def register_user(email, password, role="user"):
 
 
 def login_user(email, password):
+    supabase = get_supabase_client()
     try:
         # Sign in the user using email and password
         response = supabase.auth.sign_in_with_password({
@@ -56,18 +85,140 @@ def login_user(email, password):
         
         if user:
             user_id = user.id  # This will be the UUID
-            # Fetch user role from the database using the UUID `id`
-            user_data = supabase.table('users').select('role').eq('id', user_id).execute()
-            if user_data.data:
-                return {"response": response, "role": user_data.data[0]['role']}
-            else:
-                return {"response": response, "role": "user"}
+            # The role comes from app metadata or the role cache; only fall back to the users table
+            role = _metadata_role(user.app_metadata) or get_cached_role(user_id)
+            if role is None:
+                user_data = supabase.table('users').select('role').eq('id', user_id).execute()
+                role = user_data.data[0]['role'] if user_data.data else "user"
+            cache_role(user_id, role)
+            return {"response": response, "role": role}
         else:
             return None
     except Exception as e:
         print(f"Error: {e}")
         return None
 
+# Only app_metadata is trusted: users can edit their own user_metadata
+def _metadata_role(app_metadata):
+    if app_metadata and app_metadata.get("role"):
+        return app_metadata["role"]
+    return None
+
+# Async path: plain REST calls on one shared aiohttp session with keep-alive connections
+
+_http_session = None
+_loop = None
+_loop_lock = threading.Lock()
+
+async def _get_http_session():
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+    return _http_session
+
+def _headers(access_token=None):
+    return {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {access_token or SUPABASE_KEY}",
+        "Content-Type": "application/json",
+    }
+
+def _error_message(body):
+    if isinstance(body, dict):
+        return body.get("error_description") or body.get("msg") or body.get("message") or body.get("error")
+    return str(body)
+
+# Response shaped like supabase-py's, so callers can use result['response'].user.id
+def _auth_response(body):
+    user = body.get("user") or (body if "id" in body else None)
+    return SimpleNamespace(
+        user=SimpleNamespace(**user) if user else None,
+        session=SimpleNamespace(**{k: v for k, v in body.items() if k != "user"}) if "access_token" in body else None,
+    )
+
+async def _fetch_role(session, user_id, access_token):
+    async with session.get(
+        f"{SUPABASE_URL}/rest/v1/users",
+        params={"select": "role", "id": f"eq.{user_id}"},
+        headers=_headers(access_token),
+    ) as response:
+        rows = await response.json() if response.status == 200 else []
+    return rows[0]["role"] if rows else "user"
+
+# One round trip when the role is in the token's app metadata or the role cache
+async def async_login_user(email, password):
+    try:
+        session = await _get_http_session()
+        async with session.post(
+            f"{SUPABASE_URL}/auth/v1/token",
+            params={"grant_type": "password"},
+            json={"email": email, "password": password},
+            headers=_headers(),
+        ) as response:
+            body = await response.json()
+        if response.status != 200:
+            print(f"Error: {_error_message(body)}")
+            return None
+
+        user = body.get("user") or {}
+        user_id = user.get("id")
+        role = _metadata_role(user.get("app_metadata")) or get_cached_role(user_id)
+        if role is None:
+            role = await _fetch_role(session, user_id, body.get("access_token"))
+        cache_role(user_id, role)
+        return {"response": _auth_response(body), "role": role}
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+async def async_register_user(email, password, role="user"):
+    try:
+        session = await _get_http_session()
+        async with session.post(
+            f"{SUPABASE_URL}/auth/v1/signup",
+            json={"email": email, "password": password},
+            headers=_headers(),
+        ) as response:
+            body = await response.json()
+        if response.status != 200:
+            return {"success": False, "message": _error_message(body) or "Failed to register user."}
+
+        auth_response = _auth_response(body)
+        if auth_response.user is None:
+            return {"success": False, "message": "Failed to register user."}
+        access_token = auth_response.session.access_token if auth_response.session else None
+        async with session.post(
+            f"{SUPABASE_URL}/rest/v1/users",
+            json={"id": auth_response.user.id, "email": email, "role": role},
+            headers={**_headers(access_token), "Prefer": "return=representation"},
+        ) as response:
+            inserted = await response.json() if response.status in (200, 201) else None
+        if not inserted:
+            print(f"User insertion failed: {response.status}")
+            return {"success": False, "message": "Failed to register user in database."}
 
+        cache_role(auth_response.user.id, role)
+        return {
+            "success": True,
+            "message": "User registered and logged in successfully!",
+            "user": auth_response.user,
+            "role": role
+        }
+    except Exception as e:
+        print(f"Error: {e}")
+        return {"success": False, "message": str(e)}
 
+# Event loop on a daemon thread that owns the shared HTTP session; Streamlit script threads submit to it
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True, name="auth-loop").start()
+    return _loop
 
+def run_async(coro, timeout=15):
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
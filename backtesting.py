@@ -0,0 +1,161 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from forecast_models import (
+    MODEL_CHOICES, moving_average_forecast, prophet_init_params, refilter_exponential_smoothing, run_model
+)
+from model_registry import get_model_class
+
+DEFAULT_PARAMS = {
+    "ARIMA": {"order": (1, 1, 1)},
+    "Exponential Smoothing": {"seasonal_periods": 12, "trend": "add", "seasonal": "add"},
+    "Moving Average": {"window": 3},
+}
+
+def _errors(actual, predicted):
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    nonzero = actual != 0
+    mape = float(np.mean(np.abs((actual[nonzero] - predicted[nonzero]) / actual[nonzero])) * 100) if nonzero.any() else np.nan
+    rmse = float(np.sqrt(np.mean((actual - predicted) ** 2)))
+    return mape, rmse
+
+# Training-set end positions for each fold, oldest first
+def rolling_origins(n_points, horizon=10, folds=3, min_train=None):
+    min_train = min_train or max(3 * horizon, 20)
+    origins = [n_points - horizon * (fold + 1) for fold in range(folds)][::-1]
+    return [origin for origin in origins if origin >= min_train]
+
+def applicable_models(data, target_col, horizon=10, folds=3):
+    n_points = int(data[target_col].notna().sum())
+    shortest_train = n_points - horizon * folds
+    models = []
+    for model_choice in MODEL_CHOICES:
+        if model_choice == "Prophet" and "date" not in data.columns:
+            continue
+        if model_choice == "Exponential Smoothing" and shortest_train < 2 * DEFAULT_PARAMS[model_choice]["seasonal_periods"]:
+            continue
+        if model_choice == "LSTM Neural Network" and shortest_train <= 20 + horizon:
+            continue
+        models.append(model_choice)
+    return models
+
+# ARIMA: fit once, then append each fold's new observations to the fitted state without refitting
+def _arima_folds(values, origins, horizon, params):
+    ARIMA = get_model_class("arima", "ARIMA")
+    result = None
+    for previous, origin in zip([None] + origins[:-1], origins):
+        if result is None:
+            result = ARIMA(values[:origin], order=params.get("order", (1, 1, 1))).fit()
+        else:
+            result = result.append(values[previous:origin], refit=False)
+        yield origin, result.forecast(steps=horizon)
+
+# Holt-Winters: estimate parameters once, then re-filter later folds with those parameters fixed
+def _holtwinters_folds(values, origins, horizon, params):
+    ExponentialSmoothing = get_model_class("holtwinters", "ExponentialSmoothing")
+    config = {
+        "trend": params.get("trend", "add"),
+        "seasonal": params.get("seasonal", "add"),
+        "seasonal_periods": params.get("seasonal_periods", 12),
+    }
+    fitted = None
+    for origin in origins:
+        if fitted is None:
+            fitted = ExponentialSmoothing(values[:origin], **config).fit()
+            result = fitted
+        else:
+            result = refilter_exponential_smoothing(fitted, values[:origin])
+        yield origin, result.forecast(steps=horizon)
+
+# Prophet: refit per fold, starting the optimizer from the previous fold's parameters
+def _prophet_folds(frame, target_col, origins, horizon, params):
+    Prophet = get_model_class("prophet", "Prophet")
+    history = frame[["date", target_col]].rename(columns={"date": "ds", target_col: "y"})
+    init = None
+    for origin in origins:
+        model = Prophet(uncertainty_samples=0)
+        model.fit(history.iloc[:origin], **({"init": init} if init else {}))
+        init = prophet_init_params(model)
+        future = model.make_future_dataframe(periods=horizon, include_history=False)
+        yield origin, model.predict(future)["yhat"].to_numpy()
+
+def _moving_average_folds(values, origins, horizon, params):
+    window = params.get("window", 3)
+    for origin in origins:
+        yield origin, moving_average_forecast(values[:origin], window, horizon)
+
+def _generic_folds(frame, target_col, model_choice, origins, horizon, params):
+    for origin in origins:
+        forecast = run_model(frame.iloc[:origin], target_col, model_choice, {**params, "horizon": horizon})
+        yield origin, np.asarray(forecast, dtype=float)[:horizon]
+
+# Worker: every fold for one model, so fitted state can be carried from fold to fold
+def backtest_model(frame, target_col, model_choice, origins, horizon=10, params=None):
+    params = {**DEFAULT_PARAMS.get(model_choice, {}), **(params or {})}
+    values = frame[target_col].to_numpy(dtype=float)
+    start = time.perf_counter()
+    try:
+        if model_choice == "ARIMA":
+            folds = _arima_folds(values, origins, horizon, params)
+        elif model_choice == "Exponential Smoothing":
+            folds = _holtwinters_folds(values, origins, horizon, params)
+        elif model_choice == "Prophet":
+            folds = _prophet_folds(frame, target_col, origins, horizon, params)
+        elif model_choice == "Moving Average":
+            folds = _moving_average_folds(values, origins, horizon, params)
+        else:
+            folds = _generic_folds(frame, target_col, model_choice, origins, horizon, params)
+
+        actual, predicted = [], []
+        for origin, forecast in folds:
+            actual.append(values[origin:origin + horizon])
+            predicted.append(np.asarray(forecast, dtype=float)[:horizon])
+        mape, rmse = _errors(np.concatenate(actual), np.concatenate(predicted))
+        error = None
+    except Exception as e:
+        mape, rmse, error = np.nan, np.nan, f"{type(e).__name__}: {e}"
+    total = time.perf_counter() - start
+    return {
+        "model": model_choice,
+        "mape": mape,
+        "rmse": rmse,
+        "fit_s": total / max(1, len(origins)),
+        "total_s": total,
+        "folds": len(origins),
+        "error": error,
+    }
+
+# Backtest every model across a process pool; returns (results frame sorted best first, winner)
+def compare_models(data, target_col, models=None, horizon=10, folds=3, metric="rmse",
+                   max_workers=None, progress_callback=None):
+    frame = data[[col for col in ("date", target_col) if col in data.columns]].dropna(subset=[target_col])
+    frame = frame.reset_index(drop=True)
+    models = models or applicable_models(frame, target_col, horizon, folds)
+    origins = rolling_origins(len(frame), horizon, folds)
+    if not origins:
+        raise ValueError(f"Need more than {max(3 * horizon, 20) + horizon} observations to backtest.")
+
+    results = []
+    workers = min(max_workers or max(1, (os.cpu_count() or 2) - 1), len(models))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(backtest_model, frame, target_col, model, origins, horizon): model
+                   for model in models}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # e.g. BrokenProcessPool after a worker ran out of memory; only that model fails
+                results.append({"model": futures[future], "mape": np.nan, "rmse": np.nan, "fit_s": np.nan,
+                                "total_s": np.nan, "folds": len(origins), "error": f"{type(e).__name__}: {e}"})
+            if progress_callback is not None:
+                progress_callback(len(results), len(models))
+
+    table = pd.DataFrame(results).sort_values([metric, "fit_s"], na_position="last").reset_index(drop=True)
+    scored = table[table["error"].isna() & table[metric].notna()]
+    winner = scored.iloc[0]["model"] if not scored.empty else None
+    return table, winner
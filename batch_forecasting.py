@@ -0,0 +1,92 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from forecast_models import PROPHET_CORES_PER_WORKER, run_model
+
+# Grouping key of each long-format template in data_handler.TEMPLATES
+GROUP_COLUMNS = ["product", "ticker", "commodity", "category"]
+
+# Pick the grouping key present in the data, if any
+def detect_group_column(data):
+    for col in GROUP_COLUMNS:
+        if col in data.columns:
+            return col
+    return None
+
+def default_workers():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+# Prophet workers reserve PROPHET_CORES_PER_WORKER cores each, so fewer workers keep the total within the CPUs
+def default_model_workers(model_choice, params=None):
+    if model_choice == "Prophet":
+        return max(1, default_workers() // PROPHET_CORES_PER_WORKER)
+    return default_workers()
+
+# Worker: forecast a chunk of groups, isolating failures to the group that raised
+def _forecast_group_chunk(chunk, target_col, model_choice, params):
+    results = []
+    for group, frame in chunk:
+        try:
+            forecast = run_model(frame.reset_index(drop=True), target_col, model_choice, params)
+            results.append((group, np.asarray(forecast, dtype=float), None))
+        except Exception as e:
+            results.append((group, None, f"{type(e).__name__}: {e}"))
+    return results
+
+# Split groups into chunks so thousands of small series do not pay one task round trip each
+def _chunk_groups(groups, workers, chunk_size=None):
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(groups) / (workers * 4)))
+    return [groups[i:i + chunk_size] for i in range(0, len(groups), chunk_size)]
+
+# Fit the chosen model for every group and return (forecasts, errors).
+# forecasts has one column per group indexed by forecast step; errors maps group -> message.
+def forecast_by_group(data, target_col, model_choice, group_col, params=None,
+                      max_workers=None, chunk_size=None, progress_callback=None):
+    columns = [col for col in ("date", target_col) if col in data.columns]
+    groups = [(group, frame[columns]) for group, frame in data.groupby(group_col, sort=True, observed=True)]
+    total = len(groups)
+    forecasts, errors = {}, {}
+    if total == 0:
+        return pd.DataFrame(), errors
+
+    workers = min(max_workers or default_model_workers(model_choice, params), total)
+    chunks = _chunk_groups(groups, workers, chunk_size)
+    done = 0
+
+    def collect(chunk, results):
+        nonlocal done
+        for group, values, error in results:
+            if error is None:
+                forecasts[group] = pd.Series(values)
+            else:
+                errors[group] = error
+        done += len(chunk)
+        if progress_callback is not None:
+            progress_callback(done, total)
+
+    if workers == 1:
+        for chunk in chunks:
+            collect(chunk, _forecast_group_chunk(chunk, target_col, model_choice, params))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_forecast_group_chunk, chunk, target_col, model_choice, params): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # A crashed worker only fails the groups it was holding
+                    results = [(group, None, f"{type(e).__name__}: {e}") for group, _ in chunk]
+                collect(chunk, results)
+
+    combined = pd.DataFrame({group: forecasts[group] for group, _ in groups if group in forecasts})
+    combined.index.name = "step"
+    return combined, errors
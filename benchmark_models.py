@@ -0,0 +1,286 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from model_registry import MODEL_CHOICE_BACKENDS, load_backend_for_model
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+HORIZON = 10
+# Largest series each model is benchmarked on by default; beyond this a single run takes too long
+MODEL_MAX_POINTS = {
+    "ARIMA": 100_000,
+    "Prophet": 100_000,
+    "Moving Average": 1_000_000,
+    "Exponential Smoothing": 1_000_000,
+    "Linear Regression": 1_000_000,
+    "Random Forest": 100_000,
+    "Support Vector Regression (SVR)": 1_000_000,
+    "LSTM Neural Network": 100_000,
+}
+DEFAULT_PARAMS = {
+    "Exponential Smoothing": {"seasonal_periods": 24, "trend": "add", "seasonal": "add"},
+}
+
+# Hourly series with daily and weekly seasonality, trend and noise
+def make_series(n_points, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_points, dtype=np.float64)
+    values = (
+        100
+        + 0.01 * t
+        + 10 * np.sin(2 * np.pi * t / 24)
+        + 5 * np.sin(2 * np.pi * t / 168)
+        + rng.normal(0, 2, n_points)
+    )
+    return pd.DataFrame({"date": pd.date_range("2000-01-01", periods=n_points, freq="h"), "value": values})
+
+# Long-format frame of n_groups series sharing n_points in total (plus `extra` per series), like the Sales template
+def make_grouped_series(n_points, n_groups, seed=0, extra=0):
+    per_group = max(1, n_points // n_groups) + extra
+    frames = []
+    for group in range(n_groups):
+        frame = make_series(per_group, seed + group)
+        frame["value"] *= 1 + group / n_groups
+        frame.insert(1, "product", f"sku_{group:05d}")
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+# Peak RSS of this process, or with children=True of the largest finished (and joined) child process
+def peak_rss_mb(children=False):
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return (peak if sys.platform == "darwin" else peak * 1024) / 1024 ** 2
+
+def accuracy(actual, predicted):
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)[-len(actual):]
+    mask = ~np.isnan(predicted)
+    if not mask.any():
+        return None, None
+    actual, predicted = actual[mask], predicted[mask]
+    rmse = float(np.sqrt(np.mean((actual - predicted) ** 2)))
+    nonzero = actual != 0
+    mape = float(np.mean(np.abs((actual[nonzero] - predicted[nonzero]) / actual[nonzero])) * 100) if nonzero.any() else None
+    return mape, rmse
+
+# Time a second forecast from an already fitted model, per model family
+def time_predict(model):
+    start = time.perf_counter()
+    if model is None:
+        return None
+    if hasattr(model, "make_future_dataframe"):
+        model.predict(model.make_future_dataframe(periods=HORIZON, include_history=False))
+    elif hasattr(model, "forecast"):
+        model.forecast(steps=HORIZON)
+    elif hasattr(model, "n_features_in_"):
+        model.predict(np.zeros((HORIZON, model.n_features_in_)))
+    elif hasattr(model, "input_shape"):
+        model(np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32), training=False)
+    else:
+        return None
+    return time.perf_counter() - start
+
+def _single_case(model_choice, n_points, params, seed):
+    from forecast_models import run_model
+
+    data = make_series(n_points + HORIZON, seed)
+    train, test = data.iloc[:-HORIZON], data["value"].iloc[-HORIZON:]
+    load_backend_for_model(model_choice)
+    baseline = peak_rss_mb()
+
+    # run_model fits and forecasts in one call; predict_s is a separate, later forecast from the fitted model
+    start = time.perf_counter()
+    model, forecast = run_model(train, "value", model_choice, params, return_model=True)
+    fit_forecast_time = time.perf_counter() - start
+    predict_time = time_predict(model)
+    mape, rmse = accuracy(test, forecast)
+    return {
+        "fit_forecast_s": fit_forecast_time,
+        "predict_s": predict_time,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": peak_rss_mb() - baseline,
+        "mape": mape,
+        "rmse": rmse,
+    }
+
+def _grouped_case(model_choice, n_points, params, seed, n_groups, workers):
+    from batch_forecasting import forecast_by_group
+    from forecast_models import run_model
+
+    data = make_grouped_series(n_points, n_groups, seed, extra=HORIZON)
+    held_out = data.groupby("product").cumcount(ascending=False) < HORIZON
+    train = data[~held_out]
+    actual = data[held_out].pivot(index="date", columns="product", values="value").reset_index(drop=True)
+    load_backend_for_model(model_choice)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    forecasts, errors = forecast_by_group(train, "value", model_choice, "product", params, max_workers=workers)
+    total = time.perf_counter() - start
+
+    # Accuracy over every series that forecast; predict time from one series refitted in this process
+    scores = [accuracy(actual[group], forecasts[group]) for group in forecasts.columns]
+    first = train[train["product"] == train["product"].iloc[0]].reset_index(drop=True)
+    predict_time = time_predict(run_model(first, "value", model_choice, params, return_model=True)[0])
+    return {
+        "fit_forecast_s": total,
+        "predict_s": predict_time,
+        "peak_rss_mb": peak_rss_mb(),
+        "worker_peak_rss_mb": peak_rss_mb(children=True) if workers != 1 else None,
+        "rss_growth_mb": peak_rss_mb() - baseline,
+        "groups": n_groups,
+        "failed_groups": len(errors),
+        "mape": _mean_score([mape for mape, _ in scores]),
+        "rmse": _mean_score([rmse for _, rmse in scores]),
+    }
+
+def _mean_score(values):
+    values = [value for value in values if value is not None]
+    return float(np.mean(values)) if values else None
+
+# Child process entry point, so peak RSS is measured per case from a clean interpreter
+def _run_case(queue, mode, model_choice, n_points, params, seed, n_groups, workers):
+    try:
+        if mode == "grouped":
+            result = _grouped_case(model_choice, n_points, params, seed, n_groups, workers)
+        else:
+            result = _single_case(model_choice, n_points, params, seed)
+        result["status"] = "ok"
+    except Exception as e:
+        result = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+    queue.put(result)
+
+def run_case(mode, model_choice, n_points, params=None, seed=0, n_groups=10, workers=None, timeout=600):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_run_case, args=(queue, mode, model_choice, n_points, params, seed, n_groups, workers)
+    )
+    start = time.perf_counter()
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        result = {"status": "timeout"}
+    elif queue.empty():
+        result = {"status": "error", "error": f"worker exited with code {process.exitcode}"}
+    else:
+        result = queue.get()
+    result.update({
+        "mode": mode,
+        "model": model_choice,
+        "points": n_points,
+        "params": params or {},
+        "wall_s": time.perf_counter() - start,
+    })
+    return result
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_benchmarks(models, sizes, modes, n_groups=10, workers=None, timeout=600, no_limits=False, log=print):
+    results = []
+    for mode in modes:
+        for model_choice in models:
+            for n_points in sizes:
+                if not no_limits and n_points > MODEL_MAX_POINTS.get(model_choice, n_points):
+                    continue
+                result = run_case(mode, model_choice, n_points, DEFAULT_PARAMS.get(model_choice),
+                                  n_groups=n_groups, workers=workers, timeout=timeout)
+                log(format_result(result))
+                results.append(result)
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "horizon": HORIZON,
+        "results": results,
+    }
+
+def format_result(result):
+    if result["status"] != "ok":
+        return f"{result['mode']:<8} {result['model']:<32} {result['points']:>9}  {result['status']} {result.get('error', '')}"
+    predict = f"{result['predict_s']:.4f}s" if result.get("predict_s") is not None else "-"
+    rmse = f"{result['rmse']:.3f}" if result.get("rmse") is not None else "-"
+    rss = max(result["peak_rss_mb"], result.get("worker_peak_rss_mb") or 0.0)
+    return (f"{result['mode']:<8} {result['model']:<32} {result['points']:>9}  "
+            f"fit+forecast {result['fit_forecast_s']:9.3f}s  predict {predict:>9}  rss {rss:8.1f} MB  rmse {rmse}")
+
+# Older result files recorded the fit time as fit_s
+def _fit_forecast_s(result):
+    return result.get("fit_forecast_s", result.get("fit_s"))
+
+# Cases whose fit+forecast or predict time grew by more than `threshold` times, or whose RMSE grew by more
+# than `rmse_threshold` times, against a baseline run
+def compare_runs(baseline, current, threshold=1.5, rmse_threshold=1.1):
+    def key(result):
+        return result["mode"], result["model"], result["points"]
+
+    previous = {key(result): result for result in baseline["results"] if result["status"] == "ok"}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(key(result))
+        if old is None or result["status"] != "ok":
+            continue
+        checks = [("fit_forecast_s", _fit_forecast_s(old), _fit_forecast_s(result), threshold),
+                  ("predict_s", old.get("predict_s"), result.get("predict_s"), threshold),
+                  ("rmse", old.get("rmse"), result.get("rmse"), rmse_threshold)]
+        for metric, before, after, limit in checks:
+            if before is None or after is None or before <= 0:
+                continue
+            if after / before > limit:
+                regressions.append({"mode": result["mode"], "model": result["model"], "points": result["points"],
+                                    "metric": metric, "before": before, "after": after, "ratio": after / before})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the forecasting models on synthetic seasonal series.")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_CHOICE_BACKENDS), help="Model names as shown in the app")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--modes", nargs="+", choices=["single", "grouped"], default=["single", "grouped"])
+    parser.add_argument("--groups", type=int, default=10, help="Number of series in grouped mode")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size in grouped mode")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds before a case is abandoned")
+    parser.add_argument("--no-limits", action="store_true", help="Ignore the per-model size caps")
+    parser.add_argument("--output", help="Result JSON path (default benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result JSON to check for time and accuracy regressions")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Time ratio reported as a regression")
+    parser.add_argument("--rmse-threshold", type=float, default=1.1, help="RMSE ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    run = run_benchmarks(args.models, sorted(args.sizes), args.modes, args.groups, args.workers,
+                         args.timeout, args.no_limits)
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{run['timestamp'].replace(':', '')}_{run['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_runs(json.load(f), run, args.threshold, args.rmse_threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['mode']} {regression['model']} {regression['points']} "
+                  f"{regression['metric']}: {regression['before']:.4g} -> {regression['after']:.4g} "
+                  f"({regression['ratio']:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+MAX_POINTS_PER_LINE = 2000
+MAX_CACHED_CHARTS = 64
+MAX_LINES = 10
+
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+
+# Largest-Triangle-Three-Buckets downsampling; returns indices of the points to keep
+def lttb_indices(x, y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (n_out - 2)
+    # Bucket i covers [starts[i], starts[i + 1]); first and last points are kept as-is
+    starts = (np.arange(n_out - 1) * every).astype(np.int64) + 1
+    starts[-1] = n - 1
+    counts = np.diff(np.append(starts, n))
+    bucket_x = np.add.reduceat(x, starts) / counts
+    bucket_y = np.add.reduceat(y, starts) / counts
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = starts[i], starts[i + 1]
+        # Triangle area between the previous pick, each candidate and the next bucket's average
+        area = np.abs(
+            (x[a] - bucket_x[i + 1]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (bucket_y[i + 1] - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+# Downsample a line for plotting, ignoring missing values
+def downsample(x, y, max_points=MAX_POINTS_PER_LINE):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+    if not valid.all():
+        x, y = x[valid], y[valid]
+    keep = lttb_indices(x, y, max_points)
+    return x[keep], y[keep]
+
+def _as_lines(forecast):
+    if isinstance(forecast, pd.DataFrame):
+        return [(str(col), forecast[col].to_numpy(dtype=np.float64)) for col in forecast.columns[:MAX_LINES]]
+    return [("Forecast", np.asarray(forecast, dtype=np.float64))]
+
+def _chart_key(title, ylabel, history, lines, intervals):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{title}|{ylabel}".encode())
+    if history is not None:
+        digest.update(history.tobytes())
+    for label, values in lines:
+        digest.update(label.encode())
+        digest.update(values.tobytes())
+    if intervals is not None:
+        digest.update(np.asarray(intervals[0], dtype=np.float64).tobytes())
+        digest.update(np.asarray(intervals[1], dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+# Forecasts as long as the history are in-sample (e.g. moving average); shorter ones continue after it
+def _forecast_offset(history_len, forecast_len):
+    return 0 if forecast_len >= history_len else history_len
+
+def _draw(title, ylabel, history, lines, intervals):
+    fig = Figure(figsize=(8, 4), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    history_len = len(history) if history is not None else 0
+
+    if history is not None:
+        ax.plot(*downsample(np.arange(history_len), history), color="0.45", linewidth=1, label="History")
+    for label, values in lines:
+        offset = _forecast_offset(history_len, len(values))
+        ax.plot(*downsample(np.arange(offset, offset + len(values)), values), linewidth=1.5, label=label)
+    if intervals is not None:
+        lower = np.asarray(intervals[0], dtype=np.float64)
+        upper = np.asarray(intervals[1], dtype=np.float64)
+        # Intervals cover the tail of the (first) forecast line
+        forecast_len = len(lines[0][1])
+        start = _forecast_offset(history_len, forecast_len) + forecast_len - len(lower)
+        positions = np.arange(start, start + len(lower))
+        if len(lower) > MAX_POINTS_PER_LINE:
+            keep = np.linspace(0, len(lower) - 1, MAX_POINTS_PER_LINE).astype(np.int64)
+            positions, lower, upper = positions[keep], lower[keep], upper[keep]
+        ax.fill_between(positions, lower, upper, alpha=0.2, label="Interval")
+
+    ax.set_title(title)
+    ax.set_xlabel("Time")
+    ax.set_ylabel(ylabel)
+    ax.legend(loc="best")
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    fig.clear()
+    return buffer.getvalue()
+
+# PNG of history, forecast line(s) and optional (lower, upper) intervals, cached by content
+def render_forecast_chart(forecast, title, ylabel, history=None, intervals=None):
+    history = np.asarray(history, dtype=np.float64) if history is not None else None
+    lines = _as_lines(forecast)
+    key = _chart_key(title, ylabel, history, lines, intervals)
+    with _chart_cache_lock:
+        if key in _chart_cache:
+            _chart_cache.move_to_end(key)
+            return _chart_cache[key]
+
+    png = _draw(title, ylabel, history, lines, intervals)
+    with _chart_cache_lock:
+        _chart_cache[key] = png
+        while len(_chart_cache) > MAX_CACHED_CHARTS:
+            _chart_cache.popitem(last=False)
+    return png
@@ -3,6 +3,12 @@ import pandas as pd
 import numpy as np
 from io import StringIO
 from forecasting import apply_forecasting
+from ingestion import is_supported_file, read_compact_data
+from instrumentation import stage
+from batch_forecasting import detect_group_column
+from dataset_store import get_dataset_store
+from stats_engine import DatasetStats
+from transform_pipeline import TransformPipeline, describe_step, make_step
 
 # Templates for Forecasting Data
 TEMPLATES = {
@@ -32,20 +38,48 @@ def download_template(template_name):
     buffer.seek(0)
     return buffer.getvalue()
 
+# Read an upload in chunks, cleaning and deduplicating as it streams in. The result is kept in the dataset
+# store under the upload's file_id and size, so reruns (every widget click) reuse it instead of reading again.
+def load_uploaded_data(file):
+    if not is_supported_file(file.name):
+        st.error("Unsupported file format. Please upload a CSV, Excel, Parquet or Arrow file.")
+        return None, None, None
+    store = get_dataset_store()
+    upload_key = (getattr(file, "file_id", None) or file.name, file.size)
+    cached = st.session_state.get("upload_read")
+    if cached is not None and cached["key"] == upload_key:
+        data = store.get(st.session_state.session_key, "upload")
+        if data is not None:
+            return data, cached["memory"], cached["content_hash"]
+    try:
+        with stage("upload", file=file.name):
+            data, memory, content_hash = read_compact_data(file)
+    except Exception as e:
+        st.error(f"Could not read '{file.name}': {e}")
+        return None, None, None
+    store.put(st.session_state.session_key, "upload", data)
+    st.session_state.upload_read = {"key": upload_key, "memory": memory, "content_hash": content_hash}
+    return data, memory, content_hash
+
+# Memory of the upload in pandas' default dtypes versus after compaction
+def show_memory_report(report):
+    before, after = report["mb_before"].sum(), report["mb_after"].sum()
+    saved = (1 - after / before) * 100 if before else 0.0
+    st.caption(f"Memory: {before:.1f} MB with default dtypes, {after:.1f} MB after compaction ({saved:.0f}% smaller)")
+    with st.expander("Memory by column"):
+        st.dataframe(report.style.format({"mb_before": "{:.2f}", "mb_after": "{:.2f}", "saved_pct": "{:.0f}%"}))
+
 # Main function to handle data transformations
 def process_uploaded_data(file):
-    if file.name.endswith('.csv'):
-        data = pd.read_csv(file)
-    elif file.name.endswith('.xlsx'):
-        data = pd.read_excel(file)
-    else:
-        st.error("Unsupported file format. Please upload a CSV or Excel file.")
+    data, memory, content_hash = load_uploaded_data(file)
+    if data is None:
         return None
+    show_memory_report(memory)
 
-    # Initial data cleaning
-    data.dropna(how='all', inplace=True)
-    data.drop_duplicates(inplace=True)
-    data.reset_index(drop=True, inplace=True)
+    # Transformations are recorded as pipeline steps and replayed on the fresh upload each rerun
+    pipeline = get_transform_pipeline()
+    # Checkpoints are keyed on the cleaned content, so a different file with the same name never reuses them
+    source_key = content_hash
 
     st.subheader("Data Cleaning and Transformation Options")
     operations = ["Fill Missing Values", "Remove Blanks", "Remove Columns",
@@ -58,28 +92,43 @@ def process_uploaded_data(file):
         for idx, op in enumerate(operations[i:i + 3]):
             with cols[idx]:
                 if st.button(op):
-                    if op == "Fill Missing Values":
-                        data = fill_missing_values(data)
-                    elif op == "Remove Blanks":
-                        data = remove_blanks(data)
-                    elif op == "Remove Columns":
-                        data = remove_columns(data)
-                    elif op == "Add Column(s)":
-                        data = add_columns(data)
-                    elif op == "Add Calculations":
-                        data = add_calculations(data)
-                    elif op == "Normalize Data":
-                        data = normalize_data(data)
-                        st.success("Data normalized.")
-                    elif op == "Calculate Statistics":
-                        calculate_statistics(data)
-                    elif op == "Transform Dates":
-                        data = transform_dates(data)
-                    elif op == "Rename Columns":
-                        data = rename_columns(data)
-
-                    st.write("Transformed Data Preview:")
-                    st.dataframe(data.head())
+                    st.session_state.active_operation = op
+
+    upload = data
+    with stage("transform", steps=len(pipeline.steps)):
+        data = pipeline.apply(upload, source_key)
+    update_dataset_stats(upload, data, source_key, pipeline.steps)
+    op = st.session_state.get("active_operation")
+    step = None
+    if op == "Fill Missing Values":
+        step = fill_missing_values(data)
+    elif op == "Remove Blanks":
+        step = remove_blanks(data)
+    elif op == "Remove Columns":
+        step = remove_columns(data)
+    elif op == "Add Column(s)":
+        step = add_columns(data)
+    elif op == "Add Calculations":
+        step = add_calculations(data)
+    elif op == "Normalize Data":
+        step = normalize_data(data)
+    elif op == "Calculate Statistics":
+        calculate_statistics(data)
+    elif op == "Transform Dates":
+        step = transform_dates(data)
+    elif op == "Rename Columns":
+        step = rename_columns(data)
+
+    if step is not None:
+        pipeline.add_step(step)
+        st.session_state.active_operation = None
+        with stage("transform", op=step["op"], steps=len(pipeline.steps)):
+            data = pipeline.apply(upload, source_key)
+        update_dataset_stats(upload, data, source_key, pipeline.steps)
+        st.write("Transformed Data Preview:")
+        st.dataframe(data.head())
+
+    show_transform_plan(pipeline)
 
     # Forecasting options - models only run when "Run Model" is clicked
     st.subheader("Forecasting Options")
@@ -87,50 +136,92 @@ def process_uploaded_data(file):
 
     return data
 
-# Transformation functions remain the same
+# Column and group statistics, computed once per upload and then updated step by step
+def update_dataset_stats(upload, data, source_key, steps):
+    cached = st.session_state.get("dataset_stats")
+    if cached is None or cached["source_key"] != source_key:
+        with stage("statistics", rows=len(upload)):
+            base = DatasetStats.from_frame(upload, detect_group_column(upload))
+        cached = {"source_key": source_key, "base": base, "current": base.copy()}
+        st.session_state.dataset_stats = cached
+    current = cached["current"]
+    if steps[:len(current.steps)] != current.steps:
+        # Undo, clear or a loaded plan: replay from the upload's statistics
+        current = cached["base"].copy()
+    cached["current"] = current.sync(data, steps)
+    return cached["current"]
+
+def get_dataset_stats():
+    cached = st.session_state.get("dataset_stats")
+    return cached["current"] if cached else None
+
+def get_transform_pipeline():
+    if "transform_pipeline" not in st.session_state:
+        st.session_state.transform_pipeline = TransformPipeline(session_id=st.session_state.session_key)
+    return st.session_state.transform_pipeline
+
+# Recorded steps, with undo and export/import so a plan can be replayed on next month's file
+def show_transform_plan(pipeline):
+    with st.expander(f"Transformation plan ({len(pipeline.steps)} steps)"):
+        for number, step in enumerate(pipeline.steps, start=1):
+            st.write(f"{number}. {describe_step(step)}")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("Undo Last Step", disabled=not pipeline.steps):
+                pipeline.undo()
+                st.rerun()
+        with col2:
+            if st.button("Clear Plan", disabled=not pipeline.steps):
+                pipeline.clear()
+                st.rerun()
+        with col3:
+            st.download_button("Download Plan", pipeline.to_json(), "transform_plan.json", "application/json")
+
+        plan_file = st.file_uploader("Load a saved plan", type=["json"], key="plan_uploader")
+        if plan_file is not None and st.button("Apply Saved Plan"):
+            try:
+                loaded = TransformPipeline.from_json(plan_file.getvalue().decode("utf-8"),
+                                                     session_id=st.session_state.session_key)
+                pipeline.clear()  # release the old plan's checkpoints
+                st.session_state.transform_pipeline = loaded
+                st.rerun()
+            except (ValueError, KeyError, TypeError) as e:
+                st.error(f"Invalid transformation plan: {e}")
+
+# Transformation functions render their options and return a pipeline step once applied
 def fill_missing_values(data):
     st.subheader("Fill Missing Values")
     fill_method = st.selectbox("Fill method", ["Mean", "Median", "Mode", "Custom Value"])
-    numeric_cols = data.select_dtypes(include=[np.number]).columns
 
     if fill_method == "Custom Value":
         fill_value = st.text_input("Enter custom fill value:")
         if st.button("Apply Custom Fill"):
-            data.fillna(fill_value, inplace=True)
+            return make_step("fill_missing", method=fill_method, value=fill_value)
     else:
         if st.button(f"Apply {fill_method} Fill"):
-            if fill_method == "Mean":
-                data[numeric_cols] = data[numeric_cols].fillna(data[numeric_cols].mean())
-            elif fill_method == "Median":
-                data[numeric_cols] = data[numeric_cols].fillna(data[numeric_cols].median())
-            elif fill_method == "Mode":
-                data = data.fillna(data.mode().iloc[0])
-    return data
-
-# Other transformation functions (remove_blanks, remove_columns, add_columns, etc.) remain unchanged
-
+            return make_step("fill_missing", method=fill_method)
+    return None
 
 def remove_blanks(data):
     if st.button("Remove Blank Rows and Columns"):
-        data.dropna(how='all', inplace=True)
-        data.dropna(axis=1, how='all', inplace=True)
         st.success("All blank rows and columns removed.")
-    return data
+        return make_step("remove_blanks")
+    return None
 
 def remove_columns(data):
     cols_to_remove = st.multiselect("Select columns to remove", data.columns)
     if st.button("Remove Selected Columns"):
-        data.drop(columns=cols_to_remove, inplace=True)
         st.success("Selected columns removed.")
-    return data
+        return make_step("remove_columns", columns=list(cols_to_remove))
+    return None
 
 def add_columns(data):
     new_col_name = st.text_input("New column name")
     default_value = st.text_input("Default value for new column")
     if st.button("Add Column"):
-        data[new_col_name] = default_value
         st.success(f"Column '{new_col_name}' added with default value '{default_value}'.")
-    return data
+        return make_step("add_column", name=new_col_name, value=default_value)
+    return None
 
 def add_calculations(data):
     calc_type = st.selectbox("Choose calculation type", ["Rolling Average", "Growth Percentage", "Cumulative Sum"])
@@ -140,44 +231,43 @@ def add_calculations(data):
     if calc_type == "Rolling Average":
         window = st.number_input("Window size", min_value=1, step=1, value=3)
         if st.button("Apply Rolling Average"):
-            data[f"{target_col}_rolling_avg"] = data[target_col].rolling(window=window).mean()
             st.success(f"Rolling average with window size {window} added to '{target_col}'.")
+            return make_step("rolling_average", column=target_col, window=int(window))
     elif calc_type == "Growth Percentage":
         if st.button("Calculate Growth Percentage"):
-            data[f"{target_col}_growth_pct"] = data[target_col].pct_change() * 100
             st.success(f"Growth percentage calculated for '{target_col}'.")
+            return make_step("growth_pct", column=target_col)
     elif calc_type == "Cumulative Sum":
         if st.button("Calculate Cumulative Sum"):
-            data[f"{target_col}_cumsum"] = data[target_col].cumsum()
             st.success(f"Cumulative sum calculated for '{target_col}'.")
-    return data
+            return make_step("cumsum", column=target_col)
+    return None
 
 def normalize_data(data):
-    numeric_cols = data.select_dtypes(include=[np.number]).columns
-    data[numeric_cols] = (data[numeric_cols] - data[numeric_cols].mean()) / data[numeric_cols].std()
     st.success("Data normalized.")
-    return data
+    return make_step("normalize")
 
 def calculate_statistics(data):
     st.write("Statistical Summary:")
-    st.write(data.describe())
+    stats = get_dataset_stats()
+    st.write(stats.describe() if stats is not None else data.describe())
     return data  # No modification, but return data for consistency
 
 def transform_dates(data):
-    date_cols = data.select_dtypes(include=['object', 'datetime']).columns
+    date_cols = data.select_dtypes(include=['object', 'category', 'datetime']).columns
     if len(date_cols) > 0:
         selected_col = st.selectbox("Select date column to transform", date_cols)
         if st.button("Transform Date Column"):
-            data[selected_col] = pd.to_datetime(data[selected_col], errors='coerce')
             st.success(f"Date column '{selected_col}' transformed to datetime.")
+            return make_step("parse_dates", column=selected_col)
     else:
         st.warning("No date columns available to transform.")
-    return data
+    return None
 
 def rename_columns(data):
     selected_col = st.selectbox("Select column to rename", data.columns)
     new_name = st.text_input("New column name")
     if st.button("Rename Column"):
-        data.rename(columns={selected_col: new_name}, inplace=True)
         st.success(f"Column '{selected_col}' renamed to '{new_name}'.")
-    return data
+        return make_step("rename_columns", mapping={selected_col: new_name})
+    return None
@@ -0,0 +1,170 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_MAX_BYTES = int(os.environ.get("DATASET_STORE_MB", "1024")) * 1024 ** 2
+DEFAULT_SPILL_DIR = os.environ.get("DATASET_STORE_DIR") or os.path.join(tempfile.gettempdir(), "aiforecaster_datasets")
+# Sessions untouched for this long are dropped entirely (browser closed without logging out)
+DEFAULT_MAX_IDLE_SECONDS = int(os.environ.get("DATASET_STORE_IDLE_HOURS", "24")) * 3600
+
+logger = logging.getLogger("aiforecaster.datasets")
+
+def frame_bytes(frame):
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+class _StoredDataset:
+    def __init__(self, frame, size):
+        self.frame = frame  # None while cold
+        self.size = size
+        self.path = None  # Arrow file holding the current version, if spilled
+        self.spillable = True  # False once Arrow failed to write it; it then stays in memory
+        self.touched = time.time()
+
+class DatasetStore:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, spill_dir=DEFAULT_SPILL_DIR, max_idle_seconds=DEFAULT_MAX_IDLE_SECONDS):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_idle_seconds = max_idle_seconds
+        self._datasets = OrderedDict()  # (session_id, name) -> _StoredDataset, least recently used first
+        self._hot_bytes = 0
+        self._lock = threading.RLock()
+        os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, session_id, name):
+        safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in f"{session_id}_{name}")
+        return os.path.join(self.spill_dir, f"{safe}_{time.time_ns()}.arrow")
+
+    def put(self, session_id, name, frame):
+        key = (session_id, name)
+        with self._lock:
+            existing = self._datasets.get(key)
+            if existing is not None and existing.frame is frame:
+                existing.touched = time.time()
+                self._datasets.move_to_end(key)
+                return
+            self._discard(key)
+            stored = _StoredDataset(frame, frame_bytes(frame))
+            self._datasets[key] = stored
+            self._hot_bytes += stored.size
+            self._evict(keep=key)
+            self._purge_idle()
+
+    def get(self, session_id, name):
+        key = (session_id, name)
+        with self._lock:
+            stored = self._datasets.get(key)
+            if stored is None:
+                return None
+            stored.touched = time.time()
+            self._datasets.move_to_end(key)
+            if stored.frame is None:
+                stored.frame = self._load(stored.path)
+                self._hot_bytes += stored.size
+                self._evict(keep=key)
+            return stored.frame
+
+    def drop(self, session_id, name=None):
+        with self._lock:
+            keys = [key for key in self._datasets if key[0] == session_id and (name is None or key[1] == name)]
+            for key in keys:
+                self._discard(key)
+
+    def _discard(self, key):
+        stored = self._datasets.pop(key, None)
+        if stored is None:
+            return
+        if stored.frame is not None:
+            self._hot_bytes -= stored.size
+        if stored.path and os.path.exists(stored.path):
+            try:
+                os.remove(stored.path)
+            except OSError:
+                pass  # Still memory-mapped on Windows; the temp dir is cleaned eventually
+
+    # Spill least recently used frames to disk until hot frames fit the budget. A frame Arrow cannot write
+    # (mixed-type object columns, duplicate or non-string column names) stays in memory; the failure is
+    # logged rather than raised into whichever session's put or get triggered the eviction.
+    def _evict(self, keep=None):
+        for key, stored in list(self._datasets.items()):
+            if self._hot_bytes <= self.max_bytes:
+                break
+            if key == keep or stored.frame is None or not stored.spillable:
+                continue
+            if stored.path is None:
+                path = self._spill_path(*key)
+                try:
+                    self._write(stored.frame, path)
+                except Exception as e:
+                    stored.spillable = False
+                    logger.warning("Keeping dataset %r in memory; it could not be spilled: %s: %s",
+                                   key[1], type(e).__name__, e)
+                    continue
+                stored.path = path
+            stored.frame = None
+            self._hot_bytes -= stored.size
+
+    def _purge_idle(self):
+        cutoff = time.time() - self.max_idle_seconds
+        for key in [key for key, stored in self._datasets.items() if stored.touched < cutoff]:
+            self._discard(key)
+
+    # Uncompressed Arrow IPC so the file can be memory-mapped and read back without copying
+    def _write(self, frame, path):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        tmp_path = f"{path}.tmp"
+        try:
+            feather.write_feather(pa.Table.from_pandas(frame, preserve_index=True), tmp_path,
+                                  compression="uncompressed")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _load(self, path):
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        return table.to_pandas(split_blocks=True)
+
+    # Memory held per session: bytes in RAM, bytes only on disk, dataset count
+    def usage(self):
+        with self._lock:
+            rows = {}
+            for (session_id, _), stored in self._datasets.items():
+                row = rows.setdefault(session_id, {"session": session_id, "hot_mb": 0.0, "spilled_mb": 0.0, "datasets": 0})
+                row["datasets"] += 1
+                if stored.frame is not None:
+                    row["hot_mb"] += stored.size / 1024 ** 2
+                else:
+                    row["spilled_mb"] += stored.size / 1024 ** 2
+            return pd.DataFrame(list(rows.values()), columns=["session", "hot_mb", "spilled_mb", "datasets"])
+
+    def session_usage(self, session_id):
+        usage = self.usage()
+        row = usage[usage["session"] == session_id]
+        if row.empty:
+            return {"hot_mb": 0.0, "spilled_mb": 0.0, "datasets": 0}
+        return row.iloc[0][["hot_mb", "spilled_mb", "datasets"]].to_dict()
+
+    def stats(self):
+        with self._lock:
+            return {"hot_bytes": self._hot_bytes, "max_bytes": self.max_bytes, "datasets": len(self._datasets)}
+
+_dataset_store = None
+_dataset_store_lock = threading.Lock()
+
+# Process-wide store shared by every session
+def get_dataset_store():
+    global _dataset_store
+    if _dataset_store is None:
+        with _dataset_store_lock:
+            if _dataset_store is None:
+                _dataset_store = DatasetStore()
+    return _dataset_store
@@ -0,0 +1,131 @@
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+
+import numpy as np
+import pandas as pd
+
+from backtesting import backtest_model, rolling_origins
+from forecast_models import run_model, with_horizon
+
+DEFAULT_BUDGET_SECONDS = 30
+WEIGHTINGS = ("equal", "backtest")
+
+# Worker: fit one member and send its forecast, then (for backtest weights) its rolling-origin RMSE.
+# The forecast goes first so a member that runs out of time while scoring still contributes.
+def _member_worker(conn, frame, target_col, model_choice, params, horizon, origins):
+    try:
+        forecast = run_model(frame, target_col, model_choice, with_horizon(model_choice, params, horizon))
+        conn.send(("forecast", np.asarray(forecast, dtype=float)[:horizon]))
+        if origins:
+            result = backtest_model(frame, target_col, model_choice, origins, horizon, params)
+            conn.send(("score", result["rmse"] if result["error"] is None else np.nan))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+# Inverse-MSE weights from backtest RMSE; members without a score get the mean weight of the scored ones
+def member_weights(members, weighting="equal"):
+    finished = [name for name, member in members.items() if member["forecast"] is not None]
+    if not finished:
+        return {}
+    weights = dict.fromkeys(finished, 1.0)
+    if weighting == "backtest":
+        rmse = {name: members[name]["rmse"] for name in finished}
+        scored = {name: 1.0 / value ** 2 for name, value in rmse.items() if np.isfinite(value) and value > 0}
+        if scored:
+            fallback = float(np.mean(list(scored.values())))
+            weights = {name: scored.get(name, fallback) for name in finished}
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+# Weighted mean per step; a member shorter than the horizon only counts for the steps it covers
+def combine_forecasts(forecasts, weights, horizon):
+    stacked = np.full((len(forecasts), horizon), np.nan)
+    for row, values in enumerate(forecasts.values()):
+        stacked[row, :len(values)] = values[:horizon]
+    w = np.array([weights[name] for name in forecasts])[:, np.newaxis] * np.isfinite(stacked)
+    with np.errstate(invalid="ignore"):
+        return pd.Series(np.nansum(stacked * w, axis=0) / w.sum(axis=0))
+
+# Fit every model in its own process at once and combine the forecasts that finish within budget_seconds.
+# Members still running at the deadline are terminated, so latency is bounded by the budget rather than by
+# the slowest model. params maps model -> its parameters. Returns (forecast, members table).
+def run_ensemble(data, target_col, models, horizon=10, budget_seconds=DEFAULT_BUDGET_SECONDS, weighting="equal",
+                 folds=3, params=None, progress_callback=None):
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"Unknown weighting '{weighting}'. Choose one of: {', '.join(WEIGHTINGS)}.")
+    if not models:
+        raise ValueError("Choose at least one model for the ensemble.")
+    frame = data[[col for col in ("date", target_col) if col in data.columns]].dropna(subset=[target_col])
+    frame = frame.reset_index(drop=True)
+    origins = rolling_origins(len(frame), horizon, folds) if weighting == "backtest" else []
+    if weighting == "backtest" and not origins:
+        raise ValueError(f"Need more than {max(3 * horizon, 20) + horizon} observations for backtest weights.")
+
+    params = params or {}
+    start = time.monotonic()
+    deadline = start + budget_seconds
+    members, running = {}, {}
+    try:
+        for model_choice in models:
+            member_params = dict(params.get(model_choice, {}))
+            if member_params.get("auto"):
+                member_params["search_jobs"] = 1  # each member already has its own process
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_member_worker,
+                args=(sender, frame, target_col, model_choice, member_params, horizon, origins),
+            )
+            process.start()
+            sender.close()
+            members[model_choice] = {"status": "running", "forecast": None, "rmse": np.nan,
+                                     "seconds": np.nan, "error": None}
+            running[receiver] = (model_choice, process)
+
+        while running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for receiver in wait(list(running), timeout=remaining):
+                model_choice, process = running[receiver]
+                member = members[model_choice]
+                try:
+                    kind, payload = receiver.recv()
+                except EOFError:
+                    kind, payload = "closed", None
+                if kind == "forecast":
+                    member.update(status="done", forecast=payload, seconds=time.monotonic() - start)
+                    if origins:
+                        continue  # keep listening for the score
+                elif kind == "score":
+                    member["rmse"] = payload
+                elif kind == "error" and member["forecast"] is not None:
+                    member["error"] = f"Backtest failed: {payload}"  # the forecast still counts
+                elif kind == "error":
+                    member.update(status="failed", error=payload, seconds=time.monotonic() - start)
+                elif member["status"] == "running":
+                    member.update(status="failed", error=f"Worker exited with code {process.exitcode}.")
+                del running[receiver]
+                receiver.close()
+                process.join(timeout=1)
+                if progress_callback is not None:
+                    progress_callback(len(models) - len(running), len(models))
+    finally:
+        for receiver, (model_choice, process) in running.items():
+            process.terminate()
+            process.join(timeout=1)
+            receiver.close()
+            if members[model_choice]["status"] == "running":
+                members[model_choice].update(status="timed out", error=f"No forecast within {budget_seconds}s.")
+
+    weights = member_weights(members, weighting)
+    finished = {name: members[name]["forecast"] for name in weights}
+    forecast = combine_forecasts(finished, weights, horizon) if finished else pd.Series(dtype=float)
+    table = pd.DataFrame([
+        {"model": name, "status": member["status"], "weight": weights.get(name, 0.0),
+         "rmse": member["rmse"], "seconds": member["seconds"], "error": member["error"]}
+        for name, member in members.items()
+    ])
+    return forecast, table
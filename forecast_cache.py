@@ -0,0 +1,197 @@
+import hashlib
+import itertools
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Bump when model code changes in a way that should invalidate cached fits on disk
+CACHE_VERSION = 2
+
+DEFAULT_MAX_BYTES = int(os.environ.get("FORECAST_CACHE_MB", "256")) * 1024 ** 2
+DEFAULT_DISK_DIR = os.environ.get("FORECAST_CACHE_DIR") or None
+
+# Fast content hash of a Series/DataFrame (values and index), vectorized via pandas
+def hash_pandas(obj):
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(obj, pd.DataFrame):
+        digest.update("|".join(map(str, obj.columns)).encode())
+    else:
+        digest.update(str(obj.name).encode())
+    digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+# Cache key for a series plus the model name and its hyperparameters
+def make_cache_key(series, model_name, params=None):
+    params_repr = repr(sorted((params or {}).items()))
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{CACHE_VERSION}|{model_name}|{params_repr}|".encode())
+    digest.update(hash_pandas(series).encode())
+    return digest.hexdigest()
+
+# Containers and objects are walked this many levels deep when estimating an entry's size
+MAX_SIZE_DEPTH = 6
+# Bytes per Keras parameter: float32 weights plus the two Adam slots kept per weight
+KERAS_BYTES_PER_PARAM = 4 * 3
+
+# Rough in-memory size without serializing: arrays and frames by their buffers, other objects by walking
+# their attributes. Keras models are sized from their parameter count.
+def estimate_size(obj, _seen=None, _depth=0):
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen or _depth > MAX_SIZE_DEPTH:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if _is_keras_model(obj):
+        try:
+            return int(obj.count_params()) * KERAS_BYTES_PER_PARAM
+        except Exception:
+            return 0  # not built yet
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        items = itertools.chain(obj.keys(), obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = obj
+    elif hasattr(obj, "__dict__"):
+        items = vars(obj).values()
+    else:
+        return size
+    return size + sum(estimate_size(item, seen, _depth + 1) for item in items)
+
+def _is_keras_model(obj):
+    return hasattr(obj, "count_params") and hasattr(obj, "input_shape")
+
+# Approximate in-memory size of an entry; returns (size, picklable). Keras models do not pickle.
+def _entry_size(entry):
+    return estimate_size(entry), not _is_keras_model(entry.get("model"))
+
+class ForecastCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=DEFAULT_DISK_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # key -> (entry, size, picklable)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        entry = self._load_from_disk(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._insert(key, entry, spill=False)
+        return entry
+
+    def put(self, key, model, forecast):
+        entry = {"model": model, "forecast": forecast, "created": time.time()}
+        self._insert(key, entry, spill=True)
+        return entry
+
+    def _insert(self, key, entry, spill):
+        size, picklable = _entry_size(entry)
+        if size > self.max_bytes:
+            # Too large to keep in memory; only the disk copy (if any) survives
+            if spill and picklable:
+                self._write_to_disk(key, entry)
+            return
+
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (entry, size, picklable)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, (old_entry, old_size, old_picklable) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                evicted.append((old_key, old_entry, old_picklable))
+
+        # Least recently used entries spill to disk instead of being dropped
+        for old_key, old_entry, old_picklable in evicted:
+            if old_picklable:
+                self._write_to_disk(old_key, old_entry)
+
+    def _write_to_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Forecast cache spill failed: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Forecast cache read failed: {e}")
+            return None
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if disk and self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+_forecast_cache = None
+_forecast_cache_lock = threading.Lock()
+
+# Process-wide cache shared by every session and rerun
+def get_forecast_cache():
+    global _forecast_cache
+    if _forecast_cache is None:
+        with _forecast_cache_lock:
+            if _forecast_cache is None:
+                _forecast_cache = ForecastCache()
+    return _forecast_cache
@@ -0,0 +1,259 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from batch_forecasting import default_workers, detect_group_column, forecast_by_group
+from forecast_models import MODEL_CHOICES, run_model, with_horizon
+from ingestion import is_supported_file, read_clean_data
+from transform_pipeline import TransformPipeline
+
+DEFAULT_OUTPUT_DIR = "batch_output"
+MANIFEST_FILE = "manifest.jsonl"
+SUMMARY_FILE = "summary.json"
+# Files held by the pool at once per worker; bounds memory to a few cleaned frames per process
+IN_FLIGHT_PER_WORKER = 2
+# Recycle worker processes after this many files so fragmentation and leaked model state do not grow
+# (max_tasks_per_child needs Python 3.11+; older interpreters keep their workers for the whole run)
+FILES_PER_WORKER = 50
+POOL_OPTIONS = {"max_tasks_per_child": FILES_PER_WORKER} if sys.version_info >= (3, 11) else {}
+
+# Directory (all supported files in it) or glob pattern, in a stable order
+def find_input_files(source):
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path) and is_supported_file(path))
+
+# Identifies a file's content and the run settings, so a changed file or setting is forecast again
+def file_fingerprint(path, model_choice, params, target_col):
+    stat = os.stat(path)
+    return json.dumps([os.path.abspath(path), stat.st_size, stat.st_mtime_ns, model_choice, params, target_col],
+                      sort_keys=True, default=str)
+
+# Fingerprints of files a previous run finished successfully
+def load_manifest(output_dir):
+    done = set()
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write leaves a partial last line; that file is simply redone
+                continue
+            if record.get("status") == "ok":
+                done.add(record["fingerprint"])
+    return done
+
+def _append_manifest(manifest, record):
+    manifest.write(json.dumps(record, default=str) + "\n")
+    manifest.flush()
+    os.fsync(manifest.fileno())
+
+# Short path digest keeps same-named files from different directories apart
+def _output_path(output_dir, path, output_format):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=4).hexdigest()
+    return os.path.join(output_dir, "forecasts", f"{stem}-{digest}.{output_format}")
+
+# Write via a temporary file so a crash never leaves a truncated forecast behind
+def _write_forecast(forecast, output_path, output_format):
+    tmp_path = output_path + ".tmp"
+    if output_format == "parquet":
+        forecast.to_parquet(tmp_path)
+    else:
+        forecast.to_csv(tmp_path)
+    os.replace(tmp_path, output_path)
+
+def _pick_target(data, target_col):
+    if target_col is not None:
+        if target_col not in data.columns:
+            raise ValueError(f"Column '{target_col}' not found.")
+        return target_col
+    numeric = data.select_dtypes(include=[np.number]).columns
+    if len(numeric) == 0:
+        raise ValueError("No numeric column to forecast.")
+    return numeric[0]
+
+# Worker: clean, transform and forecast one file, writing its forecast to output_dir/forecasts
+def forecast_file(path, model_choice, params, target_col, plan_json, output_dir, output_format):
+    start = time.perf_counter()
+    data = read_clean_data(path)
+    if plan_json:
+        data = TransformPipeline.from_json(plan_json).apply(data, source_key=path)
+    target_col = _pick_target(data, target_col)
+
+    group_col = detect_group_column(data)
+    group_errors = {}
+    if group_col is not None:
+        # Files are already spread over the pool, so groups run sequentially inside this worker
+        forecast, group_errors = forecast_by_group(data, target_col, model_choice, group_col, params, max_workers=1)
+        if forecast.empty:
+            raise ValueError(f"Every group failed, e.g. {next(iter(group_errors.values()), 'no groups')}")
+    else:
+        forecast = run_model(data, target_col, model_choice, params)
+        forecast = pd.DataFrame({target_col: np.asarray(forecast, dtype=float)})
+        forecast.index.name = "step"
+
+    forecast.columns = forecast.columns.astype(str)  # Parquet needs string column names
+    output_path = _output_path(output_dir, path, output_format)
+    _write_forecast(forecast, output_path, output_format)
+    return {
+        "rows": len(data),
+        "target": target_col,
+        "group_column": group_col,
+        "series": forecast.shape[1],
+        "failed_groups": {str(group): error for group, error in group_errors.items()},
+        "output": output_path,
+        "seconds": time.perf_counter() - start,
+    }
+
+# Forecast every file not already done, appending one manifest line per file as it finishes
+def run_batch(paths, model_choice, params=None, target_col=None, plan_json=None, output_dir=DEFAULT_OUTPUT_DIR,
+              output_format="parquet", workers=None, resume=True, log=print):
+    os.makedirs(os.path.join(output_dir, "forecasts"), exist_ok=True)
+    done = load_manifest(output_dir) if resume else set()
+    pending = []
+    for path in paths:
+        fingerprint = file_fingerprint(path, model_choice, params, target_col)
+        if fingerprint not in done:
+            pending.append((path, fingerprint))
+    skipped = len(paths) - len(pending)
+    if skipped:
+        log(f"Skipping {skipped} file(s) finished by an earlier run")
+
+    workers = min(workers or default_workers(), max(1, len(pending)))
+    counts = {"ok": 0, "error": 0}
+    start = time.perf_counter()
+    manifest_mode = "a" if resume else "w"
+    with open(os.path.join(output_dir, MANIFEST_FILE), manifest_mode) as manifest, \
+            ProcessPoolExecutor(max_workers=workers, **POOL_OPTIONS) as executor:
+        queue = iter(pending)
+        in_flight = {}
+
+        def submit_next():
+            for path, fingerprint in queue:
+                future = executor.submit(forecast_file, path, model_choice, params, target_col, plan_json,
+                                         output_dir, output_format)
+                in_flight[future] = (path, fingerprint)
+                return True
+            return False
+
+        # Only a bounded number of files are queued in the pool at any time
+        for _ in range(workers * IN_FLIGHT_PER_WORKER):
+            if not submit_next():
+                break
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path, fingerprint = in_flight.pop(future)
+                record = {"file": path, "fingerprint": fingerprint, "model": model_choice,
+                          "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+                try:
+                    record.update(future.result(), status="ok")
+                except Exception as e:
+                    record.update(status="error", error=f"{type(e).__name__}: {e}")
+                counts[record["status"]] += 1
+                _append_manifest(manifest, record)
+                log(f"[{counts['ok'] + counts['error']}/{len(pending)}] {record['status']:<5} {path}"
+                    + (f"  {record['error']}" if record["status"] == "error" else ""))
+                submit_next()
+
+    summary = write_summary(output_dir, model_choice, params, output_format)
+    summary["this_run"] = {**counts, "skipped": skipped, "seconds": time.perf_counter() - start}
+    return summary
+
+# Latest manifest record per file, i.e. the current state of every file the output directory has seen
+def read_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    records = {}
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["file"]] = record
+    return pd.DataFrame(list(records.values()))
+
+def write_summary(output_dir, model_choice, params, output_format):
+    manifest = read_manifest(output_dir)
+    ok = manifest[manifest["status"] == "ok"] if not manifest.empty else manifest
+    summary = {
+        "model": model_choice,
+        "params": params or {},
+        "format": output_format,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "files": len(manifest),
+        "succeeded": len(ok),
+        "failed": len(manifest) - len(ok),
+        "rows": int(ok["rows"].sum()) if not ok.empty else 0,
+        "series": int(ok["series"].sum()) if not ok.empty else 0,
+        "fit_seconds": float(ok["seconds"].sum()) if not ok.empty else 0.0,
+        "errors": {} if manifest.empty else {
+            record["file"]: record["error"] for record in manifest.to_dict("records") if record["status"] == "error"
+        },
+    }
+    with open(os.path.join(output_dir, SUMMARY_FILE), "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+    return summary
+
+def read_summary(output_dir):
+    path = os.path.join(output_dir, SUMMARY_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def read_forecast(output_path):
+    if output_path.endswith(".parquet"):
+        return pd.read_parquet(output_path)
+    return pd.read_csv(output_path, index_col="step")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast every data file in a directory or glob.")
+    parser.add_argument("source", help="Directory or glob pattern, e.g. 'uploads/**/*.csv'")
+    parser.add_argument("--model", required=True, choices=MODEL_CHOICES)
+    parser.add_argument("--horizon", type=int, default=10)
+    parser.add_argument("--params", default="{}", help="Extra model parameters as JSON")
+    parser.add_argument("--target", default=None, help="Column to forecast (default: first numeric column)")
+    parser.add_argument("--plan", default=None, help="Transformation plan JSON saved from the Upload page")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Output directory")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-resume", action="store_true", help="Redo files an earlier run already finished")
+    args = parser.parse_args(argv)
+
+    paths = find_input_files(args.source)
+    if not paths:
+        print(f"No supported files found for '{args.source}'.")
+        return 1
+    params = with_horizon(args.model, json.loads(args.params), args.horizon)
+    plan_json = None
+    if args.plan:
+        with open(args.plan) as f:
+            plan_json = f.read()
+        TransformPipeline.from_json(plan_json)  # fail fast on an invalid plan
+
+    summary = run_batch(paths, args.model, params, args.target, plan_json, args.output, args.format,
+                        args.workers, resume=not args.no_resume)
+    run = summary["this_run"]
+    print(f"Done in {run['seconds']:.1f}s: {run['ok']} succeeded, {run['error']} failed, {run['skipped']} skipped. "
+          f"Summary in {os.path.join(args.output, SUMMARY_FILE)}")
+    return 1 if run["error"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+from model_registry import get_model_class, load_backend
+from forecast_cache import get_forecast_cache, make_cache_key
+from instrumentation import stage
+from lag_features import fit_lag_forecaster
+
+MODEL_CHOICES = [
+    "ARIMA", "Prophet", "Moving Average", "Exponential Smoothing",
+    "Linear Regression", "Random Forest", "Support Vector Regression (SVR)", "LSTM Neural Network"
+]
+# Pool-sizing knob, not a thread cap: grouped Prophet runs start default_workers() // PROPHET_CORES_PER_WORKER
+# workers, e.g. to leave cores free for other work on the host. Prophet's bundled Stan model fits on one thread.
+PROPHET_CORES_PER_WORKER = max(1, int(os.environ.get("PROPHET_CORES_PER_WORKER", "1")))
+# Exact SVR is quadratic in the number of rows; above this, kernel="auto" switches to the approximation
+SVR_EXACT_MAX_POINTS = 5_000
+
+# Run a model by its apply_forecasting name
+def run_model(data, target_col, model_choice, params=None, return_model=False):
+    runner = MODEL_RUNNERS[model_choice]
+    return runner(data, target_col, return_model=return_model, **(params or {}))
+
+# Params with the forecast horizon added, for models that take one
+def with_horizon(model_choice, params, horizon):
+    params = dict(params or {})
+    if horizon is not None and "horizon" in inspect.signature(MODEL_RUNNERS[model_choice]).parameters:
+        params["horizon"] = int(horizon)
+    return params
+
+# Run a model, reusing the fitted model and forecast when the same series and parameters were seen before
+def cached_run_model(data, target_col, model_choice, params=None):
+    cache = get_forecast_cache()
+    key_columns = [col for col in ("date", target_col) if col in data.columns]
+    key = make_cache_key(data[key_columns], model_choice, params)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry["model"], entry["forecast"], True
+
+    with stage("fit", model=model_choice, rows=len(data)):
+        model, forecast = run_model(data, target_col, model_choice, params, return_model=True)
+    cache.put(key, model, forecast)
+    return model, forecast, False
+
+# (lower, upper) prediction intervals from a fitted statsmodels result or an interval-enabled Prophet
+def forecast_intervals(model, horizon, alpha=0.05):
+    if getattr(model, "forecast_intervals_", None) is not None:
+        return model.forecast_intervals_
+    if model is None or not hasattr(model, "get_forecast"):
+        return None
+    try:
+        conf_int = np.asarray(model.get_forecast(steps=horizon).conf_int(alpha=alpha))
+    except Exception:
+        return None
+    return conf_int[:, 0], conf_int[:, 1]
+
+# ARIMA Forecast
+def run_arima(data, target_col, order=(1, 1, 1), horizon=10, auto=False, search_jobs=1, return_model=False):
+    ARIMA = get_model_class("arima", "ARIMA")
+    if auto:
+        from order_search import search_arima_order
+        order = search_arima_order(data[target_col].to_numpy(), n_jobs=search_jobs)["order"]
+    model = ARIMA(data[target_col], order=order)
+    model_fit = model.fit()
+    forecast = model_fit.forecast(steps=horizon)
+    return (model_fit, forecast) if return_model else forecast
+
+# Prophet over the future window only. intervals=False sets uncertainty_samples=0, which skips
+# Prophet's sampling (most of its predict time); intervals=True keeps them on the model for plotting.
+def run_prophet(data, target_col, horizon=10, intervals=False, uncertainty_samples=1000, return_model=False):
+    Prophet = get_model_class("prophet", "Prophet")
+    df = data[["date", target_col]].rename(columns={"date": "ds", target_col: "y"})
+    model = Prophet(uncertainty_samples=uncertainty_samples if intervals else 0)
+    model.fit(df)
+    forecast = prophet_predict(model, horizon)
+    return (model, forecast) if return_model else forecast
+
+def prophet_predict(model, horizon):
+    future = model.make_future_dataframe(periods=horizon, include_history=False)
+    prediction = model.predict(future)
+    if model.uncertainty_samples:
+        model.forecast_intervals_ = (prediction["yhat_lower"].to_numpy(), prediction["yhat_upper"].to_numpy())
+    return prediction["yhat"].reset_index(drop=True)
+
+# Fitted Prophet parameters in the form Prophet.fit(init=...) accepts, to warm-start a refit
+def prophet_init_params(model):
+    init = {}
+    for name in ["k", "m", "sigma_obs"]:
+        init[name] = float(model.params[name][0][0])
+    for name in ["delta", "beta"]:
+        init[name] = model.params[name][0]
+    return init
+
+# Moving Average Forecast
+def run_moving_average(data, target_col, window=3, horizon=10, return_model=False):
+    values = data[target_col].dropna().to_numpy(dtype=float)
+    forecast = pd.Series(moving_average_forecast(values, window, horizon))
+    return (None, forecast) if return_model else forecast
+
+# Mean of the last `window` observations, carried flat over the horizon; backtesting scores this same function
+def moving_average_forecast(values, window, horizon):
+    return np.repeat(np.mean(values[-window:]) if len(values) else np.nan, horizon)
+
+# Holt-Winters Exponential Smoothing Forecast
+def run_exponential_smoothing(data, target_col, seasonal_periods=12, trend="add", seasonal="add", horizon=10,
+                              auto=False, search_jobs=1, return_model=False):
+    ExponentialSmoothing = get_model_class("holtwinters", "ExponentialSmoothing")
+    if auto:
+        from order_search import search_holtwinters
+        dates = data["date"].to_numpy() if "date" in data.columns else None
+        config = search_holtwinters(data[target_col].to_numpy(), dates, n_jobs=search_jobs)["config"]
+        model = ExponentialSmoothing(data[target_col], **config)
+    else:
+        model = ExponentialSmoothing(data[target_col], trend=trend, seasonal=seasonal, seasonal_periods=seasonal_periods)
+    model_fit = model.fit()
+    forecast = model_fit.forecast(steps=horizon)
+    return (model_fit, forecast) if return_model else forecast
+
+# Re-run a fitted Holt-Winters model over `values` with its parameters and initial state fixed:
+# one filtering pass, no optimisation
+def refilter_exponential_smoothing(fitted, values):
+    ExponentialSmoothing = get_model_class("holtwinters", "ExponentialSmoothing")
+    spec = fitted.model
+    fixed = fitted.params
+    model = ExponentialSmoothing(
+        values, trend=spec.trend, seasonal=spec.seasonal, seasonal_periods=spec.seasonal_periods,
+        damped_trend=spec.damped_trend, initialization_method="known",
+        initial_level=fixed["initial_level"],
+        initial_trend=fixed["initial_trend"] if spec.trend else None,
+        initial_seasonal=fixed["initial_seasons"] if spec.seasonal else None,
+    )
+    smoothing = {
+        name: fixed[name] for name in ("smoothing_level", "smoothing_trend", "smoothing_seasonal", "damping_trend")
+        if fixed.get(name) is not None and not np.isnan(fixed[name])
+    }
+    return model.fit(optimized=False, **smoothing)
+
+# Linear Regression Forecast on lag, rolling-mean and calendar features
+def run_linear_regression(data, target_col, horizon=10, strategy="recursive", return_model=False):
+    LinearRegression = get_model_class("linear_regression", "LinearRegression")
+    model = fit_lag_forecaster(data, target_col, LinearRegression, horizon, strategy)
+    forecast = model.forecast(horizon)
+    return (model, forecast) if return_model else forecast
+
+# Random Forest Forecast on lag features, using every core for a foreground fit and one inside a pool worker
+# (grouped runs, backtests, batch files, the service, ensemble members), so pools never nest
+def run_random_forest(data, target_col, horizon=10, strategy="recursive", n_estimators=100, return_model=False):
+    from order_search import _in_worker
+
+    RandomForestRegressor = get_model_class("random_forest", "RandomForestRegressor")
+    n_jobs = 1 if _in_worker() else -1
+    model = fit_lag_forecaster(
+        data, target_col, lambda: RandomForestRegressor(n_estimators=n_estimators, n_jobs=n_jobs), horizon, strategy
+    )
+    forecast = model.forecast(horizon)
+    return (model, forecast) if return_model else forecast
+
+# Scaled RBF regressor: exact SVR, or a Nystroem kernel approximation with a linear SVR whose cost is linear in n
+def _make_svr(approximate, n_components):
+    svr = load_backend("svr")
+    if approximate:
+        regressor = svr["make_pipeline"](
+            svr["StandardScaler"](),
+            svr["Nystroem"](kernel="rbf", n_components=n_components, random_state=0),
+            svr["LinearSVR"](dual="auto", max_iter=5000),
+        )
+    else:
+        regressor = svr["make_pipeline"](svr["StandardScaler"](), svr["SVR"](kernel="rbf"))
+    return svr["TransformedTargetRegressor"](regressor=regressor, transformer=svr["StandardScaler"]())
+
+# Support Vector Regression Forecast on lag features; kernel="auto" approximates above SVR_EXACT_MAX_POINTS
+def run_svr(data, target_col, horizon=10, strategy="recursive", kernel="auto", n_components=300, return_model=False):
+    if kernel not in ("auto", "exact", "approximate"):
+        raise ValueError(f"Unknown SVR kernel mode '{kernel}'.")
+    approximate = kernel == "approximate" or (kernel == "auto" and len(data) > SVR_EXACT_MAX_POINTS)
+    model = fit_lag_forecaster(data, target_col, lambda: _make_svr(approximate, n_components), horizon, strategy)
+    forecast = model.forecast(horizon)
+    return (model, forecast) if return_model else forecast
+
+# Input windows and targets over a series; a strided view, no per-row copies
+def lstm_windows(values, sequence_length, n_outputs):
+    windows = np.lib.stride_tricks.sliding_window_view(values, sequence_length + n_outputs)
+    return windows[:, :sequence_length, np.newaxis], windows[:, sequence_length:]
+
+# Forecast from the last window; a multi-output (direct) head predicts every step in one pass
+def lstm_forecast(model, values, horizon):
+    sequence_length = model.input_shape[1]
+    if model.output_shape[-1] > 1:
+        last_sequence = values[-sequence_length:].reshape((1, sequence_length, 1))
+        return pd.Series(np.asarray(model(last_sequence, training=False))[0][:horizon])
+    # Recursive strategy: slide a preallocated buffer instead of rebuilding the input each step
+    buffer = np.empty(sequence_length + horizon, dtype=np.float32)
+    buffer[:sequence_length] = values[-sequence_length:]
+    for step in range(horizon):
+        window = buffer[step:step + sequence_length].reshape((1, sequence_length, 1))
+        buffer[sequence_length + step] = np.asarray(model(window, training=False))[0, 0]
+    return pd.Series(buffer[sequence_length:])
+
+# LSTM Neural Network Forecast
+def run_lstm(data, target_col, horizon=10, sequence_length=10, epochs=10, batch_size=32,
+             direct=True, return_model=False):
+    values = data[target_col].dropna().to_numpy(dtype=np.float32)
+    n_outputs = horizon if direct else 1
+    if len(values) <= sequence_length + n_outputs:
+        raise ValueError(f"LSTM needs more than {sequence_length + n_outputs} observations of '{target_col}'.")
+    X, y = lstm_windows(values, sequence_length, n_outputs)
+
+    # Define LSTM model; the direct head emits every forecast step from one forward pass
+    Sequential = get_model_class("keras", "Sequential")
+    Dense = get_model_class("keras", "Dense")
+    LSTM = get_model_class("keras", "LSTM")
+    model = Sequential()
+    model.add(LSTM(50, activation='relu', input_shape=(sequence_length, 1)))
+    model.add(Dense(n_outputs))
+    model.compile(optimizer='adam', loss='mse')
+    model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=0)
+
+    forecast = lstm_forecast(model, values, horizon)
+    return (model, forecast) if return_model else forecast
+
+MODEL_RUNNERS = {
+    "ARIMA": run_arima,
+    "Prophet": run_prophet,
+    "Moving Average": run_moving_average,
+    "Exponential Smoothing": run_exponential_smoothing,
+    "Linear Regression": run_linear_regression,
+    "Random Forest": run_random_forest,
+    "Support Vector Regression (SVR)": run_svr,
+    "LSTM Neural Network": run_lstm,
+}
@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+from forecast_cache import get_forecast_cache, make_cache_key
+from forecast_models import MODEL_RUNNERS, run_model, with_horizon
+from instrumentation import export_prometheus
+
+MAX_BATCH_SIZE = 64
+MAX_BATCH_WAIT_MS = 10
+MAX_SERIES_LENGTH = 1_000_000
+
+# Worker: forecast a batch of series for one model; each item fails on its own
+def _forecast_batch(model_choice, items):
+    results = []
+    for values, dates, params in items:
+        try:
+            data = _as_frame(values, dates)
+            forecast = run_model(data, "value", model_choice, params)
+            results.append((np.asarray(forecast, dtype=float), None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
+
+def _as_frame(values, dates=None):
+    data = pd.DataFrame({"value": np.asarray(values, dtype=float)})
+    if dates is not None:
+        data.insert(0, "date", pd.to_datetime(dates))
+    return data
+
+# NaN and +-inf are not valid JSON
+def _to_json_list(values):
+    return [float(value) if np.isfinite(value) else None for value in values]
+
+# Validate one request body and turn it into (model, values, dates, params)
+def parse_request(body):
+    if not isinstance(body, dict):
+        raise ValueError("Request must be a JSON object.")
+    model_choice = body.get("model")
+    if model_choice not in MODEL_RUNNERS:
+        raise ValueError(f"Unknown model '{model_choice}'. Choose one of: {', '.join(MODEL_RUNNERS)}.")
+    values = body.get("values")
+    if not isinstance(values, list) or not values:
+        raise ValueError("'values' must be a non-empty list of numbers.")
+    if len(values) > MAX_SERIES_LENGTH:
+        raise ValueError(f"'values' is limited to {MAX_SERIES_LENGTH} points.")
+    dates = body.get("dates")
+    if dates is not None and len(dates) != len(values):
+        raise ValueError("'dates' must have the same length as 'values'.")
+    if model_choice == "Prophet" and dates is None:
+        raise ValueError("Prophet needs 'dates'.")
+    # Convert here, so malformed numbers or timestamps are a 400 rather than an error inside the service
+    try:
+        values = np.asarray(values, dtype=float)
+    except (ValueError, TypeError):
+        raise ValueError("'values' must be a list of numbers.") from None
+    if dates is not None:
+        try:
+            dates = pd.to_datetime(dates)
+        except (ValueError, TypeError, OverflowError):
+            raise ValueError("'dates' must be a list of timestamps.") from None
+
+    params = with_horizon(model_choice, body.get("params"), body.get("horizon"))
+    if "order" in params:
+        params["order"] = tuple(params["order"])
+    return model_choice, values, dates, params
+
+# Collects requests for one model for a few milliseconds, then splits them into one task per worker, so a
+# burst runs in parallel while each worker still loads the model backend once per chunk
+class MicroBatcher:
+    def __init__(self, model_choice, executor, workers=1, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_BATCH_WAIT_MS):
+        self.model_choice = model_choice
+        self.executor = executor
+        self.workers = max(1, workers)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.requests = 0
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self._dispatches = set()  # the loop only keeps weak references to tasks
+
+    async def submit(self, values, dates, params):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(((values, dates, params), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch without waiting, so the next batch can form while this one runs
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch):
+        self.batches += 1
+        self.requests += len(batch)
+        loop = asyncio.get_running_loop()
+        size = -(-len(batch) // self.workers)
+        chunks = [batch[i:i + size] for i in range(0, len(batch), size)]
+        outcomes = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, _forecast_batch, self.model_choice, [item for item, _ in chunk])
+            for chunk in chunks
+        ), return_exceptions=True)
+        for chunk, results in zip(chunks, outcomes):
+            if isinstance(results, BaseException):
+                results = [(None, f"{type(results).__name__}: {results}")] * len(chunk)
+            for (_, future), result in zip(chunk, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def close(self):
+        self._task.cancel()
+        for task in list(self._dispatches):
+            task.cancel()
+
+class ForecastService:
+    def __init__(self, workers=None, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        # Workers are long-lived, so each keeps its model backends imported after first use
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.batchers = {}
+        self.cache = get_forecast_cache()
+        self.cache_hits = 0
+
+    def batcher(self, model_choice):
+        if model_choice not in self.batchers:
+            self.batchers[model_choice] = MicroBatcher(
+                model_choice, self.executor, self.workers, self.max_batch_size, self.max_wait_ms
+            )
+        return self.batchers[model_choice]
+
+    # Forecast one parsed request; identical series and parameters are served from the forecast cache
+    async def forecast(self, model_choice, values, dates, params):
+        start = time.perf_counter()
+        key = make_cache_key(_as_frame(values, dates), model_choice, params)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.cache_hits += 1
+            forecast, error, cached = np.asarray(entry["forecast"], dtype=float), None, True
+        else:
+            forecast, error = await self.batcher(model_choice).submit(values, dates, params)
+            if error is None:
+                self.cache.put(key, None, forecast)
+            cached = False
+
+        result = {"model": model_choice, "cached": cached, "seconds": round(time.perf_counter() - start, 4)}
+        if error is None:
+            result["forecast"] = _to_json_list(forecast)
+        else:
+            result["error"] = error
+        return result
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "cache_hits": self.cache_hits,
+            "cache": self.cache.stats(),
+            "models": {
+                name: {"batches": batcher.batches, "requests": batcher.requests, "queued": batcher.queue.qsize()}
+                for name, batcher in self.batchers.items()
+            },
+        }
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+async def _read_json(request):
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be valid JSON."}),
+                                 content_type="application/json")
+
+# POST /forecast {"model", "values", "dates"?, "horizon"?, "params"?}
+async def handle_forecast(request):
+    try:
+        result = await request.app["service"].forecast(*parse_request(await _read_json(request)))
+    except (ValueError, TypeError) as e:
+        return web.json_response({"error": str(e)}, status=400)
+    return web.json_response(result, status=200 if "error" not in result else 422)
+
+# POST /forecast/batch {"requests": [...]}: one NDJSON line per request, in completion order
+async def handle_forecast_batch(request):
+    body = await _read_json(request)
+    items = body.get("requests") if isinstance(body, dict) else None
+    if not isinstance(items, list):
+        return web.json_response({"error": "'requests' must be a list."}, status=400)
+
+    service = request.app["service"]
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+
+    async def run(index, item):
+        try:
+            result = await service.forecast(*parse_request(item))
+        except (ValueError, TypeError) as e:
+            result = {"error": str(e)}
+        result["index"] = index
+        return result
+
+    for next_result in asyncio.as_completed([run(index, item) for index, item in enumerate(items)]):
+        result = await next_result
+        await response.write((json.dumps(result) + "\n").encode())
+    await response.write_eof()
+    return response
+
+async def handle_health(request):
+    return web.json_response({"status": "ok", **request.app["service"].stats()})
+
+async def handle_metrics(request):
+    return web.Response(text=export_prometheus(), content_type="text/plain")
+
+def create_app(workers=None, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS):
+    app = web.Application(client_max_size=256 * 1024 ** 2)
+
+    async def start_service(app):
+        app["service"] = ForecastService(workers, max_batch_size, max_wait_ms)
+
+    async def stop_service(app):
+        app["service"].close()
+
+    app.on_startup.append(start_service)
+    app.on_cleanup.append(stop_service)
+    app.router.add_post("/forecast", handle_forecast)
+    app.router.add_post("/forecast/batch", handle_forecast_batch)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the forecasting models over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="Model worker processes")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE, help="Largest batch sent to a worker")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_BATCH_WAIT_MS,
+                        help="How long a request may wait for others to join its batch")
+    args = parser.parse_args(argv)
+    web.run_app(create_app(args.workers, args.max_batch, args.max_wait_ms), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -1,148 +1,420 @@
 import streamlit as st
-from statsmodels.tsa.arima.model import ARIMA
-from prophet import Prophet
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.svm import SVR
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, LSTM
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
-from io import StringIO
+from model_registry import get_import_report
+from forecast_cache import get_forecast_cache, make_cache_key
+from instrumentation import stage, timed
+from chart_rendering import render_forecast_chart
+# Model functions live in forecast_models (no Streamlit); re-exported here for existing imports
+from forecast_models import (
+    MODEL_CHOICES, MODEL_RUNNERS, cached_run_model, forecast_intervals, run_model,
+    run_arima, run_prophet, run_moving_average, run_exponential_smoothing,
+    run_linear_regression, run_random_forest, run_svr, run_lstm
+)
+
+COMPARE_CHOICE = "Compare / Auto"
+ENSEMBLE_CHOICE = "Ensemble"
+
+MODEL_TITLES = {
+    "ARIMA": "ARIMA Forecast",
+    "Prophet": "Prophet Forecast",
+    "Moving Average": "Moving Average Forecast",
+    "Exponential Smoothing": "Holt-Winters Exponential Smoothing Forecast",
+    "Linear Regression": "Linear Regression Forecast",
+    "Random Forest": "Random Forest Forecast",
+    "Support Vector Regression (SVR)": "Support Vector Regression Forecast",
+    "LSTM Neural Network": "LSTM Neural Network Forecast",
+}
 
 def apply_forecasting(data):
     st.subheader("Select Forecasting Model")
-    model_choice = st.selectbox("Choose a forecasting model", [
-        "ARIMA", "Prophet", "Moving Average", "Exponential Smoothing", 
-        "Linear Regression", "Random Forest", "Support Vector Regression (SVR)", "LSTM Neural Network"
-    ])
+    model_choice = st.selectbox("Choose a forecasting model", MODEL_CHOICES + [COMPARE_CHOICE, ENSEMBLE_CHOICE])
     
     target_col = st.selectbox("Select target column for forecasting", data.select_dtypes(include=[np.number]).columns)
+    if model_choice == COMPARE_CHOICE:
+        run_model_comparison(data, target_col)
+        show_backend_report()
+        return
+    if model_choice == ENSEMBLE_CHOICE:
+        run_ensemble_forecast(data, target_col)
+        show_backend_report()
+        return
+    params = select_model_params(model_choice)
+    if params is None:
+        show_backend_report()
+        return
+
+    from batch_forecasting import detect_group_column
+    from hierarchy import RECONCILE_METHODS, detect_hierarchy_columns
+    group_col = detect_group_column(data)
+    hierarchy_columns = detect_hierarchy_columns(data)
+    hierarchical = bool(hierarchy_columns) and "date" in data.columns and st.checkbox(
+        "Forecast the hierarchy", help="Forecast every level and the total, reconciled so they add up.",
+    )
+    if hierarchical:
+        default_levels = [col for col in ("category", "product") if col in hierarchy_columns]
+        levels = st.multiselect("Hierarchy levels, top to bottom", hierarchy_columns,
+                                default_levels or hierarchy_columns[:1])
+        method = st.selectbox("Reconciliation", RECONCILE_METHODS,
+                              format_func={"mint": "MinT (diagonal)", "ols": "OLS", "bottom_up": "Bottom-up"}.get)
+    grouped = not hierarchical and group_col is not None and st.checkbox(f"Forecast each {group_col} separately")
+    background = not grouped and not hierarchical and st.checkbox(
+        "Train in background", help="Keep using the app while the model trains."
+    )
+    # Versioning pays off only for models the store can update in place; it stays opt-in because every
+    # versioned fit is pickled to disk
+    from artifact_store import WARM_START_MODELS
+    versionable = not grouped and not hierarchical and not background and model_choice in WARM_START_MODELS
+    keep_versions = versionable and st.checkbox(
+        "Keep model versions", value=False,
+        help="Store the fitted model; when a later upload only appends rows, update it instead of training from scratch.",
+    )
 
     if st.button("Run Model"):
-        forecast = None  # Initialize forecast variable to hold results
-        if model_choice == "ARIMA":
+        if background:
+            from job_runner import get_job_runner
+            get_job_runner().submit(current_user_id(), data, target_col, model_choice, params)
+            st.success(f"{model_choice} queued for training.")
+        elif hierarchical:
+            run_hierarchical_forecast(data, target_col, model_choice, levels, params, method)
+        elif grouped:
+            run_grouped_forecast(data, target_col, model_choice, group_col, params)
+        else:
+            if keep_versions:
+                model, forecast = run_versioned_model(data, target_col, model_choice, params)
+            else:
+                model, forecast, from_cache = cached_run_model(data, target_col, model_choice, params)
+                if from_cache:
+                    st.caption("Loaded fitted model and forecast from cache.")
+            plot_forecast(forecast, MODEL_TITLES[model_choice], target_col, history=data[target_col],
+                          intervals=forecast_intervals(model, len(forecast)))
+
+            # Allow user to download forecast
+            if forecast is not None:
+                download_forecast(forecast, model_choice)
+                set_base_forecast(forecast, data, target_col, model_choice)
+
+    show_training_jobs()
+    show_model_versions()
+    show_backend_report()
+
+# Fit the chosen models concurrently and average the forecasts that finish within the time budget
+def run_ensemble_forecast(data, target_col):
+    from backtesting import applicable_models
+    from ensemble import DEFAULT_BUDGET_SECONDS, run_ensemble
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        horizon = st.slider("Forecast horizon", 1, 60, 10, key="ensemble_horizon")
+    with col2:
+        budget = st.slider("Time budget (seconds)", 5, 300, DEFAULT_BUDGET_SECONDS,
+                           help="Models still fitting when the budget runs out are stopped and left out.")
+    with col3:
+        weighting = st.selectbox("Weights", ["equal", "backtest"],
+                                 help="Backtest weights each model by inverse squared error on held-out folds.")
+    models = st.multiselect("Ensemble members", MODEL_CHOICES, applicable_models(data, target_col, horizon),
+                            key="ensemble_models")
+
+    if st.button("Run Model") and models:
+        progress = st.progress(0.0, text=f"Fitting {len(models)} models...")
+
+        def update_progress(done, total):
+            progress.progress(done / total, text=f"{done} of {total} models finished")
+
+        try:
+            with stage("ensemble", models=len(models), rows=len(data)):
+                forecast, members = run_ensemble(data, target_col, models, horizon, budget, weighting,
+                                                 progress_callback=update_progress)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.dataframe(members)
+        made_it = members.loc[members["status"] == "done", "model"].tolist()
+        if not made_it:
+            st.error(f"No model finished within {budget} seconds.")
+            return
+        missed = members.loc[members["status"] != "done", "model"].tolist()
+        if missed:
+            st.warning(f"Left out of the ensemble: {', '.join(missed)}.")
+        plot_forecast(forecast, f"Ensemble Forecast ({', '.join(made_it)})", target_col, history=data[target_col])
+        download_forecast(forecast, "Ensemble")
+        set_base_forecast(forecast, data, target_col, "Ensemble")
+
+# Fit through the artifact store and say whether the stored model was reused, updated or retrained.
+# The in-memory forecast cache is checked first, so reruns on the same data never touch the disk.
+def run_versioned_model(data, target_col, model_choice, params):
+    from artifact_store import run_with_artifacts
+    cache = get_forecast_cache()
+    key = make_cache_key(data[[col for col in ("date", target_col) if col in data.columns]], model_choice, params)
+    entry = cache.get(key)
+    if entry is not None:
+        st.caption("Loaded fitted model and forecast from cache.")
+        return entry["model"], entry["forecast"]
+
+    model, forecast, info = run_with_artifacts(current_user_id(), data, target_col, model_choice, params)
+    cache.put(key, model, forecast)
+    if info["mode"] == "reused":
+        st.caption(f"Reused stored model version {info['version']}; the data has not changed.")
+    elif info["mode"] == "warm":
+        st.caption(f"Updated stored model with {info['new_rows']} new rows in {info['seconds']:.1f}s "
+                   f"(saved as version {info['version']}).")
+    elif info["version"] is not None:
+        st.caption(f"Trained in {info['seconds']:.1f}s and saved as version {info['version']}.")
+    if info.get("warm_start_error"):
+        st.warning(f"Could not update the stored model, trained from scratch instead: {info['warm_start_error']}")
+    if info.get("save_error"):
+        st.warning(f"Model could not be saved for reuse: {info['save_error']}")
+    return model, forecast
+
+def show_model_versions():
+    from artifact_store import get_artifact_store
+    versions = get_artifact_store().list_versions(current_user_id())
+    if not versions:
+        return
+    with st.expander(f"Stored model versions ({len(versions)})"):
+        table = pd.DataFrame(versions)
+        table["created"] = pd.to_datetime(table["created"], unit="s")
+        st.dataframe(table[["model", "target", "version", "rows", "mode", "parent", "fit_seconds", "created"]])
+
+def current_user_id():
+    return st.session_state.get("user_id") or "anonymous"
+
+# Status of this user's background training jobs, polled while any are queued or running
+def show_training_jobs():
+    from job_runner import get_job_runner
+    runner = get_job_runner()
+    user_id = current_user_id()
+    if not runner.jobs(user_id):
+        return
+
+    fragment = getattr(st, "fragment", None)
+    polling = runner.has_active_jobs(user_id)
+    if fragment is None:
+        render_training_jobs(user_id, polling)
+    else:
+        fragment(run_every=2 if polling else None)(render_training_jobs)(user_id, polling)
+
+def render_training_jobs(user_id, polling):
+    from job_runner import get_job_runner
+    runner = get_job_runner()
+    jobs = runner.jobs(user_id)
+
+    st.subheader("Background Training Jobs")
+    st.dataframe(pd.DataFrame([job.snapshot() for job in jobs]).drop(columns=["error"]))
+    for job in reversed(jobs):
+        label = f"#{job.job_id} {job.model_choice} on {job.target_col}"
+        if job.state in ("queued", "running"):
+            if st.button(f"Cancel {label}", key=f"cancel_job_{job.job_id}"):
+                runner.cancel(user_id, job.job_id)
+        elif job.state == "failed":
+            st.error(f"{label} failed: {job.error}")
+        elif job.state == "done":
+            with st.expander(f"{label} result ({job.elapsed:.1f}s)"):
+                plot_forecast(job.result, MODEL_TITLES[job.model_choice], job.target_col)
+                download_forecast(job.result, f"{job.model_choice}_{job.job_id}")
+
+    # Everything finished since the last full run: rerun once so polling stops
+    if polling and not runner.has_active_jobs(user_id):
+        st.rerun()
+
+# "(p,d,q)" text from the order input as a tuple of three non-negative integers
+def parse_arima_order(text):
+    parts = [part.strip() for part in text.strip().strip("()").split(",")]
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"ARIMA order must look like (1,1,1), not '{text}'.")
+    return tuple(int(part) for part in parts)
+
+# Hyperparameter widgets for the selected model; None when an input is invalid
+def select_model_params(model_choice):
+    params = {}
+    if model_choice == "ARIMA":
+        if st.checkbox("Search for the best order automatically", key="arima_auto"):
+            params.update(auto=True, search_jobs=None)
+        else:
             order = st.text_input("ARIMA order (p,d,q)", "(1,1,1)")
-            p, d, q = map(int, order.strip("()").split(","))
-            model = ARIMA(data[target_col], order=(p, d, q))
-            model_fit = model.fit()
-            forecast = model_fit.forecast(steps=10)
-            plot_forecast(forecast, "ARIMA Forecast", target_col)
-
-        elif model_choice == "Prophet":
-            df = data[["date", target_col]].rename(columns={"date": "ds", target_col: "y"})
-            model = Prophet()
-            model.fit(df)
-            future = model.make_future_dataframe(periods=10)
-            forecast = model.predict(future)["yhat"]
-            plot_forecast(forecast, "Prophet Forecast", target_col)
-
-        elif model_choice == "Moving Average":
-            window = st.slider("Window size", 1, 20, 3)
-            forecast = data[target_col].rolling(window=window).mean()
-            plot_forecast(forecast, "Moving Average Forecast", target_col)
-
-        elif model_choice == "Exponential Smoothing":
-            seasonal_periods = st.slider("Seasonal Periods", 1, 12, 12)
-            trend = st.selectbox("Trend Component", ["add", "mul", None])
-            seasonal = st.selectbox("Seasonal Component", ["add", "mul", None])
-            model = ExponentialSmoothing(data[target_col], trend=trend, seasonal=seasonal, seasonal_periods=seasonal_periods)
-            model_fit = model.fit()
-            forecast = model_fit.forecast(steps=10)
-            plot_forecast(forecast, "Holt-Winters Exponential Smoothing Forecast", target_col)
-
-        elif model_choice == "Linear Regression":
-            forecast = run_linear_regression(data, target_col)
-            plot_forecast(forecast, "Linear Regression Forecast", target_col)
-
-        elif model_choice == "Random Forest":
-            forecast = run_random_forest(data, target_col)
-            plot_forecast(forecast, "Random Forest Forecast", target_col)
-
-        elif model_choice == "Support Vector Regression (SVR)":
-            forecast = run_svr(data, target_col)
-            plot_forecast(forecast, "Support Vector Regression Forecast", target_col)
-
-        elif model_choice == "LSTM Neural Network":
-            forecast = run_lstm(data, target_col)
-            plot_forecast(forecast, "LSTM Neural Network Forecast", target_col)
-
-        # Allow user to download forecast
-        if forecast is not None:
-            download_forecast(forecast, model_choice)
-
-def plot_forecast(forecast, title, target_col):
+            try:
+                params["order"] = parse_arima_order(order)
+            except ValueError as e:
+                st.error(str(e))
+                return None
+    elif model_choice == "Prophet":
+        params["intervals"] = st.checkbox(
+            "Show prediction intervals", key="prophet_intervals",
+            help="Intervals need Prophet's uncertainty sampling, which is most of its prediction time.",
+        )
+        if params["intervals"]:
+            params["uncertainty_samples"] = st.select_slider("Uncertainty samples", [100, 250, 500, 1000], 1000)
+    elif model_choice == "Moving Average":
+        params["window"] = st.slider("Window size", 1, 20, 3)
+    elif model_choice == "Exponential Smoothing":
+        if st.checkbox("Search for the best configuration automatically", key="holtwinters_auto"):
+            params.update(auto=True, search_jobs=None)
+        else:
+            params["seasonal_periods"] = st.slider("Seasonal Periods", 1, 12, 12)
+            params["trend"] = st.selectbox("Trend Component", ["add", "mul", None])
+            params["seasonal"] = st.selectbox("Seasonal Component", ["add", "mul", None])
+    elif model_choice in ("Linear Regression", "Random Forest", "Support Vector Regression (SVR)"):
+        params["strategy"] = st.selectbox(
+            "Multi-step strategy", ["recursive", "direct"], key="lag_strategy",
+            help="Recursive feeds each prediction back in as a lag; direct fits one model per forecast step.",
+        )
+        if model_choice == "Support Vector Regression (SVR)":
+            params["kernel"] = st.selectbox(
+                "Kernel", ["auto", "exact", "approximate"], key="svr_kernel",
+                help="The approximate (Nystroem) kernel keeps large series fast; auto uses it above 5,000 rows.",
+            )
+    elif model_choice == "LSTM Neural Network":
+        params["horizon"] = st.slider("Forecast horizon", 1, 60, 10)
+        params["sequence_length"] = st.slider("Window length", 2, 60, 10)
+        params["epochs"] = st.slider("Epochs", 1, 100, 10)
+        params["batch_size"] = st.select_slider("Batch size", [16, 32, 64, 128, 256], 32)
+        params["direct"] = st.checkbox("Predict all steps in one pass (direct multi-step)", value=True)
+    return params
+
+# Backtest every applicable model, then fit and show the most accurate one
+def run_model_comparison(data, target_col):
+    from backtesting import applicable_models, compare_models
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        horizon = st.slider("Backtest horizon", 1, 60, 10)
+    with col2:
+        folds = st.slider("Backtest folds", 1, 10, 3)
+    with col3:
+        metric = st.selectbox("Pick winner by", ["rmse", "mape"])
+    models = st.multiselect("Models to compare", MODEL_CHOICES, applicable_models(data, target_col, horizon, folds))
+
+    if st.button("Run Model") and models:
+        progress = st.progress(0.0, text="Backtesting models...")
+
+        def update_progress(done, total):
+            progress.progress(done / total, text=f"Backtested {done} of {total} models")
+
+        try:
+            with stage("backtest", models=len(models), rows=len(data)):
+                table, winner = compare_models(data, target_col, models, horizon, folds, metric,
+                                               progress_callback=update_progress)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.dataframe(table)
+        if winner is None:
+            st.error("No model completed the backtest.")
+            return
+
+        st.success(f"Best model by {metric.upper()}: {winner}")
+        params = {"horizon": horizon}
+        model, forecast, from_cache = cached_run_model(data, target_col, winner, params)
+        plot_forecast(forecast, MODEL_TITLES[winner], target_col, history=data[target_col],
+                      intervals=forecast_intervals(model, len(forecast)))
+        download_forecast(forecast, winner)
+        set_base_forecast(forecast, data, target_col, winner)
+
+# Fit the model once per group across a process pool and show the combined forecast
+def run_grouped_forecast(data, target_col, model_choice, group_col, params=None):
+    from batch_forecasting import forecast_by_group
+
+    if params and params.get("auto"):
+        # Each group already runs in a pool worker; search its orders sequentially there
+        params = {**params, "search_jobs": 1}
+
+    cache = get_forecast_cache()
+    key_columns = [col for col in (group_col, "date", target_col) if col in data.columns]
+    key = make_cache_key(data[key_columns], f"{model_choice}|grouped", params)
+    entry = cache.get(key)
+    if entry is not None:
+        forecasts, errors = entry["forecast"], {}
+        st.caption("Loaded grouped forecast from cache.")
+    else:
+        progress = st.progress(0.0, text="Forecasting groups...")
+
+        def update_progress(done, total):
+            progress.progress(done / total, text=f"Forecasted {done} of {total} groups")
+
+        with stage("fit_grouped", model=model_choice, rows=len(data)):
+            forecasts, errors = forecast_by_group(
+                data, target_col, model_choice, group_col, params, progress_callback=update_progress
+            )
+        # Runs with failed groups are not cached, so a transient failure is retried next time
+        if not errors:
+            cache.put(key, None, forecasts)
+
+    if errors:
+        st.warning(f"{len(errors)} of {len(errors) + forecasts.shape[1]} groups failed to forecast.")
+        st.dataframe(pd.DataFrame({group_col: list(errors), "error": list(errors.values())}))
+    if forecasts.empty:
+        return
+
+    st.dataframe(forecasts)
+    plot_forecast(forecasts.iloc[:, :10], f"{MODEL_TITLES[model_choice]} by {group_col}", target_col)
+    csv = forecasts.to_csv()
+    st.download_button("Download Forecast", csv, f"{model_choice}_{group_col}_forecast.csv", "text/csv")
+    set_base_forecast(forecasts, data, target_col, f"{model_choice} by {group_col}")
+
+# Forecast every node of the level hierarchy and show the reconciled totals
+def run_hierarchical_forecast(data, target_col, model_choice, levels, params, method):
+    from hierarchy import forecast_hierarchy
+
+    if params and params.get("auto"):
+        params = {**params, "search_jobs": 1}
+    progress = st.progress(0.0, text="Forecasting hierarchy...")
+
+    def update_progress(done, total):
+        progress.progress(done / total, text=f"Forecasted {done} of {total} nodes")
+
+    try:
+        with stage("fit_hierarchy", model=model_choice, rows=len(data)):
+            hierarchy, reconciled, base, errors, info = forecast_hierarchy(
+                data, target_col, levels, model_choice, params, method, progress_callback=update_progress
+            )
+    except ValueError as e:
+        st.error(str(e))
+        return
+    st.caption(f"{info['nodes']} nodes ({info['bottom']} bottom series) "
+               f"reconciled in {info['reconcile_seconds']:.2f}s.")
+    if errors:
+        st.warning(f"{len(errors)} of {info['nodes']} nodes failed to forecast; reconciliation filled them in.")
+        st.dataframe(pd.DataFrame({"node": list(errors), "error": list(errors.values())}))
+
+    top = [label for label, depth in zip(hierarchy.labels, hierarchy.depths) if depth <= 1]
+    st.dataframe(reconciled[top[:50]])
+    plot_forecast(reconciled[top[:10]], f"{MODEL_TITLES[model_choice]} by {levels[0]} (reconciled)", target_col)
+    st.download_button("Download Forecast", reconciled.to_csv(), f"{model_choice}_hierarchy_forecast.csv", "text/csv")
+    set_base_forecast(reconciled, data, target_col, f"{model_choice} hierarchy")
+
+# Import time and memory of the model backends loaded so far
+def show_backend_report():
+    report = get_import_report()
+    if report:
+        with st.expander("Model backend load times"):
+            st.dataframe(pd.DataFrame(report)[["backend", "import_seconds", "rss_delta_mb"]])
+
+# Render history, forecast and intervals together; large series are downsampled and charts cached
+@timed("plot")
+def plot_forecast(forecast, title, target_col, history=None, intervals=None):
     st.write(title)
-    fig, ax = plt.subplots()
-    ax.plot(forecast, label="Forecast")
-    ax.set_xlabel("Time")
-    ax.set_ylabel(target_col)
-    ax.legend()
-    st.pyplot(fig)
+    st.image(render_forecast_chart(forecast, title, target_col, history, intervals))
 
 def download_forecast(forecast, model_choice):
-    csv = forecast.to_csv(index=False)
+    with stage("export", rows=len(forecast)):
+        csv = forecast.to_csv(index=False)
     st.download_button("Download Forecast", csv, f"{model_choice}_forecast.csv", "text/csv")
 
-# Linear Regression Forecast
-def run_linear_regression(data, target_col):
-    df = data.dropna(subset=[target_col]).reset_index()
-    X = df.index.values.reshape(-1, 1)
-    y = df[target_col].values
-    model = LinearRegression()
-    model.fit(X, y)
-    future_X = np.arange(len(X), len(X) + 10).reshape(-1, 1)
-    forecast = model.predict(future_X)
-    return pd.Series(forecast)
-
-# Random Forest Forecast
-def run_random_forest(data, target_col):
-    df = data.dropna(subset=[target_col]).reset_index()
-    X = df.index.values.reshape(-1, 1)
-    y = df[target_col].values
-    model = RandomForestRegressor(n_estimators=100)
-    model.fit(X, y)
-    future_X = np.arange(len(X), len(X) + 10).reshape(-1, 1)
-    forecast = model.predict(future_X)
-    return pd.Series(forecast)
-
-# Support Vector Regression Forecast
-def run_svr(data, target_col):
-    df = data.dropna(subset=[target_col]).reset_index()
-    X = df.index.values.reshape(-1, 1)
-    y = df[target_col].values
-    model = SVR(kernel='rbf')
-    model.fit(X, y)
-    future_X = np.arange(len(X), len(X) + 10).reshape(-1, 1)
-    forecast = model.predict(future_X)
-    return pd.Series(forecast)
-
-# LSTM Neural Network Forecast
-def run_lstm(data, target_col):
-    df = data.dropna(subset=[target_col]).reset_index()
-    sequence_length = 10
-    X, y = [], []
-    for i in range(len(df) - sequence_length):
-        X.append(df[target_col].values[i:i + sequence_length])
-        y.append(df[target_col].values[i + sequence_length])
-    X, y = np.array(X), np.array(y)
-    X = X.reshape((X.shape[0], X.shape[1], 1))  # Reshape for LSTM
-
-    # Define LSTM model
-    model = Sequential()
-    model.add(LSTM(50, activation='relu', input_shape=(sequence_length, 1)))
-    model.add(Dense(1))
-    model.compile(optimizer='adam', loss='mse')
-    model.fit(X, y, epochs=10, verbose=0)
-
-    # Forecasting future values
-    last_sequence = df[target_col].values[-sequence_length:]
-    forecast = []
-    for _ in range(10):  # Forecast next 10 steps
-        last_sequence = last_sequence.reshape((1, sequence_length, 1))
-        next_value = model.predict(last_sequence, verbose=0)
-        forecast.append(next_value[0, 0])
-        last_sequence = np.append(last_sequence[0, 1:], next_value[0, 0])
-    return pd.Series(forecast)
+# The latest forecast (one column per series, indexed by forecast date) is the base the Adjust Predictions
+# page layers what-if scenarios on; the version number tells that page to start a fresh scenario.
+def set_base_forecast(forecast, data, target_col, label):
+    from dataset_store import get_dataset_store
+    from lag_features import extend_dates
+
+    if isinstance(forecast, pd.DataFrame):
+        frame = forecast.reset_index(drop=True)
+    else:
+        frame = pd.DataFrame({target_col: np.asarray(forecast, dtype=float)})
+    frame.columns = frame.columns.astype(str)
+    frame.index.name = "step"
+    dates = pd.to_datetime(data["date"], errors="coerce").dropna() if "date" in data.columns else None
+    if dates is not None and len(dates) > 1:
+        frame.index = pd.DatetimeIndex(extend_dates(dates.drop_duplicates().sort_values(), len(frame)), name="date")
+    get_dataset_store().put(st.session_state.session_key, "base_forecast", frame)
+    st.session_state.base_forecast_label = label
+    st.session_state.base_forecast_version = st.session_state.get("base_forecast_version", 0) + 1
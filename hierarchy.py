@@ -0,0 +1,137 @@
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator, cg
+
+from batch_forecasting import forecast_by_group
+
+# Levels of the Sales and Custom templates, coarsest first
+HIERARCHY_COLUMNS = ["category", "product"]
+RECONCILE_METHODS = ["mint", "ols", "bottom_up"]
+TOTAL_LABEL = "Total"
+
+# Label columns that can form a hierarchy: the template levels first, then any other text or categorical columns
+def detect_hierarchy_columns(data):
+    labels = [col for col in data.columns
+              if col != "date" and (data[col].dtype == object or isinstance(data[col].dtype, pd.CategoricalDtype))]
+    return [col for col in HIERARCHY_COLUMNS if col in labels] + [col for col in labels if col not in HIERARCHY_COLUMNS]
+
+# Aggregation structure as a sparse summing matrix S (nodes x bottom series): row i marks the bottom series
+# that add up to node i. Nodes are ordered total, then each level top to bottom; the bottom series come last.
+class Hierarchy:
+    def __init__(self, bottom_keys, levels):
+        self.levels = list(levels)
+        self.bottom_keys = bottom_keys.reset_index(drop=True)
+        n_bottom = len(self.bottom_keys)
+        rows, self.labels, self.depths = [np.zeros(n_bottom, dtype=np.int64)], [TOTAL_LABEL], [0]
+        for depth in range(1, len(self.levels) + 1):
+            prefix = self.levels[:depth]
+            codes, uniques = pd.MultiIndex.from_frame(self.bottom_keys[prefix]).factorize()
+            rows.append(codes + len(self.labels))
+            self.labels += ["/".join(f"{level}={value}" for level, value in zip(prefix, key)) for key in uniques]
+            self.depths += [depth] * len(uniques)
+        self.S = sparse.csr_matrix(
+            (np.ones(n_bottom * len(rows)), (np.concatenate(rows), np.tile(np.arange(n_bottom), len(rows)))),
+            shape=(len(self.labels), n_bottom),
+        )
+
+    @property
+    def n_nodes(self):
+        return self.S.shape[0]
+
+    @property
+    def n_bottom(self):
+        return self.S.shape[1]
+
+    # Every node's series from the bottom series (rows: bottom series or nodes, columns: time)
+    def aggregate(self, bottom):
+        return self.S @ bottom
+
+# Bottom series as a dates x series matrix (missing dates count as zero) plus the hierarchy over them
+def bottom_series(data, target_col, levels):
+    if "date" not in data.columns:
+        raise ValueError("Hierarchical forecasting needs a 'date' column to line the series up.")
+    if not levels:
+        raise ValueError("Choose at least one hierarchy level.")
+    wide = data.pivot_table(index="date", columns=list(levels), values=target_col, aggfunc="sum",
+                            fill_value=0, observed=True)
+    hierarchy = Hierarchy(wide.columns.to_frame(index=False), levels)
+    return wide.index, wide.to_numpy(dtype=float), hierarchy
+
+# Variance of each node's one-step naive errors, the diagonal MinT weights. Not every model exposes
+# in-sample residuals, so this cheap proxy stands in for them.
+def naive_residual_variance(node_values):
+    variances = np.var(np.diff(node_values, axis=1), axis=1)
+    positive = variances[variances > 0]
+    return np.where(variances > 0, variances, positive.min() if positive.size else 1.0)
+
+# Coherent forecasts (nodes x steps) from base forecasts of every node. Nodes without a forecast (NaN rows)
+# are left out of OLS/MinT; bottom-up needs every bottom series.
+# OLS and MinT solve (S'WS) b = S'W y with conjugate gradients, so S'WS (dense, because of the total row)
+# is never formed: each iteration is two sparse products.
+def reconcile(hierarchy, base, method="mint", variances=None):
+    S = hierarchy.S
+    base = np.asarray(base, dtype=float)
+    available = np.isfinite(base).all(axis=1)
+    if method == "bottom_up":
+        if not available[-hierarchy.n_bottom:].all():
+            raise ValueError("Bottom-up needs a forecast for every bottom-level series.")
+        return hierarchy.aggregate(base[-hierarchy.n_bottom:])
+    if method == "ols":
+        weights = np.ones(hierarchy.n_nodes)
+    elif method == "mint":
+        if variances is None:
+            raise ValueError("MinT needs a residual variance per node.")
+        weights = 1.0 / np.asarray(variances, dtype=float)
+    else:
+        raise ValueError(f"Unknown reconciliation method '{method}'. Choose one of: {', '.join(RECONCILE_METHODS)}.")
+
+    S_used = S[available]
+    St_W = S_used.T.multiply(weights[available]).tocsr()
+    diagonal = np.asarray(St_W.sum(axis=1)).ravel()  # diag(S'WS), since S is 0/1
+    if not (diagonal > 0).all():
+        raise ValueError("Too many node forecasts failed to reconcile the hierarchy.")
+    n_bottom = hierarchy.n_bottom
+    normal = LinearOperator((n_bottom, n_bottom), matvec=lambda x: St_W @ (S_used @ x), dtype=float)
+    jacobi = LinearOperator((n_bottom, n_bottom), matvec=lambda x: x / diagonal, dtype=float)
+    rhs = St_W @ base[available]
+    bottom = np.empty((n_bottom, base.shape[1]))
+    for step in range(base.shape[1]):
+        bottom[:, step], info = cg(normal, rhs[:, step], x0=rhs[:, step] / diagonal, M=jacobi, maxiter=1000)
+        if info < 0:
+            raise ValueError("Reconciliation did not converge.")
+    return hierarchy.aggregate(bottom)
+
+# Forecast every node of the hierarchy across the process pool and reconcile them.
+# Returns (hierarchy, reconciled frame, base frame, errors, info); frames are steps x node labels.
+def forecast_hierarchy(data, target_col, levels, model_choice, params=None, method="mint",
+                       max_workers=None, progress_callback=None):
+    dates, bottom, hierarchy = bottom_series(data, target_col, levels)
+    node_values = hierarchy.aggregate(bottom.T)
+    n_nodes, n_dates = node_values.shape
+    long = pd.DataFrame({
+        "node": np.repeat(np.arange(n_nodes), n_dates),
+        "date": np.tile(dates, n_nodes),
+        target_col: node_values.ravel(),
+    })
+    forecasts, errors = forecast_by_group(long, target_col, model_choice, "node", params,
+                                          max_workers=max_workers, progress_callback=progress_callback)
+    if forecasts.empty:
+        raise ValueError(f"Every node failed to forecast, e.g. {next(iter(errors.values()), 'no nodes')}")
+    base = forecasts.reindex(columns=range(n_nodes)).to_numpy().T
+
+    start = time.perf_counter()
+    variances = naive_residual_variance(node_values) if method == "mint" else None
+    reconciled = reconcile(hierarchy, base, method, variances)
+    info = {"nodes": n_nodes, "bottom": hierarchy.n_bottom, "reconcile_seconds": time.perf_counter() - start}
+
+    index = pd.RangeIndex(base.shape[1], name="step")
+    return (
+        hierarchy,
+        pd.DataFrame(reconciled.T, index=index, columns=hierarchy.labels),
+        pd.DataFrame(base.T, index=index, columns=hierarchy.labels),
+        {hierarchy.labels[node]: error for node, error in errors.items()},
+        info,
+    )
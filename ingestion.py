@@ -0,0 +1,186 @@
+import hashlib
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".parquet", ".arrow", ".feather", ".ipc")
+CHUNK_ROWS = 200_000
+# Object columns whose distinct values are at most this share of the rows become categoricals
+CATEGORY_RATIO = 0.5
+# A text column becomes datetime64 when this share of a sample of its values parses as dates
+DATE_PARSE_SHARE = 0.95
+DATE_SAMPLE_SIZE = 1000
+
+def _file_name(file):
+    if isinstance(file, (str, os.PathLike)):
+        return os.fspath(file)
+    return getattr(file, "name", "")
+
+def is_supported_file(name):
+    return name.lower().endswith(SUPPORTED_EXTENSIONS)
+
+# Open an Arrow IPC source in either the file (random access) or stream format
+def _open_ipc(file):
+    import pyarrow as pa
+
+    source = pa.memory_map(os.fspath(file)) if isinstance(file, (str, os.PathLike)) else file
+    try:
+        reader = pa.ipc.open_file(source)
+        return (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return iter(pa.ipc.open_stream(source))
+
+# Yield the file as DataFrame chunks of at most `chunksize` rows (Excel is read whole)
+def iter_file_chunks(file, name=None, chunksize=CHUNK_ROWS):
+    name = (name or _file_name(file)).lower()
+    if name.endswith(".csv"):
+        yield from pd.read_csv(file, chunksize=chunksize)
+    elif name.endswith(".xlsx"):
+        yield pd.read_excel(file)
+    elif name.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif name.endswith((".arrow", ".feather", ".ipc")):
+        for batch in _open_ipc(file):
+            yield batch.to_pandas()
+    else:
+        raise ValueError("Unsupported file format. Please upload a CSV, Excel, Parquet or Arrow file.")
+
+# Smallest dtypes that hold each chunk's values exactly
+def compact_chunk_dtypes(chunk):
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_integer_dtype(series.dtype):
+            chunk[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series.dtype) and series.dtype != np.float32:
+            downcast = series.astype(np.float32)
+            if np.array_equal(downcast.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+                chunk[col] = downcast
+        elif series.dtype == object and len(series) > 0:
+            if series.nunique(dropna=True) <= CATEGORY_RATIO * len(series):
+                chunk[col] = series.astype("category")
+    return chunk
+
+def _parse_dates(values):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # "could not infer format" for mixed formats
+        return pd.to_datetime(values, errors="coerce")
+
+# Text column whose values (not numbers) mostly parse as dates, judged on a sample of distinct values
+def looks_like_dates(series):
+    values = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series.dropna().unique()
+    if len(values) == 0:
+        return False
+    sample = pd.Index(values[:DATE_SAMPLE_SIZE]).astype(str)
+    if pd.to_numeric(sample, errors="coerce").notna().mean() > 0.5:
+        return False
+    try:
+        return _parse_dates(sample).notna().mean() >= DATE_PARSE_SHARE
+    except (ValueError, TypeError):
+        # e.g. mixed time zones, which pandas refuses to combine into one column
+        return False
+
+# Parse date-like text columns into datetime64; categoricals parse each category once
+def parse_date_columns(data):
+    for col in data.columns:
+        series = data[col]
+        if not (series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype)) or not looks_like_dates(series):
+            continue
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            parsed = _parse_dates(series.cat.categories).take(codes, allow_fill=True, fill_value=pd.NaT)
+            data[col] = pd.Series(parsed, index=series.index)
+        else:
+            data[col] = _parse_dates(series)
+    return data
+
+# Per-column memory before and after compaction, largest saving first
+def memory_report(before_bytes, before_dtypes, data):
+    after = data.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "dtype_before": pd.Series(before_dtypes, dtype=object),
+        "dtype_after": data.dtypes.astype(str),
+        "mb_before": pd.Series(before_bytes, dtype=float) / 1024 ** 2,
+        "mb_after": after / 1024 ** 2,
+    }).reindex(data.columns)
+    report["saved_pct"] = (1 - report["mb_after"] / report["mb_before"]) * 100
+    report.index.name = "column"
+    return report.sort_values("mb_before", ascending=False)
+
+# Row hashes that do not depend on the dtypes pandas inferred for this chunk: numbers are hashed as
+# float64, so 1 (int64 here) and 1.0 (float64 in the next chunk) match. Numeric, datetime and bool columns
+# are hashed from their native values; only object columns go through text.
+def row_hashes(chunk):
+    normalized = {}
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_datetime64_any_dtype(series.dtype):
+            normalized[col] = series
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            normalized[col] = series.astype(np.float64)
+        elif series.dtype == object:
+            normalized[col] = series.astype(str).where(series.notna(), "nan")
+        else:
+            normalized[col] = series  # categoricals hash by their values
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized, index=chunk.index), index=False).to_numpy()
+
+# Drop blank rows and any row already seen in this or an earlier chunk.
+# `digest`, when given, is fed the kept rows' hashes, so it ends up identifying the cleaned content.
+def clean_chunk(chunk, seen_hashes, digest=None):
+    chunk = chunk.dropna(how="all")
+    if chunk.empty:
+        return chunk
+    hashes = row_hashes(chunk)
+    already_seen = np.fromiter(map(seen_hashes.__contains__, hashes.tolist()), dtype=bool, count=len(hashes))
+    keep = ~already_seen & ~pd.Index(hashes).duplicated(keep="first")
+    seen_hashes.update(hashes[keep].tolist())
+    if digest is not None:
+        digest.update(hashes[keep].tobytes())
+    return chunk if keep.all() else chunk[keep].copy()
+
+# Concatenate chunks, unifying categoricals so they do not fall back to object dtype
+def concat_chunks(chunks):
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    for col in chunks[0].columns:
+        if all(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks if col in chunk):
+            categories = union_categoricals([chunk[col] for chunk in chunks if col in chunk]).categories
+            for chunk in chunks:
+                if col in chunk:
+                    chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+# Stream, clean, dedupe and compact a file, returning (data, memory_report, content_hash).
+# The report compares against the same rows in pandas' default dtypes; the content hash comes from the
+# row hashes computed for deduplication. Raises ValueError for unsupported formats.
+def read_compact_data(file, name=None, chunksize=CHUNK_ROWS):
+    seen_hashes = set()
+    digest = hashlib.blake2b(digest_size=16)
+    chunks = []
+    before_bytes, before_dtypes = {}, {}
+    for chunk in iter_file_chunks(file, name, chunksize):
+        chunk = clean_chunk(chunk, seen_hashes, digest)
+        if chunk.empty:
+            continue
+        for col, size in chunk.memory_usage(deep=True, index=False).items():
+            before_bytes[col] = before_bytes.get(col, 0) + size
+            before_dtypes.setdefault(col, str(chunk[col].dtype))
+        chunks.append(compact_chunk_dtypes(chunk))
+
+    # Chunks can disagree (float32 in one, float64 in the next), so compact the whole frame once more
+    data = concat_chunks(chunks)
+    data = compact_chunk_dtypes(parse_date_columns(data))
+    digest.update("|".join(map(str, data.columns)).encode())
+    return data, memory_report(before_bytes, before_dtypes, data), digest.hexdigest()
+
+def read_clean_data(file, name=None, chunksize=CHUNK_ROWS):
+    return read_compact_data(file, name, chunksize)[0]
@@ -0,0 +1,239 @@
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from model_registry import current_rss
+
+MAX_RECORDS = 5000
+PROFILE_ALL = os.environ.get("AIFORECASTER_PROFILE") == "1"
+STAGE_LOG_PATH = os.environ.get("AIFORECASTER_STAGE_LOG")
+# The metrics endpoint is local-only unless an address such as 0.0.0.0 is configured
+METRICS_HOST = os.environ.get("AIFORECASTER_METRICS_HOST", "127.0.0.1")
+
+logger = logging.getLogger("aiforecaster.stages")
+if STAGE_LOG_PATH and not logger.handlers:
+    _handler = logging.FileHandler(STAGE_LOG_PATH)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_records = deque(maxlen=MAX_RECORDS)
+_totals = {}  # stage -> aggregated counters for the metrics export
+_profiled_sessions = set()
+_lock = threading.Lock()
+_tracing_stages = 0  # profiled stages in progress; tracemalloc runs only while this is above zero
+# Context variables rather than thread-locals, so each thread and each asyncio task has its own values
+_session_id = contextvars.ContextVar("session_id", default=None)
+_depth = contextvars.ContextVar("stage_depth", default=0)
+
+# Tag stages recorded in this context (one Streamlit script run) with a session
+def set_session(session_id):
+    _session_id.set(session_id)
+
+def current_session():
+    return _session_id.get() or "unknown"
+
+# Opt-in cProfile/tracemalloc capture for one session
+def enable_profiling(session_id, enabled=True):
+    with _lock:
+        if enabled:
+            _profiled_sessions.add(session_id)
+        else:
+            _profiled_sessions.discard(session_id)
+
+def profiling_enabled(session_id):
+    return PROFILE_ALL or session_id in _profiled_sessions
+
+def _profile_text(profiler, limit=25):
+    buffer = io.StringIO()
+    pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(limit)
+    return buffer.getvalue()
+
+def _top_allocations(snapshot, limit=10):
+    return [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+
+# tracemalloc slows every allocation in the process, so it is started for the first profiled stage and
+# stopped when the last one finishes
+def _start_tracing():
+    global _tracing_stages
+    with _lock:
+        _tracing_stages += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+def _stop_tracing():
+    global _tracing_stages
+    with _lock:
+        _tracing_stages -= 1
+        if _tracing_stages == 0:
+            tracemalloc.stop()
+
+# Record wall time, CPU time and RSS growth for a named stage.
+# Only the outermost stage in a context is profiled, since profilers cannot nest.
+@contextmanager
+def stage(name, session_id=None, **labels):
+    session_id = session_id or current_session()
+    depth = _depth.get()
+    depth_token = _depth.set(depth + 1)
+    profiler = None
+    if depth == 0 and profiling_enabled(session_id):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            profiler = None  # another thread's stage is already being profiled
+        else:
+            _start_tracing()
+
+    rss_before = current_rss()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    process_cpu_start = time.process_time()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record = {
+            "stage": name,
+            "session": session_id,
+            "started_at": time.time() - (time.perf_counter() - wall_start),
+            "wall_s": time.perf_counter() - wall_start,
+            "cpu_s": time.thread_time() - cpu_start,
+            "process_cpu_s": time.process_time() - process_cpu_start,
+            "rss_mb": current_rss() / 1024 ** 2,
+            "rss_delta_mb": (current_rss() - rss_before) / 1024 ** 2,
+            "error": error,
+            **labels,
+        }
+        if profiler is not None:
+            profiler.disable()
+            try:
+                record["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+                record["top_allocations"] = _top_allocations(tracemalloc.take_snapshot())
+            finally:
+                _stop_tracing()
+            record["profile"] = _profile_text(profiler)
+        _depth.reset(depth_token)
+        _record(record)
+
+def _record(record):
+    with _lock:
+        _records.append(record)
+        totals = _totals.setdefault(record["stage"], {
+            "calls": 0, "errors": 0, "wall_s": 0.0, "cpu_s": 0.0, "max_wall_s": 0.0, "max_rss_delta_mb": 0.0,
+        })
+        totals["calls"] += 1
+        totals["errors"] += record["error"] is not None
+        totals["wall_s"] += record["wall_s"]
+        totals["cpu_s"] += record["cpu_s"]
+        totals["max_wall_s"] = max(totals["max_wall_s"], record["wall_s"])
+        totals["max_rss_delta_mb"] = max(totals["max_rss_delta_mb"], record["rss_delta_mb"])
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({key: value for key, value in record.items() if key != "profile"}, default=str))
+
+# Decorator form of stage() for whole functions
+def timed(name, **labels):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_records(session_id=None, limit=None):
+    with _lock:
+        records = [record for record in _records if session_id is None or record["session"] == session_id]
+    return records[-limit:] if limit else records
+
+def clear_records(session_id=None):
+    with _lock:
+        if session_id is None:
+            _records.clear()
+        else:
+            kept = [record for record in _records if record["session"] != session_id]
+            _records.clear()
+            _records.extend(kept)
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+# Prometheus text exposition of the per-stage totals
+def export_prometheus():
+    lines = [
+        "# TYPE aiforecaster_stage_calls_total counter",
+        "# TYPE aiforecaster_stage_errors_total counter",
+        "# TYPE aiforecaster_stage_wall_seconds_total counter",
+        "# TYPE aiforecaster_stage_cpu_seconds_total counter",
+        "# TYPE aiforecaster_stage_wall_seconds_max gauge",
+        "# TYPE aiforecaster_stage_rss_delta_megabytes_max gauge",
+    ]
+    with _lock:
+        totals = {name: dict(values) for name, values in _totals.items()}
+    for name, values in sorted(totals.items()):
+        label = f'{{stage="{_label(name)}"}}'
+        lines.append(f"aiforecaster_stage_calls_total{label} {values['calls']}")
+        lines.append(f"aiforecaster_stage_errors_total{label} {values['errors']}")
+        lines.append(f"aiforecaster_stage_wall_seconds_total{label} {values['wall_s']:.6f}")
+        lines.append(f"aiforecaster_stage_cpu_seconds_total{label} {values['cpu_s']:.6f}")
+        lines.append(f"aiforecaster_stage_wall_seconds_max{label} {values['max_wall_s']:.6f}")
+        lines.append(f"aiforecaster_stage_rss_delta_megabytes_max{label} {values['max_rss_delta_mb']:.3f}")
+    lines.append("# TYPE aiforecaster_process_rss_bytes gauge")
+    lines.append(f"aiforecaster_process_rss_bytes {current_rss()}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body = export_prometheus().encode()
+            content_type = "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/stages":
+            body = json.dumps(
+                [{key: value for key, value in record.items() if key != "profile"} for record in get_records()],
+                default=str,
+            ).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_metrics_server = None
+
+# Serve /metrics (Prometheus) and /stages (JSON) from a daemon thread; safe to call on every rerun.
+# Binds to localhost unless `host` (or AIFORECASTER_METRICS_HOST) says otherwise.
+def start_metrics_server(port, host=None):
+    global _metrics_server
+    host = host or METRICS_HOST
+    with _lock:
+        if _metrics_server is not None:
+            return _metrics_server
+        try:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            print(f"Metrics server not started on {host}:{port}: {e}")
+            return None
+    threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    return _metrics_server
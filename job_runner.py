@@ -0,0 +1,160 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from forecast_cache import get_forecast_cache, make_cache_key
+from forecast_models import run_model
+
+ACTIVE_STATES = ("queued", "running")
+MAX_JOBS_PER_USER = 20
+
+# Worker: fit and forecast in a separate process; only the forecast comes back
+def _run_forecast_job(data, target_col, model_choice, params):
+    started = time.time()
+    forecast = run_model(data, target_col, model_choice, params)
+    return started, forecast
+
+class TrainingJob:
+    def __init__(self, job_id, user_id, model_choice, target_col, params, cache_key):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.model_choice = model_choice
+        self.target_col = target_col
+        self.params = params or {}
+        self.cache_key = cache_key
+        self.state = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future = None
+
+    @property
+    def elapsed(self):
+        start = self.started_at or self.submitted_at
+        return (self.finished_at or time.time()) - start
+
+    def snapshot(self):
+        return {
+            "job_id": self.job_id,
+            "model": self.model_choice,
+            "target": self.target_col,
+            "state": self.state,
+            "elapsed_s": round(self.elapsed, 1),
+            "error": self.error,
+        }
+
+class JobRunner:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._jobs = {}  # user_id -> OrderedDict(job_id -> TrainingJob)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, user_id, data, target_col, model_choice, params=None):
+        columns = [col for col in ("date", target_col) if col in data.columns]
+        data = data[columns]
+        cache_key = make_cache_key(data, model_choice, params)
+        job = TrainingJob(next(self._ids), user_id, model_choice, target_col, params, cache_key)
+        with self._lock:
+            user_jobs = self._jobs.setdefault(user_id, OrderedDict())
+            user_jobs[job.job_id] = job
+            self._prune(user_jobs)
+
+        # Same series and parameters already fitted: finish immediately
+        entry = get_forecast_cache().get(cache_key)
+        if entry is not None:
+            job.started_at = job.finished_at = time.time()
+            job.result = entry["forecast"]
+            job.state = "done"
+            return job.job_id
+
+        try:
+            job.future = self._executor.submit(_run_forecast_job, data, target_col, model_choice, params)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool for new jobs
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            job.future = self._executor.submit(_run_forecast_job, data, target_col, model_choice, params)
+        job.future.add_done_callback(lambda future: self._on_done(job, future))
+        return job.job_id
+
+    def _on_done(self, job, future):
+        if job.state == "cancelled" or future.cancelled():
+            job.state = "cancelled"
+            job.finished_at = job.finished_at or time.time()
+            return
+        job.finished_at = time.time()
+        try:
+            job.started_at, job.result = future.result()
+            job.state = "done"
+            get_forecast_cache().put(job.cache_key, None, job.result)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.state = "failed"
+
+    def _refresh(self, job):
+        if job.state == "queued" and job.future is not None and job.future.running():
+            job.state = "running"
+            job.started_at = job.started_at or time.time()
+
+    # Drop the oldest finished jobs once a user has too many
+    def _prune(self, user_jobs):
+        finished = [job_id for job_id, job in user_jobs.items() if job.state not in ACTIVE_STATES]
+        while len(user_jobs) > MAX_JOBS_PER_USER and finished:
+            user_jobs.pop(finished.pop(0))
+
+    def get(self, user_id, job_id):
+        job = self._jobs.get(user_id, {}).get(job_id)
+        if job is not None:
+            self._refresh(job)
+        return job
+
+    def jobs(self, user_id):
+        with self._lock:
+            user_jobs = list(self._jobs.get(user_id, {}).values())
+        for job in user_jobs:
+            self._refresh(job)
+        return user_jobs
+
+    def has_active_jobs(self, user_id):
+        return any(job.state in ACTIVE_STATES for job in self.jobs(user_id))
+
+    # Queued jobs are removed from the pool; a running fit finishes but its result is discarded
+    def cancel(self, user_id, job_id):
+        job = self.get(user_id, job_id)
+        if job is None or job.state not in ACTIVE_STATES:
+            return False
+        job.state = "cancelled"
+        job.finished_at = time.time()
+        if job.future is not None:
+            job.future.cancel()
+        return True
+
+    def remove(self, user_id, job_id):
+        with self._lock:
+            job = self._jobs.get(user_id, {}).pop(job_id, None)
+        if job is not None and job.state in ACTIVE_STATES and job.future is not None:
+            job.state = "cancelled"
+            job.future.cancel()
+
+    def clear_user(self, user_id):
+        for job in self.jobs(user_id):
+            self.remove(user_id, job.job_id)
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+# Process-wide runner shared by every session
+def get_job_runner():
+    global _job_runner
+    if _job_runner is None:
+        with _job_runner_lock:
+            if _job_runner is None:
+                _job_runner = JobRunner()
+    return _job_runner
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_LAGS = (1, 2, 3, 7, 14, 28)
+DEFAULT_WINDOWS = (3, 7, 28)
+# Lags and windows longer than this share of the series are dropped, so short series still get training rows
+MAX_LAG_SHARE = 0.25
+
+# Lags and rolling windows that fit a series of n_points
+def usable_lags(n_points, lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS):
+    limit = max(1, int(n_points * MAX_LAG_SHARE))
+    lags = tuple(lag for lag in lags if lag <= limit) or (1,)
+    windows = tuple(window for window in windows if 2 <= window <= limit)
+    return lags, windows
+
+# Timestamps continuing `dates` for `horizon` steps, at the inferred (or median) spacing
+def extend_dates(dates, horizon):
+    dates = pd.DatetimeIndex(dates)
+    freq = pd.infer_freq(dates[-50:]) if len(dates) >= 3 else None
+    if freq is not None:
+        return pd.date_range(dates[-1], periods=horizon + 1, freq=freq)[1:]
+    step = pd.Series(dates).diff().median() if len(dates) > 1 else pd.Timedelta(days=1)
+    return dates[-1] + step * np.arange(1, horizon + 1)
+
+# Calendar columns for each timestamp; sin/cos pairs keep December next to January.
+# include_hours adds an hour-of-day pair; decide it once per series, so fit and forecast get the same columns
+def calendar_features(dates, include_hours=False):
+    dates = pd.DatetimeIndex(dates)
+    day_of_year = dates.dayofyear.to_numpy(dtype=np.float32)
+    day_of_week = dates.dayofweek.to_numpy(dtype=np.float32)
+    columns = [
+        np.sin(2 * np.pi * day_of_year / 365.25), np.cos(2 * np.pi * day_of_year / 365.25),
+        np.sin(2 * np.pi * day_of_week / 7), np.cos(2 * np.pi * day_of_week / 7),
+        dates.month.to_numpy(dtype=np.float32), dates.day.to_numpy(dtype=np.float32),
+    ]
+    if include_hours:
+        hours = dates.hour.to_numpy(dtype=np.float32)
+        columns += [np.sin(2 * np.pi * hours / 24), np.cos(2 * np.pi * hours / 24)]
+    return np.column_stack(columns).astype(np.float32)
+
+# Feature rows for forecasting position `origin + step - 1` from everything before `origin`.
+# Columns: target position (trend), lags, rolling means, then calendar of the target date.
+# `offset` is the position of values[0] in the full series, for callers passing only its tail.
+def feature_matrix(values, origins, step, lags, windows, target_dates=None, offset=0, include_hours=False):
+    origins = np.asarray(origins, dtype=np.int64)
+    lag_cols = values[origins[:, np.newaxis] - np.asarray(lags, dtype=np.int64)]
+    blocks = [(origins + offset + step - 1)[:, np.newaxis].astype(np.float32), lag_cols]
+    if windows:
+        # Rolling means from one cumulative sum: mean(values[o - w:o]) = (csum[o] - csum[o - w]) / w
+        csum = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+        widths = np.asarray(windows, dtype=np.int64)
+        blocks.append((csum[origins[:, np.newaxis]] - csum[origins[:, np.newaxis] - widths]) / widths)
+    if target_dates is not None:
+        blocks.append(calendar_features(target_dates, include_hours))
+    return np.hstack(blocks).astype(np.float32)
+
+# Lag-feature forecaster around any scikit-learn style regressor.
+# "recursive" fits one one-step model and feeds predictions back in; "direct" fits one model per step.
+class LagForecaster:
+    def __init__(self, make_estimator, strategy="recursive", lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS):
+        if strategy not in ("recursive", "direct"):
+            raise ValueError(f"Unknown multi-step strategy '{strategy}'.")
+        self.make_estimator = make_estimator
+        self.strategy = strategy
+        self.requested_lags = lags
+        self.requested_windows = windows
+        self.estimators = {}
+
+    # The estimator factory is often a lambda; it is only needed to fit, so leave it out of pickles
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["make_estimator"] = None
+        return state
+
+    # Models stored before include_hours existed decided it from the training dates, as fit does now
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "include_hours" not in state and "dates" in state:
+            self.include_hours = self.dates is not None and bool(self.dates.hour.any())
+
+    def fit(self, values, dates=None, horizon=10):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.dates = pd.DatetimeIndex(dates) if dates is not None else None
+        self.include_hours = self.dates is not None and bool(self.dates.hour.any())
+        self.lags, self.windows = usable_lags(len(self.values), self.requested_lags, self.requested_windows)
+        self.max_lag = max(self.lags + self.windows)
+        steps = range(1, horizon + 1) if self.strategy == "direct" else [1]
+        for step in steps:
+            origins = np.arange(self.max_lag, len(self.values) - step + 1)
+            if len(origins) < 2:
+                raise ValueError(f"Need more than {self.max_lag + step} observations for lag features.")
+            targets = origins + step - 1
+            X = feature_matrix(self.values, origins, step, self.lags, self.windows,
+                               self.dates[targets] if self.dates is not None else None,
+                               include_hours=self.include_hours)
+            estimator = self.make_estimator()
+            estimator.fit(X, self.values[targets].astype(np.float32))
+            self.estimators[step] = estimator
+        self.n_features_in_ = X.shape[1]
+        self.horizon = horizon
+        return self
+
+    def forecast(self, steps=None):
+        steps = steps or self.horizon
+        n = len(self.values)
+        future_dates = extend_dates(self.dates, steps) if self.dates is not None else None
+        if self.strategy == "direct":
+            if steps > self.horizon:
+                raise ValueError(f"Direct models were fitted for {self.horizon} steps, not {steps}.")
+            # Every step forecasts from the same last max_lag observations
+            tail = self.values[n - self.max_lag:]
+            origin = np.array([self.max_lag])
+            forecast = np.array([
+                self.estimators[step].predict(feature_matrix(
+                    tail, origin, step, self.lags, self.windows,
+                    future_dates[step - 1:step] if future_dates is not None else None, offset=n - self.max_lag,
+                    include_hours=self.include_hours,
+                ))[0]
+                for step in range(1, steps + 1)
+            ])
+            return pd.Series(forecast)
+
+        # Recursive: each prediction becomes the newest observation for the next step
+        buffer = np.empty(n + steps, dtype=np.float64)
+        buffer[:n] = self.values
+        estimator = self.estimators[1]
+        origin = np.array([self.max_lag])
+        for i in range(steps):
+            start = n + i - self.max_lag
+            X = feature_matrix(buffer[start:n + i], origin, 1, self.lags, self.windows,
+                               future_dates[i:i + 1] if future_dates is not None else None, offset=start,
+                               include_hours=self.include_hours)
+            buffer[n + i] = estimator.predict(X)[0]
+        return pd.Series(buffer[n:])
+
+# Fit a LagForecaster on the non-missing target values (and their dates, when present)
+def fit_lag_forecaster(data, target_col, make_estimator, horizon=10, strategy="recursive",
+                       lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS):
+    df = data.dropna(subset=[target_col])
+    dates = pd.to_datetime(df["date"], errors="coerce") if "date" in df.columns else None
+    if dates is not None and dates.isna().any():
+        dates = None  # calendar features need every timestamp
+    return LagForecaster(make_estimator, strategy, lags, windows).fit(df[target_col].to_numpy(), dates, horizon)
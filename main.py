@@ -1,13 +1,23 @@
 # main.py
 
+import uuid
 import streamlit as st
 from data_handler import (
     process_uploaded_data,
-    download_template
+    download_template,
+    get_dataset_stats
 )
-from forecasting import apply_forecasting  # Import apply_forecasting for forecasting options
+from forecasting import apply_forecasting, parse_arima_order  # Import apply_forecasting for forecasting options
 from streamlit_option_menu import option_menu
-from auth import register_user, login_user  # Assuming you have an auth.py for authentication
+from auth import async_register_user, async_login_user, run_async  # Assuming you have an auth.py for authentication
+from dataset_store import get_dataset_store
+from streaming import STREAM_FEED_DIR, STREAM_MODELS, get_stream_manager
+from scenario import LAYER_KINDS, ScenarioEngine
+from forecast_files import DEFAULT_OUTPUT_DIR, read_forecast, read_manifest, read_summary
+from instrumentation import set_session, enable_profiling, get_records, clear_records, export_prometheus, start_metrics_server
+import os
+import numpy as np
+import pandas as pd
 
 # Initialize session state variables
 if 'authenticated' not in st.session_state:
@@ -16,11 +26,62 @@ if 'selected_data_type' not in st.session_state:
     st.session_state.selected_data_type = None
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "Home"  # Default to the Home page
-if 'data' not in st.session_state:
-    st.session_state.data = None
+if 'session_key' not in st.session_state:
+    st.session_state.session_key = uuid.uuid4().hex  # Identifies this session's frames in the dataset store
 if 'auth_mode' not in st.session_state:
     st.session_state.auth_mode = "Login"  # Default to Login
 
+# The uploaded frame lives in the shared dataset store, not in st.session_state
+def get_session_data():
+    return get_dataset_store().get(st.session_state.session_key, "data")
+
+def set_session_data(data):
+    get_dataset_store().put(st.session_state.session_key, "data", data)
+
+def clear_session_data():
+    get_dataset_store().drop(st.session_state.session_key)
+
+def show_memory_usage():
+    store = get_dataset_store()
+    usage = store.session_usage(st.session_state.session_key)
+    st.caption(f"Dataset memory: {usage['hot_mb']:.1f} MB in RAM, {usage['spilled_mb']:.1f} MB on disk")
+    if st.session_state.get('role') == 'admin':
+        with st.expander("Dataset memory by session"):
+            stats = store.stats()
+            st.write(f"{stats['hot_bytes'] / 1024 ** 2:.1f} of {stats['max_bytes'] / 1024 ** 2:.0f} MB budget in use")
+            st.dataframe(store.usage())
+
+# Stage timings for this session, with opt-in cProfile/tracemalloc capture
+def show_debug_panel():
+    if st.session_state.get('role') != 'admin' and os.environ.get("AIFORECASTER_DEBUG") != "1":
+        return
+    if not st.checkbox("Show debug panel", key="debug_panel"):
+        return
+    session_key = st.session_state.session_key
+    profile = st.checkbox("Capture cProfile and tracemalloc", key="debug_profile")
+    enable_profiling(session_key, profile)
+
+    records = get_records(session_key, limit=200)
+    if records:
+        table = pd.DataFrame(records)
+        columns = [col for col in ["stage", "model", "op", "wall_s", "cpu_s", "rss_delta_mb", "rss_mb", "error"] if col in table]
+        st.dataframe(table[columns].iloc[::-1])
+        summary = table.groupby("stage")[["wall_s", "cpu_s"]].agg(["count", "sum", "max"])
+        st.dataframe(summary)
+        profiled = [record for record in records if "profile" in record]
+        if profiled:
+            latest = profiled[-1]
+            with st.expander(f"Latest profile: {latest['stage']} ({latest['wall_s']:.2f}s)"):
+                st.write(f"tracemalloc peak: {latest['tracemalloc_peak_mb']:.1f} MB")
+                st.code("\n".join(latest["top_allocations"]))
+                st.code(latest["profile"])
+        st.download_button("Export Stage Log", table.drop(columns=["profile", "top_allocations"], errors="ignore").to_json(orient="records", lines=True),
+                           "stage_log.jsonl", "application/json")
+        st.download_button("Export Metrics", export_prometheus(), "metrics.txt", "text/plain")
+    if st.button("Clear Stage Log"):
+        clear_records(session_key)
+        st.rerun()
+
 def show_login_page():
     st.title("Login or Sign Up")
     if st.session_state.auth_mode == "Login":
@@ -35,7 +96,7 @@ def show_login_form():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Login", key="login_button"):
-            result = login_user(email, password)
+            result = run_async(async_login_user(email, password))
             if result:
                 st.session_state.authenticated = True
                 st.session_state.user_id = result['response'].user.id
@@ -57,7 +118,7 @@ def show_signup_form():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Sign Up", key="signup_button"):
-            response = register_user(email, password)
+            response = run_async(async_register_user(email, password))
             if response.get("success"):
                 st.success(response.get("message"))
                 st.session_state.authenticated = True
@@ -98,13 +159,16 @@ def show_sidebar_menu():
         )
         st.session_state.current_page = selected_menu
 
+        show_memory_usage()
+        show_debug_panel()
+
         if st.button("Logout", key="logout_button"):
             st.session_state.authenticated = False
             st.session_state.user_id = ''
             st.session_state.role = ''
             st.session_state.selected_data_type = None
             st.session_state.current_page = "Home"
-            st.session_state.data = None
+            clear_session_data()
             st.session_state.auth_mode = "Login"
             st.rerun()
 
@@ -121,19 +185,19 @@ def show_upload_page():
     with col1:
         if st.button("Sales"):
             st.session_state.selected_data_type = "Sales"
-            st.session_state.pop('data', None)  # Reset data when data type changes
+            clear_session_data()  # Reset data when data type changes
     with col2:
         if st.button("Stocks"):
             st.session_state.selected_data_type = "Stocks"
-            st.session_state.pop('data', None)
+            clear_session_data()
     with col3:
         if st.button("Commodities"):
             st.session_state.selected_data_type = "Commodities"
-            st.session_state.pop('data', None)
+            clear_session_data()
     with col4:
         if st.button("Custom"):
             st.session_state.selected_data_type = "Custom"
-            st.session_state.pop('data', None)
+            clear_session_data()
     
     if st.session_state.selected_data_type:
         st.subheader(f"{st.session_state.selected_data_type} Data - Template Download & Upload")
@@ -149,23 +213,254 @@ def show_upload_page():
             )
     
         # File uploader for user data
-        file = st.file_uploader("Choose a CSV or Excel file", type=['csv', 'xlsx'], key="file_uploader")
+        file = st.file_uploader("Choose a CSV, Excel, Parquet or Arrow file", type=['csv', 'xlsx', 'parquet', 'arrow', 'feather', 'ipc'], key="file_uploader")
         if file:
             st.write("Processing the uploaded data...")
             cleaned_data = process_uploaded_data(file)
             if cleaned_data is not None:
-                st.session_state.data = cleaned_data
+                set_session_data(cleaned_data)
                 st.success("Data processed successfully.")
                 st.dataframe(cleaned_data.head())
 
 def show_forecasting_page():
     st.header("Forecasting")
-    if st.session_state.data is not None:
-        apply_forecasting(st.session_state.data)
+    data = get_session_data()
+    if data is not None:
+        apply_forecasting(data)
     else:
         st.warning("Please upload data in the 'Upload Data' section before accessing forecasting.")
 
+# Summary statistics read from the precomputed sketches; nothing here rescans the data
+def show_data_analysis_page():
+    st.header("Data Analysis")
+    stats = get_dataset_stats()
+    if stats is None or get_session_data() is None:
+        st.warning("Please upload data in the 'Upload Data' section before accessing data analysis.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Rows", f"{stats.rows:,}")
+    col2.metric("Columns", len(stats.columns))
+    col3.metric("Groups", len(stats.groups) if stats.group_col else "-")
+    st.caption("Quantiles are within 1% and distinct counts within about 2% of the exact values.")
+    st.dataframe(stats.describe())
+
+    if stats.group_col:
+        numeric_cols = [col for col, column_stats in stats.columns.items() if column_stats.kind == "numeric"]
+        if numeric_cols:
+            column = st.selectbox(f"Per-{stats.group_col} summary of", numeric_cols)
+            table = stats.group_table(column)
+            st.caption("Per-group quantiles are within 1%; per-group distinct counts use smaller sketches "
+                       "and are within about 6.5% of the exact values.")
+            st.dataframe(table)
+            if "mean" in table:
+                st.bar_chart(table["mean"].nlargest(50))
+
+# Live forecasts from a tailed file or a local socket feed, refreshed in place without refitting
+def show_realtime_page():
+    st.header("Real-Time Insights")
+    manager = get_stream_manager()
+    name = f"{st.session_state.get('user_id') or 'anonymous'}:live"
+    stream = manager.get(name)
+
+    if stream is None or not stream.running:
+        if stream is not None and stream.error:
+            st.error(f"The last stream stopped: {stream.error}")
+        kind = st.radio("Feed", ["Tail a file", "Listen on a local socket"], horizontal=True)
+        if kind == "Tail a file":
+            # Only files under the configured AIFORECASTER_STREAM_DIR can be tailed
+            feed_root = os.path.realpath(STREAM_FEED_DIR)
+            path = st.text_input(f"File (inside {feed_root})", "feed.csv", help="Lines of 'value' or 'timestamp,value'.")
+            source = _inside(feed_root, os.path.join(feed_root, path.strip()))
+            if source is None:
+                st.error(f"Files can only be tailed from inside '{feed_root}'.")
+        else:
+            source = f"127.0.0.1:{st.number_input('Port', 1024, 65535, 9009)}"
+        model_choice = st.selectbox("Model", STREAM_MODELS)
+        params = {}
+        if model_choice == "Moving Average":
+            params["window"] = st.slider("Window size", 1, 200, 20)
+        elif model_choice == "Exponential Smoothing":
+            params["seasonal_periods"] = st.number_input("Seasonal Periods", 2, 1000, 12)
+            params["seasonal"] = st.selectbox("Seasonal Component", ["add", "mul", None])
+        else:
+            order = st.text_input("ARIMA order (p,d,q)", "(1,1,1)")
+            try:
+                params["order"] = parse_arima_order(order)
+            except ValueError as e:
+                st.error(str(e))
+                return
+        horizon = st.slider("Forecast horizon", 1, 200, 20)
+        warmup = st.number_input("Warm-up points (parameters are estimated once from these)", 10, 100_000, 200)
+        if st.button("Start Stream", disabled=source is None):
+            try:
+                manager.close(name)
+                manager.open(name, source, "file" if kind == "Tail a file" else "socket", model_choice, params, horizon, warmup)
+                st.rerun()
+            except (OSError, ValueError) as e:
+                st.error(f"Could not start the stream: {e}")
+        return
+
+    if st.button("Stop Stream"):
+        manager.close(name)
+        st.rerun()
+    fragment = getattr(st, "fragment", None)
+    if fragment is None:
+        render_live_stream(name)
+    else:
+        fragment(run_every=1)(render_live_stream)(name)
+
+def render_live_stream(name):
+    stream = get_stream_manager().get(name)
+    if stream is None:
+        return
+    snapshot = stream.snapshot()
+    if snapshot["error"]:
+        st.error(f"Stream stopped: {snapshot['error']}")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Points", snapshot["events"])
+    col2.metric("Points/s", f"{snapshot['events_per_second']:.0f}")
+    col3.metric("Rejected lines", snapshot["rejected"])
+    col4.metric("Last value", f"{snapshot['history'][-1]:.4g}" if len(snapshot["history"]) else "-")
+    st.caption(f"{snapshot['model']} on {snapshot['kind']} {snapshot['source']}")
+
+    if snapshot["warming_up"]:
+        st.progress(snapshot["warmup_progress"], text="Collecting warm-up points")
+    history = snapshot["history"]
+    chart = pd.DataFrame({"History": history}, index=np.arange(len(history)))
+    if snapshot["forecast"] is not None:
+        forecast = pd.DataFrame({"Forecast": snapshot["forecast"]},
+                                index=np.arange(len(history), len(history) + len(snapshot["forecast"])))
+        chart = pd.concat([chart, forecast])
+    st.line_chart(chart)
+
+LAYER_LABELS = {"uplift": "Percentage uplift", "override": "Override", "elasticity": "Driver elasticity"}
+
+# What-if layers over the latest forecast, applied without refitting
+def show_adjust_predictions_page():
+    st.header("Adjust Predictions")
+    base = get_dataset_store().get(st.session_state.session_key, "base_forecast")
+    if base is None:
+        st.warning("Run a forecast in the 'Forecasting' section first; it becomes the base for adjustments.")
+        return
+    # A new forecast starts a new scenario
+    version = st.session_state.get("base_forecast_version")
+    if st.session_state.get("scenario") is None or st.session_state.get("scenario_version") != version:
+        st.session_state.scenario = ScenarioEngine(base)
+        st.session_state.scenario_version = version
+    st.caption(f"Base: {st.session_state.get('base_forecast_label', 'forecast')}, "
+               f"{base.shape[1]} series over {len(base)} steps")
+
+    # Widget changes rerun only the fragment, so sliders update the scenario without redrawing the page
+    fragment = getattr(st, "fragment", None)
+    if fragment is None:
+        render_scenario(st.session_state.scenario)
+    else:
+        fragment(render_scenario)(st.session_state.scenario)
+
+def render_scenario(scenario):
+    col1, col2 = st.columns([3, 1])
+    kind = col1.selectbox("Adjustment", LAYER_KINDS, format_func=LAYER_LABELS.get)
+    if col2.button("Add layer"):
+        scenario.add_layer(kind)
+    for layer in list(scenario.layers):
+        render_adjustment_layer(scenario, layer)
+
+    result = scenario.result()
+    impact = scenario.impact()
+    base_total, adjusted_total = impact["base"].sum(), impact["adjusted"].sum()
+    col1, col2 = st.columns(2)
+    col1.metric("Base total", f"{base_total:,.0f}")
+    col2.metric("Adjusted total", f"{adjusted_total:,.0f}",
+                f"{(adjusted_total / base_total - 1) * 100:+.1f}%" if base_total else None)
+
+    series = st.selectbox("Show series", scenario.series, key="scenario_series")
+    st.line_chart(pd.DataFrame({"Base": scenario.base[series], "Adjusted": result[series]}))
+    if len(scenario.series) > 1:
+        st.dataframe(impact.reindex(impact["change_pct"].abs().sort_values(ascending=False).index).head(50))
+    st.download_button("Download Adjusted Forecast", result.to_csv(), "adjusted_forecast.csv", "text/csv")
+
+def render_adjustment_layer(scenario, layer):
+    key = f"layer_{layer['id']}"
+    index = scenario.base.index
+    with st.expander(f"{LAYER_LABELS[layer['kind']]} #{layer['id']}", expanded=True):
+        start = end = None
+        if len(index) > 1:
+            start, end = st.select_slider(
+                "Dates", options=list(index), value=(index[0], index[-1]), key=f"{key}_dates",
+                format_func=lambda value: value.strftime("%Y-%m-%d") if hasattr(value, "strftime") else str(value),
+            )
+        series = st.multiselect("Series (none selected means all)", scenario.series, key=f"{key}_series")
+        if layer["kind"] == "uplift":
+            settings = {"pct": st.slider("Uplift %", -100.0, 200.0, 0.0, 1.0, key=f"{key}_pct")}
+        elif layer["kind"] == "override":
+            settings = {"value": st.number_input("Forecast value", value=None, key=f"{key}_value")}
+        else:
+            settings = {
+                "change_pct": st.slider("Driver change % (e.g. price)", -90.0, 200.0, 0.0, 1.0, key=f"{key}_change"),
+                "elasticity": st.slider("Elasticity", -5.0, 5.0, -1.0, 0.1, key=f"{key}_elasticity"),
+            }
+        if st.button("Remove layer", key=f"{key}_remove"):
+            scenario.remove_layer(layer["id"])
+            return
+        try:
+            scenario.update_layer(layer["id"], start=start, end=end, series=series or None, **settings)
+        except ValueError as e:
+            st.error(str(e))
+
+# Resolved path, or None when it lies outside root (e.g. through "..", an absolute path or a symlink)
+def _inside(root, path):
+    resolved = os.path.realpath(path)
+    return resolved if os.path.commonpath([root, resolved]) == root else None
+
+# Results of the offline batch run (python forecast_files.py ...); only runs under the configured
+# AIFORECASTER_BATCH_OUTPUT directory can be opened
+def show_reports_page():
+    st.header("Reports")
+    root = os.path.realpath(os.environ.get("AIFORECASTER_BATCH_OUTPUT", DEFAULT_OUTPUT_DIR))
+    subdir = st.text_input(f"Batch run (subdirectory of {root}, blank for the top level)", "")
+    output_dir = _inside(root, os.path.join(root, subdir.strip()))
+    if output_dir is None:
+        st.error(f"Batch runs can only be read from inside '{root}'.")
+        return
+    summary = read_summary(output_dir)
+    if summary is None:
+        st.info(f"No batch run found in '{output_dir}'. Run `python forecast_files.py <directory> --model ARIMA` to create one.")
+        return
+
+    st.write(f"Model: {summary['model']} (last updated {summary['updated_at']})")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Files", summary["files"])
+    col2.metric("Succeeded", summary["succeeded"])
+    col3.metric("Failed", summary["failed"])
+    col4.metric("Series", summary["series"])
+
+    manifest = read_manifest(output_dir)
+    columns = [col for col in ["file", "status", "rows", "series", "target", "seconds", "error", "finished_at"] if col in manifest]
+    st.dataframe(manifest[columns])
+
+    finished = manifest[manifest["status"] == "ok"] if not manifest.empty else manifest
+    if finished.empty:
+        return
+    file = st.selectbox("Show forecast for", finished["file"])
+    output_path = finished.loc[finished["file"] == file, "output"].iloc[0]
+    if _inside(root, output_path) is None:
+        st.error(f"'{output_path}' is outside '{root}'.")
+        return
+    try:
+        forecast = read_forecast(output_path)
+    except (OSError, ValueError) as e:
+        st.error(f"Could not read '{output_path}': {e}")
+        return
+    st.line_chart(forecast.iloc[:, :10])
+    st.dataframe(forecast)
+    st.download_button("Download Forecast", forecast.to_csv(), f"{os.path.basename(output_path).rsplit('.', 1)[0]}.csv", "text/csv")
+
 def main():
+    set_session(st.session_state.session_key)
+    if os.environ.get("AIFORECASTER_METRICS_PORT"):
+        start_metrics_server(int(os.environ["AIFORECASTER_METRICS_PORT"]))
+
     if not st.session_state.authenticated:
         show_login_page()
     else:
@@ -177,15 +472,15 @@ def main():
         elif st.session_state.current_page == "Upload Data":
             show_upload_page()
         elif st.session_state.current_page == "Data Analysis":
-            st.write("Data Analysis page under construction.")
+            show_data_analysis_page()
         elif st.session_state.current_page == "Forecasting":
             show_forecasting_page()
         elif st.session_state.current_page == "Real-Time Insights":
-            st.write("Real-Time Insights page under construction.")
+            show_realtime_page()
         elif st.session_state.current_page == "Adjust Predictions":
-            st.write("Adjust Predictions page under construction.")
+            show_adjust_predictions_page()
         elif st.session_state.current_page == "Reports":
-            st.write("Reports page under construction.")
+            show_reports_page()
         else:
             st.error("Page not found.")
 
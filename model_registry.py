@@ -0,0 +1,124 @@
+import importlib
+import os
+import resource
+import sys
+import threading
+import time
+
+# Heavy model backends, imported only when a model that needs them is first run.
+# Each entry maps a backend name to the (module, attribute) pairs it exposes.
+MODEL_BACKENDS = {
+    "arima": [("statsmodels.tsa.arima.model", "ARIMA")],
+    "holtwinters": [("statsmodels.tsa.holtwinters", "ExponentialSmoothing")],
+    "stattools": [("statsmodels.tsa.stattools", "kpss")],
+    "prophet": [("prophet", "Prophet")],
+    "linear_regression": [("sklearn.linear_model", "LinearRegression")],
+    "random_forest": [("sklearn.ensemble", "RandomForestRegressor")],
+    "svr": [
+        ("sklearn.svm", "SVR"),
+        ("sklearn.svm", "LinearSVR"),
+        ("sklearn.kernel_approximation", "Nystroem"),
+        ("sklearn.preprocessing", "StandardScaler"),
+        ("sklearn.pipeline", "make_pipeline"),
+        ("sklearn.compose", "TransformedTargetRegressor"),
+    ],
+    "keras": [
+        ("tensorflow.keras.models", "Sequential"),
+        ("tensorflow.keras.models", "load_model"),
+        ("tensorflow.keras.layers", "Dense"),
+        ("tensorflow.keras.layers", "LSTM"),
+    ],
+}
+
+# Which backend each model in apply_forecasting needs (Moving Average needs none)
+MODEL_CHOICE_BACKENDS = {
+    "ARIMA": "arima",
+    "Prophet": "prophet",
+    "Moving Average": None,
+    "Exponential Smoothing": "holtwinters",
+    "Linear Regression": "linear_regression",
+    "Random Forest": "random_forest",
+    "Support Vector Regression (SVR)": "svr",
+    "LSTM Neural Network": "keras",
+}
+
+_loaded_backends = {}
+_import_report = {}
+_lock = threading.Lock()
+
+# Resident set size of this process in bytes
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Fall back to peak RSS where /proc is not available (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+# Import a backend on first use and return a dict of its exported names
+def load_backend(name):
+    if name not in MODEL_BACKENDS:
+        raise KeyError(f"Unknown model backend '{name}'.")
+    if name in _loaded_backends:
+        return _loaded_backends[name]
+
+    with _lock:
+        if name in _loaded_backends:
+            return _loaded_backends[name]
+
+        rss_before = current_rss()
+        start = time.perf_counter()
+        exports = {}
+        for module_name, attr in MODEL_BACKENDS[name]:
+            module = importlib.import_module(module_name)
+            exports[attr] = getattr(module, attr)
+        elapsed = time.perf_counter() - start
+
+        _import_report[name] = {
+            "backend": name,
+            "import_seconds": elapsed,
+            "rss_delta_mb": (current_rss() - rss_before) / 1024 ** 2,
+            "loaded_at": time.time(),
+        }
+        _loaded_backends[name] = exports
+        return exports
+
+# Convenience accessor for a single exported class, e.g. get_model_class("arima", "ARIMA")
+def get_model_class(backend, attr):
+    return load_backend(backend)[attr]
+
+# Load whatever a given apply_forecasting model choice needs
+def load_backend_for_model(model_choice):
+    backend = MODEL_CHOICE_BACKENDS.get(model_choice)
+    if backend is None:
+        return {}
+    return load_backend(backend)
+
+def is_backend_loaded(name):
+    return name in _loaded_backends
+
+# Import time and memory for each backend loaded so far in this process
+def get_import_report():
+    return [dict(entry) for entry in _import_report.values()]
+
+# Check loaded backends against a cold-start budget; returns the entries that exceed it
+def check_cold_start_budget(max_seconds=None, max_rss_mb=None):
+    over_budget = []
+    for entry in get_import_report():
+        if max_seconds is not None and entry["import_seconds"] > max_seconds:
+            over_budget.append(entry)
+        elif max_rss_mb is not None and entry["rss_delta_mb"] > max_rss_mb:
+            over_budget.append(entry)
+    return over_budget
+
+# Import every backend up front, e.g. from a worker initializer or a warm-up script
+def preload_backends(names=None):
+    for name in names or MODEL_BACKENDS:
+        load_backend(name)
+    return get_import_report()
+
+if __name__ == "__main__":
+    # Measure each backend's cold import cost: python model_registry.py [backend ...]
+    for entry in preload_backends(sys.argv[1:] or None):
+        print(f"{entry['backend']:<20} {entry['import_seconds']:8.2f}s {entry['rss_delta_mb']:10.1f} MB")
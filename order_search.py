@@ -0,0 +1,243 @@
+import math
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from model_registry import get_model_class
+
+# Seasonal periods to try for each pandas frequency code
+SEASONAL_PERIODS_BY_FREQ = {
+    "H": [24, 168], "D": [7, 365], "B": [5], "W": [52],
+    "M": [12], "ME": [12], "MS": [12], "Q": [4], "QE": [4], "QS": [4],
+}
+
+SEARCH_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+class BudgetExceeded(Exception):
+    pass
+
+# Raise BudgetExceeded inside the block once `deadline` (time.time()) passes. The interrupt uses SIGALRM,
+# so it only applies on the main thread of a Unix process (pool workers); elsewhere only the start is checked.
+@contextmanager
+def _time_limit(deadline):
+    if deadline is None:
+        yield
+        return
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise BudgetExceeded()
+    use_alarm = hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        def on_alarm(signum, frame):
+            raise BudgetExceeded()
+
+        previous = signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        yield
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+# Worker: fit one ARIMA order; returns (order, aic) with aic=inf for failures, non-convergence or overrun
+def _fit_arima_candidate(values, order, maxiter, deadline=None):
+    ARIMA = get_model_class("arima", "ARIMA")
+    try:
+        with _time_limit(deadline), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            result = ARIMA(values, order=order).fit(method_kwargs={"maxiter": maxiter})
+        converged = result.mle_retvals.get("converged", True) if result.mle_retvals else True
+        return order, float(result.aic) if converged else math.inf
+    except Exception:
+        return order, math.inf
+
+# Worker: fit one Holt-Winters configuration; returns (config, aic)
+def _fit_holtwinters_candidate(values, config, deadline=None):
+    ExponentialSmoothing = get_model_class("holtwinters", "ExponentialSmoothing")
+    try:
+        with _time_limit(deadline), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            result = ExponentialSmoothing(values, **config).fit()
+        retvals = getattr(result, "mle_retvals", None)
+        converged = getattr(retvals, "success", True) if retvals is not None else True
+        return config, float(result.aic) if converged and np.isfinite(result.aic) else math.inf
+    except Exception:
+        return config, math.inf
+
+_search_executor = None
+_search_executor_lock = threading.Lock()
+
+# One bounded pool shared by every search in the process, instead of a new pool per search
+def get_search_executor(reset=False):
+    global _search_executor
+    if _search_executor is None or reset:
+        with _search_executor_lock:
+            if _search_executor is None or reset:
+                _search_executor = ProcessPoolExecutor(max_workers=SEARCH_WORKERS)
+    return _search_executor
+
+# Searches already running in a pool worker (grouped forecasts, background jobs, backtests, ensemble
+# members) fit sequentially, so pools are never nested inside pool workers
+def _in_worker():
+    return multiprocessing.parent_process() is not None
+
+# None means fit in-process: n_jobs=1, a single CPU, or inside a worker
+def _executor(n_jobs):
+    if n_jobs == 1 or SEARCH_WORKERS == 1 or _in_worker():
+        return None
+    return get_search_executor()
+
+# Fit a round of candidates within time_budget seconds. The deadline travels with each candidate, so a
+# fit still running when it passes stops itself in the worker rather than occupying it.
+# Returns (results, number abandoned).
+def _evaluate(executor, fit, args_list, time_budget):
+    deadline = time.time() + time_budget
+    if executor is not None:
+        try:
+            futures = [executor.submit(fit, *args, deadline) for args in args_list]
+        except BrokenProcessPool:
+            get_search_executor(reset=True)
+            executor = None  # finish this round in-process
+    if executor is None:
+        results = []
+        for args in args_list:
+            if time.time() >= deadline:
+                break
+            results.append(fit(*args, deadline))
+        return results, len(args_list) - len(results)
+
+    done, not_done = wait(futures, timeout=time_budget)
+    for future in not_done:
+        future.cancel()  # queued candidates; running ones stop at the deadline
+    results = []
+    for future in futures:
+        if future in done:
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                get_search_executor(reset=True)
+    return results, len(not_done)
+
+# Number of differences needed for stationarity, by repeated KPSS tests
+def choose_differencing(values, max_d=2, alpha=0.05):
+    kpss = get_model_class("stattools", "kpss")
+    series = np.asarray(values, dtype=float)
+    for d in range(max_d + 1):
+        if len(series) < 10:
+            return d
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            p_value = kpss(series, regression="c", nlags="auto")[1]
+        if p_value >= alpha:
+            return d
+        series = np.diff(series)
+    return max_d
+
+# Stepwise (Hyndman-Khandakar) search over ARIMA (p,d,q) minimising AIC.
+# n_jobs=1 fits sequentially in-process; otherwise the shared search pool is used (except inside a worker).
+def search_arima_order(values, max_p=5, max_q=5, max_d=2, n_jobs=None, time_budget=10.0, max_steps=30, maxiter=50):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    d = choose_differencing(values, max_d)
+    start = time.perf_counter()
+    visited = {}
+    abandoned = 0
+    executor = _executor(n_jobs)
+
+    def evaluate(orders):
+        nonlocal abandoned
+        orders = [order for order in orders if order not in visited]
+        results, timed_out = _evaluate(
+            executor, _fit_arima_candidate, [(values, order, maxiter) for order in orders], time_budget
+        )
+        abandoned += timed_out
+        visited.update({order: math.inf for order in orders})
+        visited.update(dict(results))
+
+    evaluate([(2, d, 2), (0, d, 0), (1, d, 0), (0, d, 1)])
+    best = min(visited, key=visited.get)
+    for _ in range(max_steps):
+        p, _, q = best
+        neighbours = [
+            (p + dp, d, q + dq)
+            for dp in (-1, 0, 1) for dq in (-1, 0, 1)
+            if (dp or dq) and 0 <= p + dp <= max_p and 0 <= q + dq <= max_q
+        ]
+        evaluate(neighbours)
+        candidate = min(visited, key=visited.get)
+        if visited[candidate] >= visited[best]:
+            break
+        best = candidate
+
+    return {
+        "order": best,
+        "aic": visited[best],
+        "evaluated": len(visited),
+        "abandoned": abandoned,
+        "seconds": time.perf_counter() - start,
+    }
+
+def candidate_seasonal_periods(n_points, dates=None):
+    periods = [12]
+    if dates is not None and len(dates) >= 3:
+        freq = pd.infer_freq(pd.DatetimeIndex(pd.to_datetime(dates[:50])))
+        if freq:
+            periods = SEASONAL_PERIODS_BY_FREQ.get(freq.split("-")[0].upper(), periods)
+    # Holt-Winters needs at least two full cycles
+    return [period for period in periods if 2 <= period and 2 * period <= n_points]
+
+# Holt-Winters configuration search minimising AIC: trend first, then seasonality, then damping.
+# Each stage only keeps going if it beats the best configuration so far.
+def search_holtwinters(values, dates=None, seasonal_periods=None, n_jobs=None, time_budget=10.0):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    positive = bool(np.all(values > 0))
+    periods = seasonal_periods or candidate_seasonal_periods(len(values), dates)
+    start = time.perf_counter()
+    evaluated, abandoned = [], 0
+    executor = _executor(n_jobs)
+
+    def evaluate(configs):
+        nonlocal abandoned
+        results, timed_out = _evaluate(
+            executor, _fit_holtwinters_candidate, [(values, config) for config in configs], time_budget
+        )
+        abandoned += timed_out
+        evaluated.extend(results)
+        return min(results, key=lambda result: result[1], default=(None, math.inf))
+
+    trends = [None, "add"] + (["mul"] if positive else [])
+    best, best_aic = evaluate([{"trend": trend, "seasonal": None} for trend in trends])
+
+    seasonals = ["add"] + (["mul"] if positive else [])
+    seasonal_configs = [
+        {**(best or {"trend": None}), "seasonal": seasonal, "seasonal_periods": period}
+        for period in periods for seasonal in seasonals
+    ]
+    if seasonal_configs:
+        config, aic = evaluate(seasonal_configs)
+        if aic < best_aic:
+            best, best_aic = config, aic
+
+    if best is not None and best.get("trend"):
+        config, aic = evaluate([{**best, "damped_trend": True}])
+        if aic < best_aic:
+            best, best_aic = config, aic
+
+    return {
+        "config": best or {"trend": None, "seasonal": None},
+        "aic": best_aic,
+        "evaluated": len(evaluated),
+        "abandoned": abandoned,
+        "seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,125 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+LAYER_KINDS = ("uplift", "override", "elasticity")
+
+# Default settings of a new layer; start/end None means the whole horizon, series None means every series
+LAYER_DEFAULTS = {
+    "uplift": {"pct": 0.0},
+    "override": {"value": None},  # no override until a value is entered
+    "elasticity": {"elasticity": -1.0, "change_pct": 0.0},
+}
+
+# What-if layers over a base forecast (steps x series), applied in order without refitting:
+#   uplift      values * (1 + pct / 100)
+#   override    values = value
+#   elasticity  values * (1 + change_pct / 100) ** elasticity, e.g. a price change with a price elasticity
+# Each layer covers a date range and a set of series. The output after every layer is kept, so changing a
+# layer recomputes only the rows and series it covers (before and after the change), from that layer on.
+class ScenarioEngine:
+    def __init__(self, base):
+        self.base = base
+        self.values = base.to_numpy(dtype=np.float64)
+        self.series = pd.Index(base.columns.astype(str))
+        self.layers = []
+        self._outputs = []
+        self._ids = itertools.count(1)
+
+    @property
+    def adjusted(self):
+        return self._outputs[-1] if self._outputs else self.values
+
+    def result(self):
+        return pd.DataFrame(self.adjusted, index=self.base.index, columns=self.base.columns)
+
+    # Base and adjusted totals per series over the horizon
+    def impact(self):
+        base, adjusted = self.values.sum(axis=0), self.adjusted.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where(base != 0, (adjusted / base - 1) * 100, np.nan)
+        return pd.DataFrame({"base": base, "adjusted": adjusted, "change_pct": change}, index=self.series)
+
+    def _rows(self, layer):
+        index = self.base.index
+        start = 0 if layer["start"] is None else int(index.searchsorted(layer["start"], side="left"))
+        end = len(index) if layer["end"] is None else int(index.searchsorted(layer["end"], side="right"))
+        return start, max(start, end)
+
+    def _columns(self, layer):
+        if layer["series"] is None:
+            return np.ones(len(self.series), dtype=bool)
+        return self.series.isin([str(name) for name in layer["series"]])
+
+    # Apply one layer to block = outputs[rows start:end, columns cols] in place
+    def _apply(self, layer, block, start, end, cols):
+        layer_start, layer_end = self._rows(layer)
+        lo, hi = max(start, layer_start), min(end, layer_end)
+        selected = self._columns(layer)[cols]
+        if hi <= lo or not selected.any() or (layer["kind"] == "override" and layer["value"] is None):
+            return
+        target = (slice(lo - start, hi - start), selected)
+        if layer["kind"] == "uplift":
+            block[target] *= 1 + layer["pct"] / 100
+        elif layer["kind"] == "override":
+            block[target] = layer["value"]
+        else:
+            block[target] *= (1 + layer["change_pct"] / 100) ** layer["elasticity"]
+
+    # Redo layers first..last inside rows start:end and the series in `cols`; nothing else can have changed
+    def _recompute(self, first, start, end, cols):
+        if end <= start or not cols.any():
+            return
+        cols = np.flatnonzero(cols)
+        for i in range(first, len(self.layers)):
+            previous = self._outputs[i - 1] if i > 0 else self.values
+            block = previous[start:end, cols]
+            self._apply(self.layers[i], block, start, end, cols)
+            self._outputs[i][start:end, cols] = block
+
+    def _validate(self, layer):
+        if layer["kind"] not in LAYER_KINDS:
+            raise ValueError(f"Unknown adjustment '{layer['kind']}'. Choose one of: {', '.join(LAYER_KINDS)}.")
+        if layer["kind"] == "elasticity" and layer["change_pct"] <= -100:
+            raise ValueError("A driver change must stay above -100%.")
+
+    def add_layer(self, kind, start=None, end=None, series=None, **settings):
+        layer = {"id": next(self._ids), "kind": kind, "start": start, "end": end, "series": series,
+                 **LAYER_DEFAULTS.get(kind, {}), **settings}
+        self._validate(layer)
+        self.layers.append(layer)
+        self._outputs.append(self.adjusted.copy())
+        start, end = self._rows(layer)
+        self._recompute(len(self.layers) - 1, start, end, self._columns(layer))
+        return layer["id"]
+
+    def _position(self, layer_id):
+        for i, layer in enumerate(self.layers):
+            if layer["id"] == layer_id:
+                return i
+        raise KeyError(f"No adjustment layer {layer_id}.")
+
+    # Change a layer's settings; returns False (and does no work) when nothing changed
+    def update_layer(self, layer_id, **settings):
+        i = self._position(layer_id)
+        old = self.layers[i]
+        new = {**old, **settings}
+        if new == old:
+            return False
+        self._validate(new)
+        self.layers[i] = new
+        (old_start, old_end), (new_start, new_end) = self._rows(old), self._rows(new)
+        if old_end <= old_start:
+            old_start, old_end = new_start, new_end
+        if new_end <= new_start:
+            new_start, new_end = old_start, old_end
+        self._recompute(i, min(old_start, new_start), max(old_end, new_end), self._columns(old) | self._columns(new))
+        return True
+
+    def remove_layer(self, layer_id):
+        i = self._position(layer_id)
+        layer = self.layers.pop(i)
+        self._outputs.pop(i)
+        start, end = self._rows(layer)
+        self._recompute(i, start, end, self._columns(layer))
@@ -0,0 +1,296 @@
+import copy
+import math
+
+import numpy as np
+import pandas as pd
+
+from transform_pipeline import step_output_column
+
+# DDSketch relative accuracy: every reported quantile is within 1% of a true value
+QUANTILE_ACCURACY = 0.01
+MAX_QUANTILE_BUCKETS = 2048
+# HyperLogLog registers: 2^12 (4 KB, ~1.6% error) per column, 2^8 (256 B, ~6.5%) per column per group
+HLL_PRECISION = 12
+GROUP_HLL_PRECISION = 8
+QUANTILES = (0.25, 0.5, 0.75)
+
+# Count, mean and sum of squared deviations
+class MomentSketch:
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+# DDSketch: log-spaced buckets with relative-error quantiles
+class QuantileSketch:
+    def __init__(self, relative_accuracy=QUANTILE_ACCURACY, max_buckets=MAX_QUANTILE_BUCKETS):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.positive = {}  # bucket key -> count
+        self.negative = {}  # keyed by magnitude
+        self.zeros = 0
+        self.count = 0
+
+    def keys(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+
+    def add_counts(self, store, keys, counts):
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    # Fold the smallest-magnitude buckets together once a store grows past its budget
+    def _collapse(self):
+        for store in (self.positive, self.negative):
+            if len(store) <= self.max_buckets:
+                continue
+            keys = sorted(store)
+            excess = keys[:len(keys) - self.max_buckets + 1]
+            store[excess[-1]] = sum(store.pop(key) for key in excess[:-1]) + store[excess[-1]]
+
+    def quantile(self, q):
+        if self.count == 0:
+            return math.nan
+        negative_keys = sorted(self.negative, reverse=True)
+        positive_keys = sorted(self.positive)
+        values = np.concatenate([
+            [-2 * self.gamma ** key / (self.gamma + 1) for key in negative_keys],
+            [0.0] if self.zeros else [],
+            [2 * self.gamma ** key / (self.gamma + 1) for key in positive_keys],
+        ])
+        counts = np.concatenate([
+            [self.negative[key] for key in negative_keys],
+            [self.zeros] if self.zeros else [],
+            [self.positive[key] for key in positive_keys],
+        ])
+        rank = q * (self.count - 1)
+        return float(values[np.searchsorted(np.cumsum(counts), rank, side="right")])
+
+# HyperLogLog distinct count over 64-bit value hashes
+class DistinctSketch:
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    @staticmethod
+    def register_updates(hashes, precision):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+        width = 64 - precision
+        rest = hashes & np.uint64((1 << width) - 1)
+        # float64 holds integers below 2^53 exactly, so frexp gives the bit length of the top 52 bits;
+        # the few bits below them only matter when the top part is all zeros
+        shift = max(0, width - 52)
+        high, low = rest >> np.uint64(shift), rest & np.uint64((1 << shift) - 1)
+        bit_length = np.where(high > 0, np.frexp(high.astype(np.float64))[1] + shift,
+                              np.frexp(low.astype(np.float64))[1])
+        return index, (width - bit_length + 1).astype(np.uint8)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            estimate = m * math.log(m / empty)  # linear counting is more accurate for small cardinalities
+        return int(round(estimate))
+
+def column_kind(series):
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return "other"
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return "datetime"
+    return "other"
+
+# Sketches for one column; min/max are kept for numeric and datetime columns
+class ColumnStats:
+    def __init__(self, kind, precision=HLL_PRECISION):
+        self.kind = kind
+        self.rows = 0
+        self.nulls = 0
+        self.minimum = None
+        self.maximum = None
+        self.moments = MomentSketch() if kind == "numeric" else None
+        self.quantiles = QuantileSketch() if kind == "numeric" else None
+        self.distinct = DistinctSketch(precision)
+
+    def summary(self):
+        result = {"count": self.rows - self.nulls, "missing": self.nulls, "distinct": self.distinct.estimate(),
+                  "min": self.minimum, "max": self.maximum}
+        if self.moments is not None:
+            result["mean"] = self.moments.mean if self.moments.count else math.nan
+            result["std"] = math.sqrt(self.moments.variance) if self.moments.count > 1 else math.nan
+            for q in QUANTILES:
+                result[f"{q:.0%}"] = self.quantiles.quantile(q)
+        return result
+
+# Stats for `series` per group code (0..n_groups-1) in one vectorized pass over the column
+def build_column_stats(series, codes=None, n_groups=1, precision=HLL_PRECISION):
+    kind = column_kind(series)
+    codes = np.zeros(len(series), dtype=np.int64) if codes is None else np.asarray(codes, dtype=np.int64)
+    stats = [ColumnStats(kind, precision) for _ in range(n_groups)]
+    if len(series) == 0:
+        return stats
+
+    present = series.notna().to_numpy()
+    rows = np.bincount(codes, minlength=n_groups)
+    nulls = np.bincount(codes[~present], minlength=n_groups)
+    registers = np.zeros((n_groups, 1 << precision), dtype=np.uint8)
+    hashes = pd.util.hash_pandas_object(series[present], index=False).to_numpy()
+    index, rank = DistinctSketch.register_updates(hashes, precision)
+    np.maximum.at(registers, (codes[present], index), rank)
+    for group, column_stats in enumerate(stats):
+        column_stats.rows, column_stats.nulls = int(rows[group]), int(nulls[group])
+        column_stats.distinct.registers = registers[group]
+
+    if kind in ("numeric", "datetime") and present.any():
+        by_group = series[present].groupby(codes[present])
+        aggregates = by_group.agg(["min", "max"] + (["count", "mean", "var"] if kind == "numeric" else []))
+        for group, row in aggregates.iterrows():
+            column_stats = stats[group]
+            column_stats.minimum, column_stats.maximum = row["min"], row["max"]
+            if kind == "numeric":
+                count = int(row["count"])
+                m2 = float(row["var"]) * (count - 1) if count > 1 else 0.0
+                column_stats.moments = MomentSketch(count, float(row["mean"]), m2)
+
+    if kind == "numeric" and present.any():
+        values = series[present].to_numpy(dtype=np.float64)
+        present_codes = codes[present]
+        sketch = stats[0].quantiles
+        for sign, mask in ((1, values > 0), (-1, values < 0)):
+            if not mask.any():
+                continue
+            # Count (group, bucket) pairs at once by packing both into one int64
+            packed = (present_codes[mask] << 32) | (sketch.keys(sign * values[mask]) + (1 << 31))
+            pairs, counts = np.unique(packed, return_counts=True)
+            groups, keys = pairs >> 32, (pairs & 0xFFFFFFFF) - (1 << 31)
+            bounds = np.searchsorted(groups, np.arange(n_groups + 1))
+            for group in range(n_groups):
+                start, end = bounds[group], bounds[group + 1]
+                if start < end:
+                    quantiles = stats[group].quantiles
+                    store = quantiles.positive if sign > 0 else quantiles.negative
+                    quantiles.add_counts(store, keys[start:end], counts[start:end])
+        zeros = np.bincount(present_codes[values == 0], minlength=n_groups)
+        counts = np.bincount(present_codes, minlength=n_groups)
+        for group, column_stats in enumerate(stats):
+            column_stats.quantiles.zeros = int(zeros[group])
+            column_stats.quantiles.count = int(counts[group])
+            column_stats.quantiles._collapse()
+    return stats
+
+# Per-column and per-group sketches for one dataset. Built once at ingestion and brought up to
+# date with transformation steps by recomputing only the columns they touch.
+class DatasetStats:
+    def __init__(self, group_col=None):
+        self.group_col = group_col
+        self.rows = 0
+        self.columns = {}
+        self.groups = {}  # group -> {column: ColumnStats}
+        self.steps = []   # pipeline steps these stats already reflect
+
+    @classmethod
+    def from_frame(cls, data, group_col=None):
+        stats = cls(group_col if group_col in data.columns else None)
+        stats.rows = len(data)
+        stats.compute_columns(data, list(data.columns))
+        return stats
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def _group_codes(self, data):
+        codes, uniques = pd.factorize(data[self.group_col], sort=True)
+        return codes, list(uniques)
+
+    # (Re)compute the given columns from the frame, for the whole dataset and per group
+    def compute_columns(self, data, columns):
+        columns = [col for col in columns if col in data.columns]
+        for col in columns:
+            self.columns[col] = build_column_stats(data[col])[0]
+        if self.group_col is None or not columns:
+            return
+        codes, groups = self._group_codes(data)
+        valid = codes >= 0
+        for col in columns:
+            series = data[col][valid].reset_index(drop=True)
+            per_group = build_column_stats(series, codes[valid], len(groups), GROUP_HLL_PRECISION)
+            for group, column_stats in zip(groups, per_group):
+                self.groups.setdefault(group, {})[col] = column_stats
+
+    def drop_columns(self, columns):
+        for col in columns:
+            self.columns.pop(col, None)
+            for group_columns in self.groups.values():
+                group_columns.pop(col, None)
+        if self.group_col in columns:
+            self.group_col, self.groups = None, {}
+
+    def rename_columns(self, mapping):
+        rename = lambda columns: {mapping.get(col, col): stats for col, stats in columns.items()}
+        self.columns = rename(self.columns)
+        self.groups = {group: rename(columns) for group, columns in self.groups.items()}
+        self.group_col = mapping.get(self.group_col, self.group_col)
+
+    # Bring the stats in line with `data`, the result of applying `steps` to the frame these stats describe.
+    # Only columns a new step could have changed are rescanned.
+    def sync(self, data, steps):
+        new_steps = steps[len(self.steps):]
+        dirty = set()
+        for step in new_steps:
+            op, params = step["op"], step.get("params", {})
+            if op == "remove_columns":
+                self.drop_columns(params["columns"])
+            elif op == "rename_columns":
+                self.rename_columns(params["mapping"])
+                dirty = {params["mapping"].get(col, col) for col in dirty}
+            elif op == "fill_missing":
+                dirty |= {col for col, column_stats in self.columns.items() if column_stats.nulls}
+            elif op == "normalize":
+                dirty |= set(params.get("columns") or
+                             [col for col, column_stats in self.columns.items() if column_stats.kind == "numeric"])
+            elif op == "parse_dates":
+                dirty.add(params["column"])
+            elif op == "remove_blanks":
+                # Dropped rows are blank in every column, so only null counts change
+                removed = self.rows - len(data)
+                for col, column_stats in self.columns.items():
+                    column_stats.rows -= removed
+                    column_stats.nulls -= removed
+                    if column_stats.nulls < 0:
+                        dirty.add(col)
+                if removed and self.group_col is not None:
+                    dirty.add(self.group_col)
+                self.rows = len(data)
+            else:
+                dirty.add(step_output_column(step))
+
+        dirty |= set(data.columns) - set(self.columns)
+        self.drop_columns([col for col in list(self.columns) if col not in data.columns])
+        if self.group_col in dirty:
+            # Group membership may have changed; rebuild every group's stats
+            self.groups = {}
+            dirty = set(data.columns)
+        self.compute_columns(data, [col for col in data.columns if col in dirty])
+        self.rows = len(data)
+        self.steps = [dict(step) for step in steps]
+        return self
+
+    # describe()-style table: one column per data column
+    def describe(self):
+        return pd.DataFrame({col: column_stats.summary() for col, column_stats in self.columns.items()})
+
+    # One row per group for a column
+    def group_table(self, column):
+        rows = {
+            group: columns[column].summary()
+            for group, columns in self.groups.items() if column in columns
+        }
+        return pd.DataFrame.from_dict(rows, orient="index")
@@ -0,0 +1,350 @@
+import math
+import os
+import queue
+import socketserver
+import threading
+import time
+import warnings
+from collections import deque
+
+import numpy as np
+
+from model_registry import get_model_class
+
+STREAM_MODELS = ["Moving Average", "Exponential Smoothing", "ARIMA"]
+# Directory the Real-Time page may tail files from; paths outside it are refused
+STREAM_FEED_DIR = os.environ.get("AIFORECASTER_STREAM_DIR", "feeds")
+HISTORY_POINTS = 2000
+# Points collected before the model parameters are estimated (once) from them
+DEFAULT_WARMUP = 200
+# Forecasts are recomputed at most this often, however fast points arrive
+REFRESH_SECONDS = 0.5
+MAX_DRAIN = 10_000
+
+# "value" or "timestamp,value" lines; anything else is rejected
+def parse_line(line):
+    text = line.strip()
+    if not text:
+        return None
+    try:
+        return float(text.rsplit(",", 1)[-1])
+    except ValueError:
+        return None
+
+# Running mean over the last `window` points: one add and one subtract per point
+class OnlineMovingAverage:
+    def __init__(self, window=3):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+    def forecast(self, horizon):
+        mean = self.total / len(self.values) if self.values else math.nan
+        return np.full(horizon, mean)
+
+# Holt-Winters recursions (additive trend, additive or multiplicative season) with fixed smoothing
+# parameters; each point updates level, trend and one seasonal slot.
+class OnlineHoltWinters:
+    def __init__(self, level, trend, seasons, alpha, beta=0.0, gamma=0.0, seasonal=None):
+        self.level = level
+        self.trend = trend
+        self.seasons = deque(seasons)  # oldest first; seasons[0] is s_{t-m}
+        self.alpha, self.beta, self.gamma = alpha, beta, gamma
+        self.seasonal = seasonal if self.seasons else None
+
+    # Estimate parameters and starting state with statsmodels on the warm-up points
+    @classmethod
+    def from_history(cls, values, seasonal_periods=12, seasonal="add"):
+        values = np.asarray(values, dtype=float)
+        if seasonal and len(values) < 2 * seasonal_periods:
+            seasonal = None
+        if seasonal == "mul" and not np.all(values > 0):
+            seasonal = "add"
+        ExponentialSmoothing = get_model_class("holtwinters", "ExponentialSmoothing")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            result = ExponentialSmoothing(
+                values, trend="add", seasonal=seasonal, seasonal_periods=seasonal_periods if seasonal else None
+            ).fit()
+        params = result.params
+        seasons = np.asarray(result.season)[-seasonal_periods:] if seasonal else []
+        return cls(
+            float(result.level[-1]), float(result.trend[-1]), seasons,
+            float(params["smoothing_level"]), float(params["smoothing_trend"]),
+            float(params["smoothing_seasonal"]) if seasonal else 0.0, seasonal,
+        )
+
+    def update(self, value):
+        previous = self.level + self.trend
+        if self.seasonal == "mul":
+            season = self.seasons.popleft()
+            self.level = self.alpha * (value / season) + (1 - self.alpha) * previous
+            self.seasons.append(self.gamma * (value / previous) + (1 - self.gamma) * season)
+        elif self.seasonal == "add":
+            season = self.seasons.popleft()
+            self.level = self.alpha * (value - season) + (1 - self.alpha) * previous
+            self.seasons.append(self.gamma * (value - previous) + (1 - self.gamma) * season)
+        else:
+            self.level = self.alpha * value + (1 - self.alpha) * previous
+        self.trend = self.beta * (self.level - previous + self.trend) + (1 - self.beta) * self.trend
+
+    def forecast(self, horizon):
+        steps = np.arange(1, horizon + 1)
+        forecast = self.level + steps * self.trend
+        if self.seasonal:
+            seasons = np.asarray(self.seasons)[(steps - 1) % len(self.seasons)]
+            forecast = forecast * seasons if self.seasonal == "mul" else forecast + seasons
+        return forecast
+
+# ARIMA with parameters fixed after warm-up; new points are run through the Kalman filter only
+# (results.extend), so the cost per point does not grow with the history.
+class OnlineARIMA:
+    def __init__(self, result):
+        self.result = result
+        self.pending = []
+
+    @classmethod
+    def from_history(cls, values, order=(1, 1, 1)):
+        ARIMA = get_model_class("arima", "ARIMA")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return cls(ARIMA(np.asarray(values, dtype=float), order=order).fit())
+
+    # Points are filtered in batches when a forecast is needed; statsmodels' per-call overhead dwarfs one point
+    def update(self, value):
+        self.pending.append(value)
+
+    def forecast(self, horizon):
+        if self.pending:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                self.result = self.result.extend(np.asarray(self.pending, dtype=float))
+            self.pending = []
+        return np.asarray(self.result.forecast(steps=horizon))
+
+# Tail a text file, yielding complete lines as they are appended; reopens after rotation or truncation
+def tail_file(path, stop_event, from_start=False, poll_seconds=0.1):
+    while not stop_event.is_set() and not os.path.exists(path):
+        time.sleep(poll_seconds)
+    f = open(path)
+    try:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ""
+        while not stop_event.is_set():
+            line = f.readline()
+            if line:
+                if line.endswith("\n"):
+                    yield partial + line
+                    partial = ""
+                else:
+                    partial += line
+                continue
+            try:
+                rotated = os.stat(path).st_ino != os.fstat(f.fileno()).st_ino or os.path.getsize(path) < f.tell()
+            except OSError:
+                rotated = False
+            if rotated:
+                f.close()
+                f = open(path)
+                partial = ""
+            else:
+                time.sleep(poll_seconds)
+    finally:
+        f.close()
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            self.server.stream.push(line.decode("utf-8", errors="replace"))
+
+class _LineServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+# One live feed: a reader thread pushes lines in, a consumer thread updates the model per point
+# and refreshes the forecast at most every REFRESH_SECONDS.
+class LiveStream:
+    def __init__(self, source, kind, model_choice, params=None, horizon=20, warmup=DEFAULT_WARMUP):
+        if model_choice not in STREAM_MODELS:
+            raise ValueError(f"{model_choice} cannot be updated online. Choose one of: {', '.join(STREAM_MODELS)}.")
+        if kind not in ("file", "socket"):
+            raise ValueError(f"Unknown feed type '{kind}'.")
+        self.source = source
+        self.kind = kind
+        self.model_choice = model_choice
+        self.params = params or {}
+        self.horizon = horizon
+        self.warmup = 1 if model_choice == "Moving Average" else max(warmup, 10)
+        self.model = OnlineMovingAverage(self.params.get("window", 3)) if model_choice == "Moving Average" else None
+        self.history = deque(maxlen=HISTORY_POINTS)
+        self.warmup_values = []
+        self.lines = queue.SimpleQueue()
+        self.forecast = None
+        self.events = 0
+        self.rejected = 0
+        self.error = None
+        self.started_at = time.time()
+        self.updated_at = None
+        self._rate_window = deque(maxlen=20)  # (time, events) samples for the recent event rate
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._server = None
+        self._threads = []
+
+    def push(self, line):
+        self.lines.put(line)
+
+    def start(self):
+        if self.kind == "socket":
+            host, _, port = str(self.source).rpartition(":")
+            self._server = _LineServer((host or "127.0.0.1", int(port)), _LineHandler)
+            self._server.stream = self
+            reader = threading.Thread(target=self._server.serve_forever, daemon=True)
+        else:
+            reader = threading.Thread(target=self._read_file, daemon=True)
+        consumer = threading.Thread(target=self._consume, daemon=True)
+        self._threads = [reader, consumer]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def running(self):
+        return not self._stop.is_set() and all(thread.is_alive() for thread in self._threads)
+
+    def _read_file(self):
+        try:
+            for line in tail_file(self.source, self._stop, self.params.get("from_start", False)):
+                self.lines.put(line)
+        except OSError as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self._stop.set()
+
+    def _fit_warmup(self):
+        if self.model_choice == "Exponential Smoothing":
+            self.model = OnlineHoltWinters.from_history(
+                self.warmup_values, self.params.get("seasonal_periods", 12), self.params.get("seasonal", "add")
+            )
+        else:
+            self.model = OnlineARIMA.from_history(self.warmup_values, self.params.get("order", (1, 1, 1)))
+        self.warmup_values = []
+
+    def _apply(self, value):
+        self.history.append(value)
+        if self.model is None:
+            self.warmup_values.append(value)
+            if len(self.warmup_values) >= self.warmup:
+                self._fit_warmup()
+        else:
+            self.model.update(value)
+
+    def _consume(self):
+        last_refresh = 0.0
+        while not self._stop.is_set():
+            try:
+                batch = [self.lines.get(timeout=0.1)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < MAX_DRAIN:
+                try:
+                    batch.append(self.lines.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                for line in batch:
+                    value = parse_line(line)
+                    if value is None:
+                        self.rejected += 1
+                        continue
+                    self._apply(value)
+                    self.events += 1
+                now = time.time()
+                if self.model is not None and now - last_refresh >= REFRESH_SECONDS and (batch or self.forecast is None):
+                    forecast = self.model.forecast(self.horizon)
+                    with self._lock:
+                        self.forecast = forecast
+                        self.updated_at = now
+                    last_refresh = now
+                self._rate_window.append((now, self.events))
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                self._stop.set()
+
+    def events_per_second(self):
+        if len(self._rate_window) < 2:
+            return 0.0
+        (t0, e0), (t1, e1) = self._rate_window[0], self._rate_window[-1]
+        return (e1 - e0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            forecast = None if self.forecast is None else np.array(self.forecast)
+        return {
+            "source": self.source,
+            "kind": self.kind,
+            "model": self.model_choice,
+            "running": self.running,
+            "warming_up": self.model is None,
+            "warmup_progress": min(1.0, len(self.warmup_values) / self.warmup) if self.model is None else 1.0,
+            "events": self.events,
+            "rejected": self.rejected,
+            "events_per_second": self.events_per_second(),
+            "history": np.fromiter(self.history.copy(), dtype=float),
+            "forecast": forecast,
+            "updated_at": self.updated_at,
+            "error": self.error,
+        }
+
+# Process-wide streams by name, so a feed keeps running across reruns and sessions
+class StreamManager:
+    def __init__(self):
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def open(self, name, source, kind, model_choice, params=None, horizon=20, warmup=DEFAULT_WARMUP):
+        with self._lock:
+            existing = self._streams.get(name)
+            if existing is not None and existing.running:
+                raise ValueError(f"Stream '{name}' is already running.")
+            stream = LiveStream(source, kind, model_choice, params, horizon, warmup).start()
+            self._streams[name] = stream
+            return stream
+
+    def get(self, name):
+        with self._lock:
+            return self._streams.get(name)
+
+    def names(self):
+        with self._lock:
+            return list(self._streams)
+
+    def close(self, name):
+        with self._lock:
+            stream = self._streams.pop(name, None)
+        if stream is not None:
+            stream.stop()
+
+_stream_manager = None
+_stream_manager_lock = threading.Lock()
+
+def get_stream_manager():
+    global _stream_manager
+    if _stream_manager is None:
+        with _stream_manager_lock:
+            if _stream_manager is None:
+                _stream_manager = StreamManager()
+    return _stream_manager
@@ -0,0 +1,33 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("statsmodels")
+
+from artifact_store import ArtifactStore, run_with_artifacts
+
+PARAMS = {"order": (1, 0, 0), "horizon": 5}
+
+def _series(n_rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"sales": 100 + np.cumsum(rng.normal(size=n_rows)) * 0.1 + rng.normal(size=n_rows)})
+
+def test_arima_warm_starts_from_stored_fit(tmp_path):
+    store = ArtifactStore(root=str(tmp_path))
+    data = _series(60)
+
+    _, _, first = run_with_artifacts("user", data.iloc[:50], "sales", "ARIMA", PARAMS, store=store)
+    assert first["mode"] == "fit"
+
+    _, forecast, info = run_with_artifacts("user", data, "sales", "ARIMA", PARAMS, store=store)
+    assert info["mode"] == "warm", info.get("warm_start_error")
+    assert info["new_rows"] == 10
+    assert len(forecast) == PARAMS["horizon"]
+
+def test_identical_data_reuses_stored_fit(tmp_path):
+    store = ArtifactStore(root=str(tmp_path))
+    data = _series(50)
+
+    run_with_artifacts("user", data, "sales", "ARIMA", PARAMS, store=store)
+    _, _, info = run_with_artifacts("user", data, "sales", "ARIMA", PARAMS, store=store)
+    assert info["mode"] == "reused"
@@ -0,0 +1,233 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Steps are plain {"op": ..., "params": {...}} dicts so a plan round-trips through JSON.
+# Step functions never modify their input; they return a new frame.
+
+# Shallow copy with columns replaced or added; untouched columns share memory with the input
+def _with_columns(data, new_columns):
+    result = data.copy(deep=False)
+    for col, values in new_columns.items():
+        result[col] = values
+    return result
+
+def _fill_missing(data, method, value=None):
+    if method == "Custom Value":
+        # Categorical columns only accept known categories, so register the fill value first
+        new_categories = {
+            col: data[col].cat.add_categories([value])
+            for col in data.select_dtypes(include="category").columns
+            if value not in data[col].cat.categories and data[col].isna().any()
+        }
+        return _with_columns(data, new_categories).fillna(value)
+    if method == "Mode":
+        return data.fillna(data.mode().iloc[0])
+    numeric_cols = data.select_dtypes(include=[np.number]).columns
+    fill = data[numeric_cols].mean() if method == "Mean" else data[numeric_cols].median()
+    return data.fillna(fill)
+
+def _remove_blanks(data):
+    return data.dropna(how="all").dropna(axis=1, how="all")
+
+def _remove_columns(data, columns):
+    return data.drop(columns=[col for col in columns if col in data.columns])
+
+def _rename_columns(data, mapping):
+    return data.rename(columns=mapping)
+
+def _normalize(data, columns=None):
+    numeric_cols = columns or list(data.select_dtypes(include=[np.number]).columns)
+    values = data[numeric_cols]
+    return _with_columns(data, dict(((values - values.mean()) / values.std()).items()))
+
+def _parse_dates(data, column):
+    return _with_columns(data, {column: pd.to_datetime(data[column], errors="coerce")})
+
+COLUMN_SUFFIXES = {"rolling_average": "rolling_avg", "growth_pct": "growth_pct", "cumsum": "cumsum"}
+
+# Name of the column a column-producing step writes
+def step_output_column(step):
+    params = step.get("params", {})
+    if step["op"] == "add_column":
+        return params["name"]
+    return f"{params['column']}_{COLUMN_SUFFIXES[step['op']]}"
+
+# Column-producing steps; these can be fused and computed together
+def _new_column(columns, op, params):
+    name = step_output_column({"op": op, "params": params})
+    if op == "add_column":
+        return name, params["value"]
+    source = columns[params["column"]]
+    if op == "rolling_average":
+        return name, source.rolling(window=params["window"]).mean()
+    if op == "growth_pct":
+        return name, source.pct_change() * 100
+    if op == "cumsum":
+        # Compacted integer columns (e.g. int8) would overflow; accumulate in 64 bits
+        if pd.api.types.is_integer_dtype(source.dtype):
+            source = source.astype(np.int64)
+        elif pd.api.types.is_float_dtype(source.dtype):
+            source = source.astype(np.float64)
+        return name, source.cumsum()
+    raise KeyError(op)
+
+COLUMN_OPS = {"add_column", "rolling_average", "growth_pct", "cumsum"}
+
+FRAME_OPS = {
+    "fill_missing": _fill_missing,
+    "remove_blanks": _remove_blanks,
+    "remove_columns": _remove_columns,
+    "rename_columns": _rename_columns,
+    "normalize": _normalize,
+    "parse_dates": _parse_dates,
+}
+
+def make_step(op, **params):
+    if op not in FRAME_OPS and op not in COLUMN_OPS:
+        raise ValueError(f"Unknown transformation '{op}'.")
+    return {"op": op, "params": params}
+
+def describe_step(step):
+    params = ", ".join(f"{key}={value!r}" for key, value in step["params"].items())
+    return f"{step['op']}({params})"
+
+# Merge adjacent steps that can run as one operation
+def fuse_steps(steps):
+    fused = []
+    for step in steps:
+        op = step["op"]
+        previous = fused[-1] if fused else None
+        if previous and op in COLUMN_OPS and previous["op"] == "add_columns":
+            previous["params"]["steps"].append(step)
+        elif op in COLUMN_OPS:
+            fused.append({"op": "add_columns", "params": {"steps": [step]}})
+        elif previous and op == "rename_columns" and previous["op"] == "rename_columns":
+            # Compose renames: a->b then b->c becomes a->c
+            mapping = {old: step["params"]["mapping"].get(new, new) for old, new in previous["params"]["mapping"].items()}
+            for old, new in step["params"]["mapping"].items():
+                if old not in previous["params"]["mapping"].values():
+                    mapping.setdefault(old, new)
+            previous["params"] = {"mapping": mapping}
+        elif previous and op == "remove_columns" and previous["op"] == "remove_columns":
+            previous["params"] = {"columns": previous["params"]["columns"] + list(step["params"]["columns"])}
+        else:
+            fused.append({"op": op, "params": dict(step["params"])})
+    return fused
+
+# Compute every new column against the frame plus columns added earlier in the group, then join once
+def _add_columns(data, steps):
+    new_columns = OrderedDict()
+    lookup = _ColumnLookup(data, new_columns)
+    for step in steps:
+        name, values = _new_column(lookup, step["op"], step["params"])
+        new_columns[name] = values
+    return _with_columns(data, new_columns)
+
+class _ColumnLookup:
+    def __init__(self, data, new_columns):
+        self.data = data
+        self.new_columns = new_columns
+
+    def __getitem__(self, col):
+        if col in self.new_columns:
+            return self.new_columns[col]
+        return self.data[col]
+
+def apply_step(data, step):
+    if step["op"] == "add_columns":
+        return _add_columns(data, step["params"]["steps"])
+    return FRAME_OPS[step["op"]](data, **step["params"])
+
+# Checkpoint frames are kept in the dataset store when a session id is given (so they count against its
+# memory budget and can spill to disk) and in a plain dict otherwise, e.g. in batch workers.
+class TransformPipeline:
+    MAX_CHECKPOINTS = 3
+
+    def __init__(self, steps=None, session_id=None):
+        self.steps = list(steps or [])
+        self.session_id = session_id
+        self._checkpoints = OrderedDict()  # prefix key -> prefix length
+        self._frames = {}  # prefix key -> frame, without a session id
+
+    def add_step(self, step):
+        self.steps.append(step)
+
+    def undo(self):
+        if self.steps:
+            self.steps.pop()
+
+    def clear(self):
+        self.steps = []
+        for key in list(self._checkpoints):
+            self._drop_frame(key)
+        self._checkpoints.clear()
+
+    def to_json(self):
+        return json.dumps({"version": 1, "steps": self.steps}, indent=2, default=str)
+
+    @classmethod
+    def from_json(cls, text, session_id=None):
+        plan = json.loads(text)
+        steps = plan["steps"] if isinstance(plan, dict) else plan
+        for step in steps:
+            make_step(step["op"], **step.get("params", {}))
+        return cls(steps, session_id)
+
+    def _prefix_key(self, source_key, length):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(source_key).encode())
+        digest.update(json.dumps(self.steps[:length], sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _get_frame(self, key):
+        if self.session_id is None:
+            return self._frames.get(key)
+        from dataset_store import get_dataset_store
+        return get_dataset_store().get(self.session_id, f"checkpoint-{key}")
+
+    def _put_frame(self, key, frame):
+        if self.session_id is None:
+            self._frames[key] = frame
+        else:
+            from dataset_store import get_dataset_store
+            get_dataset_store().put(self.session_id, f"checkpoint-{key}", frame)
+
+    def _drop_frame(self, key):
+        if self.session_id is None:
+            self._frames.pop(key, None)
+        else:
+            from dataset_store import get_dataset_store
+            get_dataset_store().drop(self.session_id, f"checkpoint-{key}")
+
+    # Apply the plan, resuming from the longest cached prefix for this source.
+    # Returned frames are shared with the checkpoint cache and must be treated as read-only.
+    def apply(self, data, source_key=None):
+        if source_key is None:
+            from forecast_cache import hash_pandas
+            source_key = hash_pandas(data)
+
+        start, result = 0, data
+        for length in range(len(self.steps), 0, -1):
+            key = self._prefix_key(source_key, length)
+            if key in self._checkpoints:
+                frame = self._get_frame(key)
+                if frame is None:
+                    del self._checkpoints[key]  # dropped by the store, e.g. after the session idled
+                    continue
+                self._checkpoints.move_to_end(key)
+                start, result = length, frame
+                break
+
+        if start < len(self.steps):
+            for step in fuse_steps(self.steps[start:]):
+                result = apply_step(result, step)
+            key = self._prefix_key(source_key, len(self.steps))
+            self._checkpoints[key] = len(self.steps)
+            self._put_frame(key, result)
+            while len(self._checkpoints) > self.MAX_CHECKPOINTS:
+                self._drop_frame(self._checkpoints.popitem(last=False)[0])
+        return result